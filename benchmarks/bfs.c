@@ -1,8 +1,15 @@
 #include <stdio.h>
 #include <stdlib.h>
 
-#define MAX_NODES 100
-#define MAX_QUEUE 100
+#include "roi.h"
+
+// Usage: bfs_riscv [nodes] [seed]
+// Seed 0 is the original fixed graph, whose BFS from node 0 reaches the
+// same 7 nodes at any size, so nodes needs a non-zero seed. Other seeds
+// draw a random graph whose BFS reaches most nodes, so work grows with
+// the node count
+#define DEFAULT_NODES 100
+#define TRIALS 5
 
 // Simple adjacency list representation
 typedef struct {
@@ -10,16 +17,38 @@ typedef struct {
     int num_neighbors;
 } Node;
 
-Node graph[MAX_NODES];
-int queue[MAX_QUEUE];
-int visited[MAX_NODES];
+int MAX_NODES = DEFAULT_NODES;
+Node *graph;
+int *queue;
+int *visited;
+
+unsigned int rng_state = 1;
+
+// xorshift32, so a seed gives the same graph on every host
+unsigned int next_random() {
+    rng_state ^= rng_state << 13;
+    rng_state ^= rng_state >> 17;
+    rng_state ^= rng_state << 5;
+    return rng_state;
+}
 
-void init_graph() {
+void init_graph(unsigned int seed) {
+    rng_state = seed;
+    
     // Create a graph with irregular connectivity (stresses branch predictor)
     for (int i = 0; i < MAX_NODES; i++) {
         graph[i].num_neighbors = 0;
         visited[i] = 0;
         
+        if (seed != 0) {
+            // 1-3 edges to random nodes
+            int edges = 1 + next_random() % 3;
+            for (int e = 0; e < edges; e++) {
+                graph[i].neighbors[graph[i].num_neighbors++] = next_random() % MAX_NODES;
+            }
+            continue;
+        }
+        
         // Add edges in unpredictable pattern
         if (i % 3 == 0 && i + 1 < MAX_NODES) {
             graph[i].neighbors[graph[i].num_neighbors++] = i + 1;
@@ -36,7 +65,7 @@ void init_graph() {
     }
 }
 
-void bfs(int start) {
+int bfs(int start) {
     int front = 0, rear = 0;
     int nodes_visited = 0;
     
@@ -64,20 +93,48 @@ void bfs(int start) {
         }
     }
     
-    printf("BFS visited %d nodes\n", nodes_visited);
+    return nodes_visited;
 }
 
-int main() {
-    init_graph();
+int main(int argc, char **argv) {
+    unsigned int seed = 0;
+    if (argc > 1 && atoi(argv[1]) > 0) {
+        MAX_NODES = atoi(argv[1]);
+    }
+    if (argc > 2) {
+        seed = (unsigned int)strtoul(argv[2], NULL, 10);
+    }
+    if (seed == 0 && MAX_NODES != DEFAULT_NODES) {
+        printf("The seed-0 graph does not grow with nodes; pass a non-zero seed\n");
+        return 1;
+    }
+    
+    graph = malloc(MAX_NODES * sizeof(Node));
+    queue = malloc(MAX_NODES * sizeof(int));
+    visited = malloc(MAX_NODES * sizeof(int));
+    if (!graph || !queue || !visited) {
+        printf("Out of memory for %d nodes\n", MAX_NODES);
+        return 1;
+    }
+    
+    init_graph(seed);
     
-    // Run BFS multiple times to stress the predictor
-    for (int trial = 0; trial < 5; trial++) {
+    // Run BFS multiple times to stress the predictor; only the trials are
+    // the region of interest, graph set-up and output stay outside it
+    int nodes_visited[TRIALS];
+    ROI_BEGIN();
+    for (int trial = 0; trial < TRIALS; trial++) {
         // Reset visited array
         for (int i = 0; i < MAX_NODES; i++) {
             visited[i] = 0;
         }
         
-        bfs(0);
+        nodes_visited[trial] = bfs(0);
+    }
+    ROI_END();
+    
+    for (int trial = 0; trial < TRIALS; trial++) {
+        printf("BFS visited %d nodes\n", nodes_visited[trial]);
     }
     
     return 0;
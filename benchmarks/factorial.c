@@ -1,4 +1,30 @@
 #include <stdio.h>
+#include <stdlib.h>
+
+#include "roi.h"
+
+// Usage: factorial_riscv [rounds] [seed]
+// Each round repeats the whole workload. Seed 0 uses the original fixed
+// inputs; other seeds draw each round's inputs at random from the same ranges
+#define DEFAULT_ROUNDS 1
+
+unsigned int rng_state = 1;
+
+// xorshift32, so a seed gives the same inputs on every host
+unsigned int next_random() {
+    rng_state ^= rng_state << 13;
+    rng_state ^= rng_state >> 17;
+    rng_state ^= rng_state << 5;
+    return rng_state;
+}
+
+// The i-th input of a loop over [lo, hi]: i itself, or random with a seed
+int pick(unsigned int seed, int i, int lo, int hi) {
+    if (seed == 0) {
+        return i;
+    }
+    return lo + (int)(next_random() % (unsigned int)(hi - lo + 1));
+}
 
 // Recursive factorial with extra branches to stress predictor
 long long factorial(int n) {
@@ -60,31 +86,54 @@ long long fib_branchy(int n) {
     }
 }
 
-int main() {
-    long long sum = 0;
+int main(int argc, char **argv) {
+    int rounds = DEFAULT_ROUNDS;
+    unsigned int seed = 0;
+    if (argc > 1 && atoi(argv[1]) > 0) {
+        rounds = atoi(argv[1]);
+    }
+    if (argc > 2) {
+        seed = (unsigned int)strtoul(argv[2], NULL, 10);
+    }
+    rng_state = seed;
+    
+    long long fact_sum = 0;
+    int even_count = 0;
+    long long fib_sum = 0;
+    
+    // The three kernels are the region of interest; output is printed
+    // once they are done
+    ROI_BEGIN();
     
     // Test factorial with various inputs
-    printf("Computing factorials...\n");
-    for (int i = 1; i <= 15; i++) {
-        sum += factorial(i);
+    for (int r = 0; r < rounds; r++) {
+        for (int i = 1; i <= 15; i++) {
+            fact_sum += factorial(pick(seed, i, 1, 15));
+        }
     }
-    printf("Sum of factorials: %lld\n", sum);
     
     // Test mutual recursion
-    printf("Testing mutual recursion...\n");
-    int even_count = 0;
-    for (int i = 0; i < 50; i++) {
-        if (is_even(i)) even_count++;
+    for (int r = 0; r < rounds; r++) {
+        for (int i = 0; i < 50; i++) {
+            if (is_even(pick(seed, i, 0, 49))) even_count++;
+        }
     }
-    printf("Even numbers from 0-49: %d\n", even_count);
     
     // Test branchy fibonacci (small n to avoid timeout)
-    printf("Computing branchy fibonacci...\n");
-    sum = 0;
-    for (int i = 1; i <= 12; i++) {
-        sum += fib_branchy(i);
+    for (int r = 0; r < rounds; r++) {
+        for (int i = 1; i <= 12; i++) {
+            fib_sum += fib_branchy(pick(seed, i, 1, 12));
+        }
     }
-    printf("Sum of branchy fib: %lld\n", sum);
+    
+    ROI_END();
+    
+    printf("Computing factorials...\n");
+    printf("Sum of factorials: %lld\n", fact_sum);
+    printf("Testing mutual recursion...\n");
+    printf("Even numbers from 0-49: %d\n", even_count);
+    printf("Computing branchy fibonacci...\n");
+    printf("Sum of branchy fib: %lld\n", fib_sum);
     
     return 0;
 }
\ No newline at end of file
@@ -2,8 +2,18 @@
 #include <stdlib.h>
 #include <string.h>
 
-#define TABLE_SIZE 64
-#define NUM_KEYS 200
+#include "roi.h"
+
+// Usage: hash_lookup_riscv [keys] [seed]
+// The table grows with the key count (64 buckets per 200 keys) so chains
+// keep the same average length. Seed 0 uses the original key pattern;
+// other seeds scatter the keys pseudo-randomly
+#define DEFAULT_KEYS 200
+#define KEYS_PER_64_BUCKETS 200
+
+int TABLE_SIZE = 64;
+int NUM_KEYS = DEFAULT_KEYS;
+unsigned int key_seed = 0;
 
 // Hash table with chaining (linked list for collisions)
 typedef struct Node {
@@ -12,11 +22,19 @@ typedef struct Node {
     struct Node* next;
 } Node;
 
-Node* hash_table[TABLE_SIZE];
+Node** hash_table;
 
 // Simple hash function (deliberately causes collisions)
 int hash(int key) {
-    return (key * 31 + 17) % TABLE_SIZE;
+    return ((unsigned int)key * 31u + 17u) % (unsigned int)TABLE_SIZE;
+}
+
+// The i-th key; distinct for every i, also with a seed
+int key_for(int i) {
+    if (key_seed == 0) {
+        return i * 7 + 3;  // Pattern that causes collisions
+    }
+    return (int)(((unsigned int)i * 2654435761u) ^ key_seed);
 }
 
 void insert(int key, int value) {
@@ -95,27 +113,41 @@ int count_chain(int index) {
     return count;
 }
 
-int main() {
+int main(int argc, char **argv) {
+    if (argc > 1 && atoi(argv[1]) > 0) {
+        NUM_KEYS = atoi(argv[1]);
+    }
+    if (argc > 2) {
+        key_seed = (unsigned int)strtoul(argv[2], NULL, 10);
+    }
+    TABLE_SIZE = 64 * ((NUM_KEYS + KEYS_PER_64_BUCKETS - 1) / KEYS_PER_64_BUCKETS);
+    
+    hash_table = malloc(TABLE_SIZE * sizeof(Node*));
+    if (!hash_table) {
+        printf("Out of memory for %d buckets\n", TABLE_SIZE);
+        return 1;
+    }
+    
     // Initialize hash table
     for (int i = 0; i < TABLE_SIZE; i++) {
         hash_table[i] = NULL;
     }
     
+    // Inserts through deletes are the region of interest; output is
+    // printed once they are done
+    ROI_BEGIN();
+    
     // Insert keys with pattern that causes collisions
-    printf("Inserting keys...\n");
     for (int i = 0; i < NUM_KEYS; i++) {
-        int key = i * 7 + 3;  // Pattern that causes collisions
-        insert(key, i * 10);
+        insert(key_for(i), i * 10);
     }
     
     // Lookup with unpredictable access pattern
-    printf("Looking up keys...\n");
     int found_count = 0;
     int not_found_count = 0;
     
     for (int i = 0; i < NUM_KEYS * 2; i++) {
-        int key = i * 7 + 3;
-        int result = lookup(key);
+        int result = lookup(key_for(i));
         
         // Irregular branching based on lookup result
         if (result != -1) {
@@ -128,10 +160,7 @@ int main() {
         }
     }
     
-    printf("Found: %d, Not found: %d\n", found_count, not_found_count);
-    
     // Count collisions (more irregular branching)
-    printf("Counting collision chains...\n");
     int total_nodes = 0;
     int max_chain = 0;
     
@@ -144,17 +173,22 @@ int main() {
         }
     }
     
-    printf("Total nodes: %d, Max chain length: %d\n", total_nodes, max_chain);
-    
     // Delete some keys (complex branching)
-    printf("Deleting keys...\n");
     int deleted = 0;
     for (int i = 0; i < NUM_KEYS; i += 3) {
-        int key = i * 7 + 3;
-        if (delete(key)) {
+        if (delete(key_for(i))) {
             deleted++;
         }
     }
+    
+    ROI_END();
+    
+    printf("Inserting keys...\n");
+    printf("Looking up keys...\n");
+    printf("Found: %d, Not found: %d\n", found_count, not_found_count);
+    printf("Counting collision chains...\n");
+    printf("Total nodes: %d, Max chain length: %d\n", total_nodes, max_chain);
+    printf("Deleting keys...\n");
     printf("Deleted %d keys\n", deleted);
     
     // Cleanup
@@ -166,6 +200,7 @@ int main() {
             free(temp);
         }
     }
+    free(hash_table);
     
     return 0;
 }
\ No newline at end of file
@@ -0,0 +1,18 @@
+#ifndef ROI_H
+#define ROI_H
+
+// Region-of-interest markers around each benchmark's kernel
+// Built with -DM5OPS (the Makefile default), they are gem5 m5ops work
+// begin/end markers; run_branch_pred.py --roi dumps stats at each one and
+// can stop the simulation at ROI_END. Without M5OPS they compile to
+// nothing, so the binaries also run outside gem5
+#ifdef M5OPS
+#include <gem5/m5ops.h>
+#define ROI_BEGIN() m5_work_begin(0, 0)
+#define ROI_END() m5_work_end(0, 0)
+#else
+#define ROI_BEGIN()
+#define ROI_END()
+#endif
+
+#endif
@@ -5,9 +5,15 @@ Uses simple 2-bit saturating counter per branch
 
 from m5.objects import BiModeBP
 
-def create_predictor():
-    """Create and configure bimodal branch predictor"""
+from configs.params import apply_params
+
+def create_predictor(**params):
+    """Create and configure bimodal branch predictor
+
+    Keyword arguments override BiModeBP parameters, e.g.
+    create_predictor(globalPredictorSize=8192, choicePredictorSize=2048)
+    """
     bp = BiModeBP()
     bp.numThreads = 1
     bp.globalPredictorSize = 4096  # 4K entry table
-    return bp
\ No newline at end of file
+    return apply_params(bp, params)
\ No newline at end of file
@@ -3,13 +3,17 @@ Gshare Branch Predictor Configuration
 Uses global history XORed with PC
 """
 
-from m5.objects import MultiperspectivePerceptron8KB
+from m5.objects import LTAGE
 
-def create_predictor():
-    """Create and configure gshare branch predictor"""
+from configs.params import apply_params
+
+def create_predictor(**params):
+    """Create and configure gshare branch predictor
+
+    Keyword arguments override LTAGE parameters; dotted names reach the
+    TAGE and loop components, e.g. create_predictor(**{"tage.maxHist": 320})
+    """
     
     # Use the TAGE-based predictor which includes gshare-like behavior
-    from m5.objects import LTAGE
     bp = LTAGE()
-    return bp
-
+    return apply_params(bp, params)
@@ -0,0 +1,31 @@
+"""
+Predictor Parameter Overrides
+Applies NAME=VALUE overrides (e.g. from a sweep) to a branch predictor
+"""
+
+def parse_value(text):
+    """Turn a command-line value into int/float/bool when it looks like one"""
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def apply_params(bp, params):
+    """Set predictor parameters, following dotted names into children
+
+    Args:
+        bp: Branch predictor SimObject
+        params: Dict like {"globalPredictorSize": 8192, "tage.maxHist": 320}
+    """
+    for name, value in params.items():
+        target = bp
+        *path, attr = name.split(".")
+        for child in path:
+            target = getattr(target, child)
+        setattr(target, attr, value)
+    return bp
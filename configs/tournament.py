@@ -5,8 +5,13 @@ Combines local and global predictors with a selector
 
 from m5.objects import TournamentBP
 
-def create_predictor():
-    """Create and configure tournament branch predictor"""
+from configs.params import apply_params
+
+def create_predictor(**params):
+    """Create and configure tournament branch predictor
+
+    Keyword arguments override TournamentBP parameters
+    """
     bp = TournamentBP()
     
     # Local predictor settings
@@ -21,4 +26,4 @@ def create_predictor():
     bp.choicePredictorSize = 8192
     bp.choiceCtrBits = 2
     
-    return bp
\ No newline at end of file
+    return apply_params(bp, params)
\ No newline at end of file
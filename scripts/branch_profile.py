@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Per-branch misprediction profiles
+
+The stats only give each run's total condIncorrect. A profile breaks it
+down per static branch: executions, taken rate and mispredictions for
+every branch PC, ranked by its share of the run's mispredictions and
+named after the benchmark's ELF symbols (bfs+0x3c, and file:line when
+addr2line can read the debug info).
+
+gem5 is run with the detailed CPU and the predictor under test, with two
+debug flags, and its output is aggregated as it streams out of the pipe;
+nothing is written to disk:
+
+    Exec     every committed instruction; branches, their type and
+             whether they were taken come from branch_trace.py's parser
+    Branch   the predictor's own log; a squash for a mispredicted
+             branch (MISPREDICT_LINE) is charged to that branch's PC
+
+The aggregation is bounded. Up to --capacity PCs are counted exactly.
+Past that, the profile keeps the heaviest mispredicting PCs and drops
+the rest (batched Space-Saving). Each entry then carries an `error`
+bound: its true misprediction count is within [mispredicts,
+mispredicts + error]. Totals are always exact.
+
+Usage:
+    python3 scripts/branch_profile.py run --predictor gshare --benchmark bfs_riscv
+    python3 scripts/branch_profile.py ingest gem5-debug.log.gz --benchmark bfs_riscv --label gshare
+    python3 scripts/branch_profile.py show gshare bfs
+    python3 scripts/branch_profile.py compare bfs
+"""
+
+import re
+import sys
+import gzip
+import json
+import bisect
+import shutil
+import struct
+import argparse
+import subprocess
+from pathlib import Path
+
+from branch_trace import parse_exec_trace, EXEC_DEBUG_FLAGS, EXEC_LINE, BRANCH_TYPES
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+PROFILE_DIR = PROJECT_ROOT / "results" / "analysis" / "branch_profiles"
+
+PROFILE_DEBUG_FLAGS = EXEC_DEBUG_FLAGS + ",Branch"
+
+# BPredUnit::squash() logs the PC of a branch found to be mispredicted,
+# e.g. "system.cpu.branchPred: [tid:0] [squash sn:512] Mispredicted: T, PC:0x10400"
+MISPREDICT_HINT = "ispredict"
+MISPREDICT_LINE = re.compile(r"[Mm]ispredict\w*\b.*?\bPC[:=\s(]*(?:0x)?([0-9a-fA-F]+)")
+
+# Other Branch-flag lines come from the predictor object and are dropped
+# before the Exec parser sees them
+BRANCH_UNIT = "branchPred"
+
+# Distinct PCs counted exactly before the profile starts dropping light ones
+DEFAULT_CAPACITY = 1 << 16
+
+# --- Aggregation -------------------------------------------------------------
+
+class BranchProfile:
+    """Streaming per-PC counts of executions, taken and mispredictions
+
+    Entries are [execs, taken, mispredicts, type, error]. Once more than
+    2 x capacity PCs are tracked, the table is cut back to the capacity
+    heaviest by mispredictions. `floor` remembers the heaviest count ever
+    dropped, so a PC (re)admitted later may have missed at most that
+    many mispredictions. Executions of PCs not tracked once the table is
+    full land in untracked_execs.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.entries = {}
+        self.floor = 0
+        self.branches = 0
+        self.mispredicts = 0
+        self.untracked_execs = 0
+        self.pruned = 0
+
+    @property
+    def exact(self):
+        return self.pruned == 0
+
+    def _admit(self, pc):
+        entry = self.entries[pc] = [0, 0, 0, None, self.floor]
+        if len(self.entries) > 2 * self.capacity:
+            self._prune()
+        return entry
+
+    def _prune(self):
+        ranked = sorted(self.entries.items(), key=lambda item: item[1][2], reverse=True)
+        keep, drop = ranked[:self.capacity], ranked[self.capacity:]
+        self.floor = max([self.floor] + [entry[2] + entry[4] for _, entry in drop])
+        self.pruned += len(drop)
+        self.entries = dict(keep)
+
+    def executed(self, pc, taken, btype):
+        self.branches += 1
+        entry = self.entries.get(pc)
+        if entry is None:
+            if len(self.entries) >= self.capacity and self.pruned:
+                self.untracked_execs += 1
+                return
+            entry = self._admit(pc)
+        entry[0] += 1
+        entry[1] += taken
+        entry[3] = btype
+
+    def mispredicted(self, pc):
+        self.mispredicts += 1
+        entry = self.entries.get(pc)
+        if entry is None:
+            entry = self._admit(pc)
+        entry[2] += 1
+
+    def ranked(self):
+        """(pc, entry) pairs, most mispredictions first"""
+        return sorted(self.entries.items(), key=lambda item: (-item[1][2], -item[1][0]))
+
+def split_debug_stream(lines, profile, pattern=MISPREDICT_LINE):
+    """Charge mispredict lines to the profile; yield the Exec lines"""
+    for line in lines:
+        if MISPREDICT_HINT in line:
+            match = pattern.search(line)
+            if match:
+                profile.mispredicted(int(match.group(1), 16))
+                continue
+        if BRANCH_UNIT not in line:
+            yield line
+
+def aggregate(lines, profile, pattern=MISPREDICT_LINE):
+    """Stream gem5 Exec+Branch debug output into a BranchProfile"""
+    for pc, _target, taken, btype in parse_exec_trace(split_debug_stream(lines, profile, pattern)):
+        profile.executed(pc, taken, btype)
+    return profile
+
+# --- Symbolization -----------------------------------------------------------
+
+STT_FUNC = 2
+SHT_SYMTAB = 2
+
+def elf_functions(path):
+    """Sorted (address, size, name) of the function symbols in an ELF file"""
+    data = Path(path).read_bytes()
+    if data[:4] != b"\x7fELF":
+        raise ValueError(f"{path} is not an ELF file")
+    wide = data[4] == 2
+    order = "<" if data[5] == 1 else ">"
+
+    if wide:
+        shoff, = struct.unpack_from(order + "Q", data, 0x28)
+        shentsize, shnum = struct.unpack_from(order + "HH", data, 0x3A)
+        section = struct.Struct(order + "IIQQQQIIQQ")
+        symbol = struct.Struct(order + "IBBHQQ")
+    else:
+        shoff, = struct.unpack_from(order + "I", data, 0x20)
+        shentsize, shnum = struct.unpack_from(order + "HH", data, 0x2E)
+        section = struct.Struct(order + "IIIIIIIIII")
+        symbol = struct.Struct(order + "IIIBBH")
+
+    sections = [section.unpack_from(data, shoff + i * shentsize) for i in range(shnum)]
+    functions = []
+    for sh in sections:
+        if sh[1] != SHT_SYMTAB:
+            continue
+        offset, size, strtab = sh[4], sh[5], sections[sh[6]][4]
+        for pos in range(offset, offset + size, symbol.size):
+            if wide:
+                name_off, info, _, _, value, sym_size = symbol.unpack_from(data, pos)
+            else:
+                name_off, value, sym_size, info, _, _ = symbol.unpack_from(data, pos)
+            if info & 0xf != STT_FUNC or not value:
+                continue
+            end = data.index(b"\0", strtab + name_off)
+            functions.append((value, sym_size, data[strtab + name_off:end].decode(errors="replace")))
+    return sorted(functions)
+
+class Symbolizer:
+    """PC -> function+offset (and file:line via addr2line, if available)"""
+
+    ADDR2LINE = ("riscv64-unknown-elf-addr2line", "riscv64-linux-gnu-addr2line", "addr2line")
+
+    def __init__(self, binary):
+        self.binary = Path(binary)
+        try:
+            self.functions = elf_functions(self.binary)
+        except (OSError, ValueError, struct.error):
+            self.functions = []
+        self.starts = [f[0] for f in self.functions]
+        self.addr2line = next((tool for tool in self.ADDR2LINE if shutil.which(tool)), None)
+
+    def symbol(self, pc):
+        i = bisect.bisect_right(self.starts, pc) - 1
+        if i < 0:
+            return None
+        start, size, name = self.functions[i]
+        if size and pc >= start + size:
+            return None
+        return f"{name}+{pc - start:#x}"
+
+    def lines(self, pcs):
+        """{pc: 'file:line'} for the PCs addr2line can place"""
+        if not self.addr2line or not pcs or not self.binary.exists():
+            return {}
+        try:
+            out = subprocess.run([self.addr2line, "-e", str(self.binary)] + [hex(pc) for pc in pcs],
+                                 capture_output=True, text=True, timeout=60).stdout.splitlines()
+        except (OSError, subprocess.TimeoutExpired):
+            return {}
+        locations = {}
+        for pc, loc in zip(pcs, out):
+            path, _, line = loc.split(" ")[0].rpartition(":")
+            if line.isdigit() and not path.startswith("??"):
+                locations[pc] = f"{Path(path).name}:{line}"
+        return locations
+
+# --- Profiles on disk --------------------------------------------------------
+
+def profile_path(label, benchmark, profile_dir=PROFILE_DIR):
+    return Path(profile_dir) / label / f"{benchmark.replace('_riscv', '')}.json"
+
+def profile_record(profile, label, benchmark, binary, source):
+    """JSON-ready profile, branches ranked by misprediction contribution"""
+    symbolizer = Symbolizer(binary)
+    ranked = profile.ranked()
+    locations = symbolizer.lines([pc for pc, _ in ranked[:200]])
+
+    branches = []
+    for pc, (execs, taken, mispredicts, btype, error) in ranked:
+        branches.append({
+            'pc': f"{pc:#x}",
+            'symbol': symbolizer.symbol(pc),
+            'line': locations.get(pc),
+            'type': BRANCH_TYPES[btype] if btype is not None else None,
+            'execs': execs,
+            'taken_rate': taken / execs * 100 if execs else None,
+            'mispredicts': mispredicts,
+            'mispredict_rate': mispredicts / execs * 100 if execs else None,
+            'share': mispredicts / profile.mispredicts * 100 if profile.mispredicts else 0.0,
+            'error': error,
+        })
+
+    return {
+        'label': label,
+        'predictor': label.partition('@')[0],
+        'benchmark': benchmark.replace('_riscv', ''),
+        'binary': str(binary),
+        'source': source,
+        'branches_executed': profile.branches,
+        'mispredicts': profile.mispredicts,
+        'exact': profile.exact,
+        'capacity': profile.capacity,
+        'untracked_execs': profile.untracked_execs,
+        'branches': branches,
+    }
+
+def save_profile(record, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(record, indent=2) + "\n")
+    tmp.replace(path)
+
+def load_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+# --- Sources -----------------------------------------------------------------
+
+def open_log(path):
+    """Lines of a saved gem5 debug log; '-' is stdin, .gz is decompressed on the fly"""
+    if str(path) == "-":
+        return sys.stdin
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, errors="replace")
+
+def profile_gem5(runner, predictor, benchmark, extra_params, profile, log_dir,
+                 pattern=MISPREDICT_LINE):
+    """Run gem5 with Exec+Branch debug output and aggregate it from the pipe
+
+    Program output and gem5's own messages go to stdout.txt in log_dir.
+    """
+    log_dir.mkdir(parents=True, exist_ok=True)
+    benchmark_path = runner.BENCHMARK_DIR / benchmark
+    params = runner.run_params(predictor, extra_params)
+    cmd = runner.gem5_command(log_dir, benchmark_path, runner.params_to_args(params),
+                              [f"--debug-flags={PROFILE_DEBUG_FLAGS}"])
+
+    with open(log_dir / "stdout.txt", "w") as other, \
+         open(log_dir / "stderr.txt", "w") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err,
+                                text=True, bufsize=1 << 20)
+
+        def debug_lines():
+            for line in proc.stdout:
+                if MISPREDICT_HINT in line or BRANCH_UNIT in line or EXEC_LINE.search(line):
+                    yield line
+                else:
+                    other.write(line)
+
+        try:
+            aggregate(debug_lines(), profile, pattern)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        returncode = proc.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"gem5 exited with {returncode}; see {log_dir}")
+    return profile
+
+# --- Reports -----------------------------------------------------------------
+
+def _where(branch):
+    where = branch['symbol'] or branch['pc']
+    if branch.get('line'):
+        where += f" ({branch['line']})"
+    return where
+
+def print_profile(record, top=20):
+    print(f"\n{record['label']} on {record['benchmark']}: {record['mispredicts']:,} mispredictions "
+          f"in {record['branches_executed']:,} branches"
+          + ("" if record['exact'] else f" (top {record['capacity']:,} PCs tracked)"))
+    print(f"{'PC':<10} {'Where':<34} {'Type':<12} {'Execs':>10} {'Taken':>7} "
+          f"{'Mispred':>9} {'Rate':>7} {'Share':>7}")
+    print("-" * 104)
+    cumulative = 0.0
+    for branch in record['branches'][:top]:
+        cumulative += branch['share']
+        approx = "≈" if branch['error'] else " "
+        taken = f"{branch['taken_rate']:.1f}%" if branch['taken_rate'] is not None else "N/A"
+        rate = f"{branch['mispredict_rate']:.1f}%" if branch['mispredict_rate'] is not None else "N/A"
+        print(f"{branch['pc']:<10} {_where(branch)[:34]:<34} {branch['type'] or '?':<12} "
+              f"{branch['execs']:>10,} {taken:>7} {approx}{branch['mispredicts']:>8,} "
+              f"{rate:>7} {branch['share']:>6.1f}%")
+    print("-" * 104)
+    print(f"Top {min(top, len(record['branches']))} branches: {cumulative:.1f}% of mispredictions")
+
+def print_comparison(records, top=20):
+    """Hottest branches across predictors, side by side"""
+    totals = {}
+    for record in records:
+        for branch in record['branches']:
+            totals[branch['pc']] = totals.get(branch['pc'], 0) + branch['mispredicts']
+    by_label = {r['label']: {b['pc']: b for b in r['branches']} for r in records}
+    labels = sorted(by_label)
+    symbols = {b['pc']: _where(b) for r in records for b in r['branches']}
+
+    header = f"{'PC':<10} {'Where':<30}" + "".join(f" {label[:16]:>16}" for label in labels)
+    print(f"\nMispredictions (rate) per branch - {records[0]['benchmark']}")
+    print(header)
+    print("-" * len(header))
+    for pc, _ in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+        cells = []
+        for label in labels:
+            branch = by_label[label].get(pc)
+            if branch is None or branch['mispredict_rate'] is None:
+                cells.append(f" {'-':>16}")
+            else:
+                cell = f"{branch['mispredicts']:,} ({branch['mispredict_rate']:.0f}%)"
+                cells.append(f" {cell:>16}")
+        print(f"{pc:<10} {symbols[pc][:30]:<30}" + "".join(cells))
+    print("-" * len(header))
+    totals_row = [f"{r['mispredicts']:,} total" for r in sorted(records, key=lambda r: r['label'])]
+    print("".ljust(41) + "".join(f" {cell:>16}" for cell in totals_row))
+
+def main():
+    import run_all_experiments as runner
+
+    parser = argparse.ArgumentParser(description="Per-branch misprediction profiles")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(p):
+        p.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                       help=f'PCs counted exactly before dropping light ones (default: {DEFAULT_CAPACITY})')
+        p.add_argument('--mispredict-pattern', type=re.compile, default=MISPREDICT_LINE,
+                       help='Regex for Branch debug lines of a mispredicted branch; group 1 is the PC')
+        p.add_argument('--top', type=int, default=20, help='Branches to print')
+
+    p = sub.add_parser('run', help='Profile one predictor on one benchmark with gem5')
+    p.add_argument('--predictor', choices=runner.PREDICTORS, required=True)
+    p.add_argument('--benchmark', choices=runner.BENCHMARKS, required=True)
+    p.add_argument('--size', type=int, default=0, help='Benchmark problem size')
+    p.add_argument('--seed', type=int, default=0, help='Benchmark input seed')
+    add_common(p)
+
+    p = sub.add_parser('ingest', help='Profile a saved gem5 Exec+Branch debug log (.gz or - for stdin)')
+    p.add_argument('log')
+    p.add_argument('--benchmark', choices=runner.BENCHMARKS, required=True)
+    p.add_argument('--label', required=True, help='Predictor or results label the log came from')
+    add_common(p)
+
+    p = sub.add_parser('show', help='Print a saved profile')
+    p.add_argument('label')
+    p.add_argument('benchmark')
+    p.add_argument('--top', type=int, default=20)
+
+    p = sub.add_parser('compare', help='Hottest branches of one benchmark across predictors')
+    p.add_argument('benchmark')
+    p.add_argument('--top', type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command in ('show', 'compare'):
+        if args.command == 'show':
+            paths = [profile_path(args.label, args.benchmark)]
+        else:
+            name = args.benchmark.replace('_riscv', '')
+            paths = sorted(PROFILE_DIR.glob(f"*/{name}.json"))
+        records = [load_profile(p) for p in paths if p.exists()]
+        if not records:
+            print("No profiles found; run: python3 scripts/branch_profile.py run ...")
+            sys.exit(1)
+        if args.command == 'show':
+            print_profile(records[0], args.top)
+        else:
+            print_comparison(records, args.top)
+        return
+
+    profile = BranchProfile(args.capacity)
+    benchmark_path = runner.BENCHMARK_DIR / args.benchmark
+
+    if args.command == 'run':
+        workload_error = runner.check_workload([args.benchmark], [args.size], args.seed)
+        if workload_error:
+            parser.error(workload_error)
+        workload = {k: v for k, v in (('size', args.size), ('seed', args.seed)) if v}
+        label = runner.workload_label(args.predictor, args.size, args.seed)
+        log_dir = PROFILE_DIR / label / f"{args.benchmark.replace('_riscv', '')}.gem5"
+        print(f"Profiling {label} on {args.benchmark} (gem5 --debug-flags={PROFILE_DEBUG_FLAGS})")
+        try:
+            profile_gem5(runner, args.predictor, args.benchmark, workload, profile, log_dir,
+                         args.mispredict_pattern)
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        source = 'gem5'
+    else:
+        label = args.label
+        with open_log(args.log) as lines:
+            aggregate(lines, profile, args.mispredict_pattern)
+        source = str(args.log)
+
+    if profile.branches and not profile.mispredicts:
+        print("⚠ No mispredict lines matched; check --mispredict-pattern against the Branch output")
+
+    record = profile_record(profile, label, args.benchmark, benchmark_path, source)
+    path = profile_path(label, args.benchmark)
+    save_profile(record, path)
+    print_profile(record, args.top)
+    print(f"\n✓ Saved: {path}")
+
+if __name__ == "__main__":
+    main()
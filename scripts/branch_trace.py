@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Committed-branch traces in a compact, memory-mappable binary format
+
+A trace holds one record per committed control-flow instruction: PC,
+target, taken/not-taken and branch type. The types use the same
+categories as the gem5 branch predictor stats (DirectCond,
+IndirectUncond, ...). Traces are captured once per benchmark binary by
+running gem5 on the atomic CPU with Exec tracing. The text trace is
+parsed as it streams out of gem5 and never touches the disk.
+
+File layout (.btrace, little endian):
+
+    header   magic "BTRC", version, codec, record count, chunk count,
+             index offset
+    chunks   per chunk, three 8-byte aligned column blocks:
+                 pc_delta     int32  PC minus the previous record's PC
+                                     (0 for a chunk's first record)
+                 target_delta int32  target minus PC
+                 flags        uint8  bit 0 taken, bits 1-3 branch type
+    index    per chunk: offset, record count, first PC and the stored
+             size of each column block
+
+Deltas keep the columns small and repetitive, so zlib/lzma chunks
+compress well. With codec "raw" the column blocks are stored as-is and
+TraceReader hands them out as zero-copy NumPy views of an mmap.
+"""
+
+import re
+import sys
+import mmap
+import zlib
+import lzma
+import struct
+import argparse
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+TRACE_DIR = PROJECT_ROOT / "traces"
+
+MAGIC = b"BTRC"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxQII8x")           # magic, version, codec, records, chunks, chunk_records
+INDEX_OFFSET = struct.Struct("<Q")             # trails the header
+INDEX_ENTRY = struct.Struct("<QIQIII")         # offset, records, first_pc, pc/target/flags sizes
+DATA_START = 64
+
+CODECS = {"raw": 0, "zlib": 1, "lzma": 2}
+CODEC_NAMES = {v: k for k, v in CODECS.items()}
+
+DEFAULT_CHUNK_RECORDS = 1 << 20
+
+# Branch types, in the order gem5 reports them in lookups_0::<type>
+BRANCH_TYPES = [
+    "NoBranch", "Return", "CallDirect", "CallIndirect",
+    "DirectCond", "DirectUncond", "IndirectCond", "IndirectUncond",
+]
+BRANCH_TYPE_CODES = {name: code for code, name in enumerate(BRANCH_TYPES)}
+DIRECT_COND = BRANCH_TYPE_CODES["DirectCond"]
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
+
+def _compress(codec, data):
+    if codec == CODECS["zlib"]:
+        return zlib.compress(data, 6)
+    if codec == CODECS["lzma"]:
+        return lzma.compress(data, preset=6)
+    return data
+
+def _decompress(codec, data):
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    if codec == CODECS["lzma"]:
+        return lzma.decompress(data)
+    return data
+
+class TraceWriter:
+    """Append branch records and write them out chunk by chunk
+
+    Usage:
+        with TraceWriter(path) as w:
+            w.append(pc, target, taken, btype)        # one record
+            w.extend(pcs, targets, taken, btypes)     # arrays
+    """
+
+    def __init__(self, path, codec="zlib", chunk_records=DEFAULT_CHUNK_RECORDS):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec} (choose from {', '.join(CODECS)})")
+        self.path = Path(path)
+        self.codec = CODECS[codec]
+        self.chunk_records = chunk_records
+        self.records = 0
+        self.index = []
+        self._pending = ([], [], [], [])
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(self.path.name + ".part")
+        self._file = open(self._tmp, "wb")
+        self._file.write(b"\0" * DATA_START)
+
+    def append(self, pc, target, taken, btype):
+        pcs, targets, takens, types = self._pending
+        pcs.append(pc)
+        targets.append(target)
+        takens.append(taken)
+        types.append(btype)
+        if len(pcs) >= self.chunk_records:
+            self._flush_pending()
+
+    def extend(self, pcs, targets, taken, btypes):
+        self._flush_pending()
+        pcs = np.asarray(pcs, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        taken = np.asarray(taken, dtype=np.uint8)
+        btypes = np.asarray(btypes, dtype=np.uint8)
+        for start in range(0, len(pcs), self.chunk_records):
+            end = start + self.chunk_records
+            self._write_chunk(pcs[start:end], targets[start:end],
+                              taken[start:end], btypes[start:end])
+
+    def _flush_pending(self):
+        pcs, targets, takens, types = self._pending
+        if pcs:
+            self._write_chunk(np.array(pcs, dtype=np.int64),
+                              np.array(targets, dtype=np.int64),
+                              np.array(takens, dtype=np.uint8),
+                              np.array(types, dtype=np.uint8))
+            self._pending = ([], [], [], [])
+
+    def _write_chunk(self, pcs, targets, taken, btypes):
+        n = len(pcs)
+        if n == 0:
+            return
+
+        # The chunk's first PC lives in the index, so its delta is always 0
+        pc_delta = np.diff(pcs, prepend=pcs[0])
+        target_delta = targets - pcs
+        for name, column in (("PC delta", pc_delta), ("target delta", target_delta)):
+            if column.size and (column.min() < -2**31 or column.max() >= 2**31):
+                raise ValueError(f"{name} does not fit in 32 bits")
+
+        first_pc = int(pcs[0])
+
+        blocks = [
+            _compress(self.codec, pc_delta.astype("<i4").tobytes()),
+            _compress(self.codec, target_delta.astype("<i4").tobytes()),
+            _compress(self.codec, ((btypes.astype(np.uint8) << 1)
+                                   | (taken.astype(np.uint8) & 1)).tobytes()),
+        ]
+
+        offset = self._file.tell()
+        for block in blocks:
+            self._file.write(block)
+            self._file.write(b"\0" * (_align(len(block)) - len(block)))
+
+        self.index.append((offset, n, first_pc) + tuple(len(b) for b in blocks))
+        self.records += n
+
+    def close(self):
+        if self._file is None:
+            return
+        self._flush_pending()
+
+        index_offset = self._file.tell()
+        for entry in self.index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.codec, self.records,
+                                     len(self.index), self.chunk_records))
+        self._file.write(INDEX_OFFSET.pack(index_offset))
+        self._file.close()
+        self._file = None
+
+        # Publish atomically so a killed capture never leaves a valid-looking trace
+        self._tmp.replace(self.path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class TraceReader:
+    """Read a .btrace file through mmap
+
+    For raw traces the column accessors return zero-copy views of the
+    file; compressed traces are decompressed one chunk at a time.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, codec, records, chunks, chunk_records = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a branch trace: {self.path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version}: {self.path}")
+
+        self.codec = codec
+        self.records = records
+        self.chunk_records = chunk_records
+        (index_offset,) = INDEX_OFFSET.unpack_from(self._mm, HEADER.size)
+        self.index = [INDEX_ENTRY.unpack_from(self._mm, index_offset + i * INDEX_ENTRY.size)
+                      for i in range(chunks)]
+
+    def __len__(self):
+        return self.records
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _column(self, offset, size, dtype, count):
+        if self.codec == CODECS["raw"]:
+            return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+        data = _decompress(self.codec, self._mm[offset:offset + size])
+        return np.frombuffer(data, dtype=dtype, count=count)
+
+    def chunk(self, i):
+        """(pc_delta, target_delta, flags) column arrays of chunk i"""
+        offset, n, _first_pc, pc_size, target_size, flags_size = self.index[i]
+        pc_delta = self._column(offset, pc_size, "<i4", n)
+        offset += _align(pc_size)
+        target_delta = self._column(offset, target_size, "<i4", n)
+        offset += _align(target_size)
+        flags = self._column(offset, flags_size, np.uint8, n)
+        return pc_delta, target_delta, flags
+
+    def iter_chunks(self):
+        """Yield decoded (pc, target, taken, btype) arrays one chunk at a time
+
+        Memory stays bounded by the chunk size however long the trace is.
+        """
+        for i, entry in enumerate(self.index):
+            pc_delta, target_delta, flags = self.chunk(i)
+            first_pc = entry[2]
+            # PCs are a running sum of the deltas from the chunk's first PC
+            pcs = np.cumsum(pc_delta, dtype=np.int64)
+            pcs += first_pc
+            yield pcs, pcs + target_delta, (flags & 1).astype(bool), flags >> 1
+
+    def arrays(self):
+        """Whole-trace (pc, target, taken, btype) arrays"""
+        if not self.index:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty.astype(bool), empty.astype(np.uint8)
+        parts = list(zip(*self.iter_chunks()))
+        return tuple(np.concatenate(p) for p in parts)
+
+    def conditional(self):
+        """(pc, taken) arrays of conditional branches only"""
+        pcs, _targets, taken, btypes = self.arrays()
+        mask = btypes == DIRECT_COND
+        return pcs[mask], taken[mask]
+
+# --- Ingestion of gem5 Exec debug output -----------------------------------
+
+# e.g. "  1000: system.cpu: T0 : 0x10144 @main+12    : beq a5, a4, 28"
+#  or  "  1500: system.cpu: T0 : 0x10148 @main+16    : c_beqz a5, 12"
+EXEC_LINE = re.compile(
+    r":\s(?:T\d+\s:\s)?0x([0-9a-f]+)(?:\.(\d+))?\s+(?:@\S+\s*)?:\s+(\S+)\s*([^:]*)")
+
+COND_MNEMONICS = {"beq", "bne", "blt", "bge", "bltu", "bgeu",
+                  "beqz", "bnez", "blez", "bgez", "bltz", "bgtz",
+                  "bgt", "ble", "bgtu", "bleu", "c.beqz", "c.bnez"}
+LINK_REGISTERS = {"ra", "x1", "t0", "x5"}
+
+def normalize_mnemonic(mnemonic):
+    """c.beqz for both spellings of a compressed instruction: gem5's
+    disassembler writes c_beqz, objdump c.beqz"""
+    if mnemonic.startswith("c_"):
+        return "c." + mnemonic[2:]
+    return mnemonic
+
+def instruction_size(mnemonic):
+    """Bytes of an instruction: 2 for RVC (compressed), else 4"""
+    return 2 if normalize_mnemonic(mnemonic).startswith("c.") else 4
+
+def classify(mnemonic, operands):
+    """(branch type code, static target offset or None) for one instruction
+
+    Returns None for instructions that are not control flow.
+    """
+    mnemonic = normalize_mnemonic(mnemonic)
+    ops = [o.strip() for o in operands.replace("(", ",").replace(")", "").split(",") if o.strip()]
+
+    if mnemonic in COND_MNEMONICS:
+        return DIRECT_COND, _int_or_none(ops[-1]) if ops else None
+
+    if mnemonic in ("jal", "c.jal"):
+        rd = ops[0] if len(ops) > 1 else "ra"
+        kind = "CallDirect" if rd in LINK_REGISTERS else "DirectUncond"
+        return BRANCH_TYPE_CODES[kind], _int_or_none(ops[-1]) if ops else None
+
+    if mnemonic in ("j", "c.j"):
+        return BRANCH_TYPE_CODES["DirectUncond"], _int_or_none(ops[-1]) if ops else None
+
+    if mnemonic in ("ret",):
+        return BRANCH_TYPE_CODES["Return"], None
+
+    if mnemonic in ("jalr", "c.jalr", "c.jr", "jr"):
+        if mnemonic == "c.jalr":
+            return BRANCH_TYPE_CODES["CallIndirect"], None
+        if mnemonic in ("c.jr", "jr"):
+            rd, rs1 = "zero", ops[0] if ops else ""
+        else:
+            rd = ops[0] if ops else "zero"
+            regs = [o for o in ops[1:] if _int_or_none(o) is None]
+            rs1 = regs[0] if regs else ""
+        if rd in LINK_REGISTERS:
+            return BRANCH_TYPE_CODES["CallIndirect"], None
+        if rs1 in LINK_REGISTERS and rd in ("zero", "x0"):
+            return BRANCH_TYPE_CODES["Return"], None
+        return BRANCH_TYPE_CODES["IndirectUncond"], None
+
+    return None
+
+def _int_or_none(text):
+    try:
+        return int(text, 0)
+    except ValueError:
+        return None
+
+def parse_exec_trace(lines):
+    """Yield (pc, target, taken, btype) for every committed branch
+
+    Args:
+        lines: Iterable of gem5 Exec debug lines; anything else is skipped
+
+    Whether a branch was taken and where an indirect branch went are both
+    read off the PC of the next committed instruction.
+    """
+    pending = None  # (pc, size, btype, static_target)
+
+    for line in lines:
+        match = EXEC_LINE.search(line)
+        if match is None:
+            continue
+        pc_hex, micro, mnemonic, operands = match.groups()
+        if micro not in (None, "0"):
+            continue
+        pc = int(pc_hex, 16)
+
+        if pending is not None:
+            b_pc, b_size, b_type, b_target = pending
+            taken = pc != b_pc + b_size
+            if taken or b_target is None:
+                target = pc if taken else b_pc + b_size
+            else:
+                target = b_target
+            yield b_pc, target, taken, b_type
+            pending = None
+
+        info = classify(mnemonic, operands)
+        if info is not None:
+            btype, offset = info
+            size = instruction_size(mnemonic)
+            static_target = pc + offset if offset is not None else None
+            pending = (pc, size, btype, static_target)
+
+def ingest_exec_trace(lines, output_path, codec="zlib"):
+    """Convert gem5 Exec debug output into a .btrace file
+
+    Returns the number of branch records written.
+    """
+    with TraceWriter(output_path, codec=codec) as writer:
+        for record in parse_exec_trace(lines):
+            writer.append(*record)
+    return writer.records
+
+# --- Capture -----------------------------------------------------------------
+
+EXEC_DEBUG_FLAGS = "ExecEnable,ExecUser,ExecKernel"
+
+def trace_path_for(benchmark_path, trace_dir=TRACE_DIR):
+    """traces/<benchmark>-<binary hash>.btrace - one trace per binary"""
+    from result_cache import file_digest
+    benchmark_path = Path(benchmark_path)
+    return Path(trace_dir) / f"{benchmark_path.name}-{file_digest(benchmark_path)[:12]}.btrace"
+
+def capture_trace(gem5_bin, run_script, benchmark_path, output_path, codec="zlib",
+                  log_dir=None):
+    """Run gem5 on the atomic CPU and stream its Exec trace into a .btrace
+
+    gem5's debug output is read from a pipe and converted on the fly;
+    non-trace lines (program output, gem5 banners) go to stdout.txt in
+    log_dir.
+
+    Returns the number of branch records, or raises RuntimeError.
+    """
+    log_dir = Path(log_dir or Path(output_path).parent / "capture")
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    cmd = [
+        str(gem5_bin),
+        "--outdir", str(log_dir),
+        f"--debug-flags={EXEC_DEBUG_FLAGS}",
+        str(run_script),
+        "--binary", str(benchmark_path),
+        "--cpu-type", "atomic",
+    ]
+
+    with open(log_dir / "stdout.txt", "w") as other, \
+         open(log_dir / "stderr.txt", "w") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err,
+                                text=True, bufsize=1 << 20)
+
+        def exec_lines():
+            for line in proc.stdout:
+                if EXEC_LINE.search(line):
+                    yield line
+                else:
+                    other.write(line)
+
+        try:
+            records = ingest_exec_trace(exec_lines(), output_path, codec)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        returncode = proc.wait()
+
+    if returncode != 0:
+        Path(output_path).unlink(missing_ok=True)
+        raise RuntimeError(f"gem5 exited with {returncode}; see {log_dir}")
+    return records
+
+def print_info(path):
+    with TraceReader(path) as trace:
+        size = trace.path.stat().st_size
+        print(f"{trace.path}")
+        print(f"  Codec:    {CODEC_NAMES[trace.codec]}")
+        print(f"  Records:  {len(trace):,} in {len(trace.index)} chunk(s)")
+        print(f"  Size:     {size:,} bytes ({size / max(1, len(trace)):.2f} B/record)")
+
+        counts = np.zeros(len(BRANCH_TYPES), dtype=np.int64)
+        taken = 0
+        for _pcs, _targets, chunk_taken, btypes in trace.iter_chunks():
+            counts += np.bincount(btypes, minlength=len(BRANCH_TYPES))[:len(BRANCH_TYPES)]
+            taken += int(chunk_taken[btypes == DIRECT_COND].sum())
+
+        for code, name in enumerate(BRANCH_TYPES):
+            if counts[code]:
+                print(f"  {name:<15} {counts[code]:>12,}")
+        if counts[DIRECT_COND]:
+            print(f"  Cond taken rate: {taken / counts[DIRECT_COND] * 100:.2f}%")
+
+def main():
+    import run_all_experiments as runner
+
+    parser = argparse.ArgumentParser(description="Capture and inspect committed-branch traces")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    cap = sub.add_parser("capture", help="Capture traces with gem5 (once per binary)")
+    cap.add_argument("--benchmark", choices=runner.BENCHMARKS + ["all"], default="all")
+    cap.add_argument("--codec", choices=list(CODECS), default="zlib")
+    cap.add_argument("--trace-dir", type=Path, default=TRACE_DIR)
+    cap.add_argument("--force", action="store_true", help="Re-capture existing traces")
+
+    conv = sub.add_parser("convert", help="Convert saved gem5 Exec debug output")
+    conv.add_argument("exec_log", type=Path, help="gem5 Exec trace ('-' for stdin)")
+    conv.add_argument("output", type=Path)
+    conv.add_argument("--codec", choices=list(CODECS), default="zlib")
+
+    info = sub.add_parser("info", help="Summarize a trace")
+    info.add_argument("trace", type=Path)
+
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print_info(args.trace)
+        return
+
+    if args.command == "convert":
+        if str(args.exec_log) == "-":
+            records = ingest_exec_trace(sys.stdin, args.output, args.codec)
+        else:
+            with open(args.exec_log, errors="replace") as f:
+                records = ingest_exec_trace(f, args.output, args.codec)
+        print(f"✓ Wrote {records:,} branches to {args.output}")
+        return
+
+    if not runner.GEM5_BIN.exists():
+        print(f"gem5 binary not found at: {runner.GEM5_BIN}")
+        sys.exit(1)
+
+    benchmarks = runner.BENCHMARKS if args.benchmark == "all" else [args.benchmark]
+    for benchmark in benchmarks:
+        benchmark_path = runner.BENCHMARK_DIR / benchmark
+        output = trace_path_for(benchmark_path, args.trace_dir)
+        if output.exists() and not args.force:
+            print(f"✓ {benchmark}: already captured ({output.name})")
+            continue
+        print(f"Capturing {benchmark}...")
+        try:
+            records = capture_trace(runner.GEM5_BIN, runner.SRC_DIR / "run_branch_pred.py",
+                                    benchmark_path, output, args.codec,
+                                    args.trace_dir / "capture" / benchmark)
+        except RuntimeError as e:
+            print(f"✗ {benchmark}: {e}")
+            continue
+        print(f"✓ {benchmark}: {records:,} branches -> {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Compiler-variant builds of the benchmarks
+
+benchmarks/Makefile builds one binary per benchmark. Optimization level,
+if-conversion and -march extensions (e.g. Zicond conditional zeroing)
+all change which branches reach the predictor, so this script builds a
+benchmark x flag-set matrix. Flag sets are named in
+benchmarks/variants.json:
+
+    {"O2-noifcvt": {"cflags": ["-O2", "-march=rv64gc", "-fno-if-conversion"],
+                    "description": "..."}}
+
+Each variant of a benchmark becomes benchmarks/variants/<benchmark>.<variant>,
+e.g. bfs_riscv.O3. The flags the Makefile always passes (-mabi, -static,
+the ROI markers of roi.h) are added here as well. Builds run in parallel.
+A binary is rebuilt only when its inputs change: source, headers, flags,
+compiler or libm5. benchmarks/variants/manifest.json records every binary
+with its flags, compiler, input key and SHA-256.
+
+run_all_experiments.py --variant O2 O3 ... builds what is missing and
+runs every predictor on every variant.
+
+Usage:
+    python3 scripts/build_variants.py                 # every variant, every benchmark
+    python3 scripts/build_variants.py --variant O3 --variant O2-zicond -j 8
+    python3 scripts/build_variants.py --list          # manifest
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import file_digest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+BENCHMARK_DIR = PROJECT_ROOT / "benchmarks"
+VARIANTS_FILE = BENCHMARK_DIR / "variants.json"
+VARIANTS_DIR = BENCHMARK_DIR / "variants"
+MANIFEST_FILE = VARIANTS_DIR / "manifest.json"
+
+# Same toolchain and fixed flags as benchmarks/Makefile
+CC = "riscv64-unknown-elf-gcc"
+COMMON_FLAGS = ["-mabi=lp64d", "-static"]
+HEADERS = ["roi.h"]
+GEM5_DIR = PROJECT_ROOT / "gem5"
+M5_LIB = GEM5_DIR / "util" / "m5" / "build" / "riscv" / "out" / "libm5.a"
+
+BENCHMARKS = ["bfs_riscv", "factorial_riscv", "hash_lookup_riscv"]
+
+# Bump when the manifest layout or the build key changes
+MANIFEST_VERSION = 1
+
+def source_for(benchmark):
+    """bfs_riscv -> benchmarks/bfs.c"""
+    return BENCHMARK_DIR / (benchmark.replace("_riscv", "") + ".c")
+
+def variant_binary(variant, benchmark):
+    """benchmarks/variants/<benchmark>.<variant>"""
+    return VARIANTS_DIR / f"{benchmark}.{variant}"
+
+def load_variants(path=VARIANTS_FILE):
+    """{name: [cflags]} from variants.json"""
+    with open(path) as f:
+        spec = json.load(f)
+    variants = {}
+    for name, entry in spec.items():
+        if not name or "/" in name or name.startswith("."):
+            raise ValueError(f"Bad variant name: {name!r}")
+        flags = entry.get('cflags') if isinstance(entry, dict) else None
+        if not isinstance(flags, list) or not all(isinstance(f, str) for f in flags):
+            raise ValueError(f"Variant {name} needs a list of cflags")
+        variants[name] = flags
+    return variants
+
+def compiler_identity(cc=CC):
+    """`cc --version` and the driver's digest, or None if cc is missing"""
+    path = shutil.which(cc)
+    if path is None:
+        return None
+    try:
+        version = subprocess.run([path, "--version"], capture_output=True, text=True,
+                                 timeout=30).stdout.partition("\n")[0].strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return f"{version} ({file_digest(path)[:12]})"
+
+def build_flags(cflags, m5ops=True):
+    """Compile flags and link libraries of one variant"""
+    flags = list(cflags) + COMMON_FLAGS
+    libs = []
+    if m5ops:
+        flags += ["-DM5OPS", f"-I{GEM5_DIR / 'include'}"]
+        libs = [str(M5_LIB)]
+    return flags, libs
+
+def build_key(benchmark, cflags, compiler, m5ops=True):
+    """Digest of everything a variant binary is built from"""
+    inputs = {
+        'source': file_digest(source_for(benchmark)),
+        'headers': {h: file_digest(BENCHMARK_DIR / h) for h in HEADERS},
+        'flags': list(cflags) + COMMON_FLAGS,
+        'm5ops': m5ops,
+        'compiler': compiler,
+        'libm5': file_digest(M5_LIB) if m5ops else None,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def load_manifest(path=MANIFEST_FILE):
+    """{binary name: entry}, empty if missing or from another version"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('binaries', {})
+
+def save_manifest(binaries, path=MANIFEST_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".manifest-")
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'binaries': binaries}, f,
+                  indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def up_to_date(entry, binary, key):
+    """Whether a manifest entry still describes the binary on disk
+
+    key is None when the inputs cannot be checked (no compiler here);
+    then an intact binary is trusted as built.
+    """
+    if entry is None or not binary.exists():
+        return False
+    if key is not None and entry.get('inputs') != key:
+        return False
+    return entry.get('sha256') == file_digest(binary)
+
+def compile_variant(variant, benchmark, flags, libs, cc, compiler, key):
+    """Build one binary; returns (manifest entry, None) or (None, error)"""
+    binary = variant_binary(variant, benchmark)
+    binary.parent.mkdir(parents=True, exist_ok=True)
+    # Build beside the target and rename, so a failed or interrupted
+    # build never leaves a half-written binary under the real name
+    fd, tmp = tempfile.mkstemp(dir=binary.parent, prefix=f".{binary.name}-")
+    os.close(fd)
+    cmd = [cc] + flags + [str(source_for(benchmark)), "-o", tmp] + libs
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1:] or [f"exit {proc.returncode}"]
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, binary)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return {
+        'variant': variant,
+        'benchmark': benchmark,
+        'cflags': flags,
+        'libs': libs,
+        'compiler': compiler,
+        'inputs': key,
+        'sha256': file_digest(binary),
+    }, None
+
+def build_variants(variants, benchmarks=BENCHMARKS, jobs=None, cc=CC, force=False,
+                   m5ops=True, spec_path=VARIANTS_FILE, verbose=True):
+    """Build the missing or out-of-date variant binaries
+
+    Returns the names of the binaries that could not be built; without a
+    compiler those are the ones that do not exist yet.
+    """
+    spec = load_variants(spec_path)
+    unknown = [v for v in variants if v not in spec]
+    if unknown:
+        raise ValueError(f"Unknown variant(s): {', '.join(unknown)} "
+                         f"(defined: {', '.join(spec)})")
+
+    compiler = compiler_identity(cc)
+    if m5ops and not M5_LIB.exists() and compiler is not None:
+        raise FileNotFoundError(f"{M5_LIB} not found - build gem5's m5 library "
+                                f"(see benchmarks/Makefile) or pass --no-m5ops")
+
+    manifest = load_manifest()
+    todo, failed, skipped = [], [], 0
+    for variant in variants:
+        flags, libs = build_flags(spec[variant], m5ops)
+        for benchmark in benchmarks:
+            binary = variant_binary(variant, benchmark)
+            key = build_key(benchmark, spec[variant], compiler, m5ops) if compiler else None
+            if not force and up_to_date(manifest.get(binary.name), binary, key):
+                skipped += 1
+            elif compiler is None:
+                failed.append(binary.name)
+            else:
+                todo.append((variant, benchmark, flags, libs, cc, compiler, key))
+
+    if compiler is None:
+        if verbose:
+            print(f"⚠ {cc} not found: using the variant binaries already built")
+        return failed
+
+    if verbose:
+        print(f"Building {len(todo)} variant binaries ({skipped} up to date)")
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(todo) or 1))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        outcomes = list(pool.map(lambda job: compile_variant(*job), todo))
+
+    for job, (entry, error) in zip(todo, outcomes):
+        name = variant_binary(job[0], job[1]).name
+        if entry is None:
+            failed.append(name)
+            manifest.pop(name, None)
+            if verbose:
+                print(f"  ✗ {name}: {' '.join(error)}")
+        else:
+            manifest[name] = entry
+            if verbose:
+                print(f"  ✓ {name}")
+    if todo:
+        save_manifest(manifest)
+    return failed
+
+def print_manifest(binaries):
+    print(f"{'Binary':<32} {'SHA-256':<14} Flags")
+    print("-" * 90)
+    for name, entry in sorted(binaries.items()):
+        exists = "" if variant_binary(entry['variant'], entry['benchmark']).exists() else " (missing)"
+        print(f"{name:<32} {entry['sha256'][:12]:<14} {' '.join(entry['cflags'])}{exists}")
+    print(f"\n{len(binaries)} binaries in {MANIFEST_FILE}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the benchmarks once per compiler flag set")
+    parser.add_argument('--variant', action='append',
+                        help='Flag set from benchmarks/variants.json (repeatable, default: all)')
+    parser.add_argument('--benchmark', action='append', choices=BENCHMARKS,
+                        help='Benchmark to build (repeatable, default: all)')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Parallel compiler processes (default: one per core)')
+    parser.add_argument('--cc', default=CC, help=f'C compiler (default: {CC})')
+    parser.add_argument('--no-m5ops', action='store_true',
+                        help='Build without ROI markers, so libm5 is not needed')
+    parser.add_argument('--force', action='store_true', help='Rebuild up-to-date binaries too')
+    parser.add_argument('--list', action='store_true', help='Show the manifest and exit')
+
+    args = parser.parse_args()
+
+    if args.list:
+        print_manifest(load_manifest())
+        return
+
+    try:
+        variants = args.variant or list(load_variants())
+        failed = build_variants(variants, args.benchmark or BENCHMARKS, args.jobs,
+                                args.cc, args.force, not args.no_m5ops)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    if failed:
+        print(f"✗ {len(failed)} binaries not built: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✓ Variant binaries ready in {VARIANTS_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Append-only journal of an experiment campaign
+
+Every state change of every run is one JSON line, flushed and fsynced
+before the runner moves on, so the journal survives a crash, Ctrl-C or
+a killed runner:
+
+    {"event": "campaign", "runs": 9, "argv": [...], ...}
+    {"event": "run", "run": "<id>", "state": "queued", ...}
+    {"event": "run", "run": "<id>", "state": "started", ...}
+    {"event": "run", "run": "<id>", "state": "finished", "status": "success", ...}
+
+Records are only ever appended. A line torn by a crash mid-write is
+skipped when the journal is read back, and the latest record of a run
+is its state. run_all_experiments.py --resume uses that to re-run only
+the runs that never finished successfully.
+
+Usage:
+    python3 scripts/campaign_journal.py            # state of every run
+    python3 scripts/campaign_journal.py --pending  # only unfinished/failed runs
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+JOURNAL_FILE = PROJECT_ROOT / "results" / "journal.jsonl"
+
+# Final statuses that mean a run produced a result
+DONE_STATUSES = ('success', 'cached')
+
+class CampaignJournal:
+    """Append-only JSON-lines journal, safe to share between runner threads"""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # A crash mid-append leaves a line without its newline; terminate
+        # it so the next record does not get glued onto the torn one
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            if torn:
+                self._write([])
+
+    def _write(self, records):
+        """Append records with a single write, then fsync"""
+        blob = "".join(json.dumps(r, sort_keys=True) + "\n" for r in records)
+        if not records:
+            blob = "\n"
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, blob.encode())
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _run_record(self, run_id, experiment, state, **fields):
+        record = {
+            'time': time.time(),
+            'event': 'run',
+            'run': run_id,
+            'label': experiment['label'],
+            'benchmark': experiment['benchmark'],
+            'output_dir': str(experiment['output_dir']),
+            'state': state,
+        }
+        record.update(fields)
+        return record
+
+    def campaign(self, runs, argv=None):
+        """Start of a runner invocation, followed by a 'queued' per run
+
+        Args:
+            runs: list of (run_id, experiment) about to be executed
+        """
+        header = {
+            'time': time.time(),
+            'event': 'campaign',
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'argv': list(sys.argv if argv is None else argv),
+            'runs': len(runs),
+        }
+        self._write([header] + [self._run_record(run_id, experiment, 'queued')
+                                for run_id, experiment in runs])
+
+    def started(self, run_id, experiment):
+        self._write([self._run_record(run_id, experiment, 'started',
+                                      host=socket.gethostname(), pid=os.getpid())])
+
+    def finished(self, run_id, experiment, result):
+        fields = {
+            'status': result['status'],
+            'returncode': result['returncode'],
+            'elapsed': round(result['elapsed'], 1),
+        }
+        if result.get('error'):
+            fields['error'] = result['error']
+        self._write([self._run_record(run_id, experiment, 'finished', **fields)])
+
+def read_journal(path=JOURNAL_FILE):
+    """Every intact record in the journal, oldest first"""
+    records = []
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn by a crash mid-append, or blank
+                if isinstance(record, dict):
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+def run_states(path=JOURNAL_FILE):
+    """{run id: latest record of that run}"""
+    states = {}
+    for record in read_journal(path):
+        if record.get('event') == 'run':
+            states[record['run']] = record
+    return states
+
+def finished_runs(path=JOURNAL_FILE):
+    """Ids of runs whose latest record is a successful finish"""
+    return {run_id for run_id, record in run_states(path).items()
+            if record['state'] == 'finished' and record.get('status') in DONE_STATUSES}
+
+def describe_state(record):
+    if record['state'] != 'finished':
+        return record['state']
+    status = record.get('status')
+    if record.get('error'):
+        return f"{status} ({record['error']})"
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the campaign journal")
+    parser.add_argument('--journal', type=Path, default=JOURNAL_FILE,
+                        help=f'Journal file (default: {JOURNAL_FILE})')
+    parser.add_argument('--pending', action='store_true',
+                        help='Only list runs that did not finish successfully')
+
+    args = parser.parse_args()
+
+    records = read_journal(args.journal)
+    if not records:
+        print(f"No journal at {args.journal}")
+        return
+
+    campaigns = [r for r in records if r.get('event') == 'campaign']
+    states = run_states(args.journal)
+    done = finished_runs(args.journal)
+
+    print(f"{'Label':<24} {'Benchmark':<20} State")
+    print("-" * 70)
+    for run_id, record in states.items():
+        if args.pending and run_id in done:
+            continue
+        print(f"{record['label']:<24} {record['benchmark']:<20} {describe_state(record)}")
+    print("-" * 70)
+    last = time.strftime('%Y-%m-%d %H:%M', time.localtime(campaigns[-1]['time'])) if campaigns else "?"
+    print(f"{len(done)}/{len(states)} run(s) finished over {len(campaigns)} campaign(s), "
+          f"last started {last}")
+    if len(done) < len(states):
+        print("  Re-run the rest: repeat the campaign's command with --resume")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Single-pass parser for gem5 stats.txt files
+
+Every stat line becomes a typed record:
+
+    scalar        simTicks                          265980000   # ... (Tick)
+    vector        branchPred.lookups_0::DirectCond  3401  74.80%  89.51% # ...
+    distribution  dram.bytesPerActivate::0-127      17     3.62%   3.62% # ...
+
+Records are addressed by their full dotted path, e.g.
+tree['system.cpu.branchPred.lookups_0::DirectCond'].value. Vector and
+distribution buckets are grouped under their base name via tree.group().
+
+The last dump is read once. Looking up a stat by path is a str.find()
+for its line in the dump text, and the typed record is only built when a
+record (not just a value) is asked for. Pulling a handful of metrics out
+of a file therefore never touches the other ~600 lines in Python. The
+full name -> line index is built on first use, by the calls that walk
+every stat (iteration, names(), group(), children(), as_dict()).
+"""
+
+import math
+from array import array
+from pathlib import Path
+
+BEGIN_MARKER = "---------- Begin Simulation Statistics ----------"
+END_MARKER = "---------- End Simulation Statistics"
+
+# Bucket names that only appear on distributions/histograms
+DIST_BUCKETS = {
+    'samples', 'mean', 'gmean', 'stdev', 'underflows', 'overflows',
+    'min_value', 'max_value',
+}
+
+SCALAR = 'scalar'
+VECTOR = 'vector'
+DISTRIBUTION = 'distribution'
+
+class StatRecord:
+    """One line of a stats dump"""
+
+    __slots__ = ('name', 'base', 'bucket', 'kind', 'value', 'pct',
+                 'cum_pct', 'unit')
+
+    def __init__(self, name, base, bucket, kind, value, pct, cum_pct, unit):
+        self.name = name
+        self.base = base
+        self.bucket = bucket
+        self.kind = kind
+        self.value = value
+        self.pct = pct
+        self.cum_pct = cum_pct
+        self.unit = unit
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return f"StatRecord({self.name}={self.value!r}, kind={self.kind})"
+
+def parse_number(text):
+    """Parse a gem5 stat value: int when exact, else float (nan/inf ok)"""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        # gem5 prints e.g. "-nan" for 0/0 formulas
+        return math.nan
+
+def _parse_pct(text):
+    return parse_number(text[:-1]) if text.endswith('%') else None
+
+def _parse_unit(comment):
+    """Extract the trailing "(Unit)" from a stat description
+
+    Units may themselves be parenthesised, e.g. "((Tick/Second))".
+    """
+    comment = comment.rstrip()
+    if not comment.endswith(')'):
+        return None
+    depth = 0
+    for i in range(len(comment) - 1, -1, -1):
+        ch = comment[i]
+        if ch == ')':
+            depth += 1
+        elif ch == '(':
+            depth -= 1
+            if depth == 0:
+                unit = comment[i + 1:-1]
+                if unit.startswith('(') and unit.endswith(')'):
+                    unit = unit[1:-1]
+                return unit
+    return None
+
+def parse_line(line, kind=None):
+    """Turn one stats line into a StatRecord (or None for non-stat lines)"""
+    body, _, comment = line.partition('#')
+    fields = body.split()
+    if len(fields) < 2 or fields[0].startswith('-'):
+        return None
+
+    name = fields[0]
+    base, sep, bucket = name.partition('::')
+    if not sep:
+        bucket = None
+
+    pct = cum_pct = None
+    if len(fields) >= 4:
+        pct = _parse_pct(fields[2])
+        cum_pct = _parse_pct(fields[3])
+
+    if kind is None:
+        if bucket is None:
+            kind = SCALAR
+        elif bucket in DIST_BUCKETS:
+            kind = DISTRIBUTION
+        else:
+            kind = VECTOR
+
+    return StatRecord(name, base, bucket, kind, parse_number(fields[1]),
+                      pct, cum_pct, _parse_unit(comment))
+
+def _index_lines(text):
+    """name -> raw line for every stat line, in file order"""
+    index = {line.partition(' ')[0]: line for line in text.split('\n')}
+    # Blank lines and the Begin/End banners are not stats
+    index.pop('', None)
+    index.pop('----------', None)
+    return index
+
+class StatTree:
+    """All stats of one dump, addressable by dotted path"""
+
+    def __init__(self, text, end=None):
+        # Lookups stop at `end`, so the End banner and anything after it
+        # need not be cut off (and the dump copied) first
+        self._text = text
+        self._end = len(text) if end is None else end
+        self._index = None
+        self._records = {}
+        self._groups = None
+
+    @property
+    def _lines(self):
+        """name -> raw line for every stat, built on first use"""
+        if self._index is None:
+            self._index = _index_lines(self._text[:self._end])
+        return self._index
+
+    def _line(self, path):
+        """Raw line of one stat, or None if it is not in the dump"""
+        if self._index is not None:
+            return self._index.get(path)
+        text = self._text
+        key = path + ' '
+        if text.startswith(key):
+            start = 0
+        else:
+            start = text.find('\n' + key, 0, self._end) + 1
+            if not start:
+                return None
+        end = text.find('\n', start, self._end)
+        return text[start:end] if end >= 0 else text[start:self._end]
+
+    def __contains__(self, path):
+        return self._line(path) is not None
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __getitem__(self, path):
+        record = self._records.get(path)
+        if record is None:
+            line = self._line(path)
+            if line is None:
+                raise KeyError(path)
+            record = parse_line(line, self._kind_of(path))
+            self._records[path] = record
+        return record
+
+    def __iter__(self):
+        """Records in file order"""
+        for path in self._lines:
+            yield self[path]
+
+    def names(self):
+        return list(self._lines)
+
+    def get(self, path, default=None):
+        if path not in self:
+            return default
+        return self[path]
+
+    def value(self, path, default=None):
+        """Value of a stat, or default if it is not in the dump"""
+        record = self._records.get(path)
+        if record is not None:
+            return record.value
+        line = self._line(path)
+        if line is None:
+            return default
+        # Fast path: only the value field, no full record
+        return parse_number(line.split(None, 2)[1])
+
+    def first_value(self, paths, default=None):
+        """Value of the first stat in `paths` present in the dump"""
+        for path in paths:
+            record = self._records.get(path)
+            if record is not None:
+                return record.value
+            line = self._line(path)
+            if line is not None:
+                return parse_number(line.split(None, 2)[1])
+        return default
+
+    def group(self, base):
+        """{bucket: record} for a vector or distribution stat"""
+        buckets = self._bucket_index().get(base, ())
+        return {bucket: self[f"{base}::{bucket}"] for bucket in buckets}
+
+    def children(self, prefix):
+        """Records whose dotted path lies under `prefix`"""
+        prefix = prefix.rstrip('.') + '.'
+        return [self[path] for path in self._lines if path.startswith(prefix)]
+
+    def as_dict(self):
+        """Flat {path: value} view of the whole dump"""
+        return {path: self[path].value for path in self._lines}
+
+    def _bucket_index(self):
+        if self._groups is None:
+            groups = {}
+            for path in self._lines:
+                base, sep, bucket = path.partition('::')
+                if sep:
+                    groups.setdefault(base, []).append(bucket)
+            self._groups = groups
+        return self._groups
+
+    def _kind_of(self, path):
+        base, sep, _ = path.partition('::')
+        if not sep:
+            return SCALAR
+        buckets = self._bucket_index().get(base, ())
+        if any(b in DIST_BUCKETS for b in buckets):
+            return DISTRIBUTION
+        return VECTOR
+
+def _read_last_dump(stats_path, chunk_size=1 << 20):
+    """Text of the last stats dump in a file, from its Begin banner on
+
+    Periodic dumps append one block per interval, so the file can run to
+    hundreds of MB; read backwards from the end until the last Begin
+    banner instead of loading everything. Raises FileNotFoundError.
+    """
+    with open(stats_path, 'rb') as f:
+        f.seek(0, 2)
+        pos = f.tell()
+        data = b''
+        marker = BEGIN_MARKER.encode()
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            start = data.rfind(marker)
+            if start >= 0:
+                return data[start:].decode()
+    return data.decode()
+
+def parse_stats_tree(stats_path):
+    """Parse the final stats dump in a stats.txt into a StatTree
+
+    For a normal run there is a single dump. With periodic dumps the last
+    block is the one gem5 writes at exit, which holds whole-program totals.
+
+    Returns None if the file does not exist.
+    """
+    try:
+        text = _read_last_dump(stats_path)
+    except FileNotFoundError:
+        return None
+    return _dump_tree(text)
+
+def parse_stats_text(text):
+    """StatTree of the last dump in stats.txt contents already in memory
+    (e.g. read from a run archive)"""
+    start = text.rfind(BEGIN_MARKER)
+    if start > 0:
+        text = text[start:]
+    return _dump_tree(text)
+
+def _dump_tree(text):
+    """StatTree of text holding a single dump"""
+    # Only one dump is left, so its End banner is the last one
+    end = text.rfind(END_MARKER)
+    return StatTree(text, end if end >= 0 else None)
+
+class StatsTimeline:
+    """Selected stats across every dump in a file, one array per series
+
+    timeline['sim_ticks'][i] is the value of that series in dump i; a
+    series missing from a dump reads as nan.
+    """
+
+    def __init__(self, series):
+        self.series = list(series)
+        self.columns = {key: array('d') for key in self.series}
+
+    def __len__(self):
+        return len(self.columns[self.series[0]]) if self.series else 0
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def append(self, values):
+        for key in self.series:
+            self.columns[key].append(values.get(key, math.nan))
+
+def parse_stats_timeline(stats_path, series):
+    """Stream every dump in a stats.txt into a StatsTimeline
+
+    Args:
+        stats_path: Path to stats.txt
+        series: {key: [candidate stat paths]}, first present path wins
+
+    Lines are streamed one at a time and only the requested stats are
+    kept, so memory stays constant regardless of file size.
+    """
+    stats_path = Path(stats_path)
+    if not stats_path.exists():
+        return None
+
+    with open(stats_path) as f:
+        return stream_stats_timeline(f, series)
+
+def stream_stats_timeline(lines, series):
+    """parse_stats_timeline over any iterable of stats.txt lines"""
+    # stat path -> (series key, candidate rank)
+    wanted = {}
+    for key, paths in series.items():
+        for rank, path in enumerate(paths):
+            wanted[path] = (key, rank)
+
+    timeline = StatsTimeline(series)
+    values, ranks = {}, {}
+    in_dump = False
+
+    for line in lines:
+        name = line.partition(' ')[0]
+        if name == '----------':
+            if in_dump:
+                timeline.append(values)
+                values, ranks = {}, {}
+            in_dump = BEGIN_MARKER in line
+            continue
+
+        hit = wanted.get(name)
+        if hit is None:
+            continue
+        key, rank = hit
+        if rank < ranks.get(key, len(wanted)):
+            values[key] = parse_number(line.split(None, 2)[1])
+            ranks[key] = rank
+
+    return timeline
@@ -1,120 +1,298 @@
 #!/usr/bin/env python3
 """
 Generate comparison graphs for branch predictor performance
+
+Every chart is described by a spec (CHARTS below, or a JSON list given
+with --charts). The data behind each chart is hashed together with its
+spec; charts whose hash matches the last render are skipped, the rest
+are rendered in parallel worker processes. A timeline chart is hashed
+from the size and mtime (or archived content hash) of its runs'
+stats.txt, so only the runs behind stale timelines are parsed.
+
+Bar chart spec keys:
+    name     output file stem (docs/graphs/<name>.png)
+    metric   results.json metric to plot
+    title, ylabel
+    scale    multiply values by this (e.g. 0.001 for thousands)
+    facet    "auto" (default), true or false: one panel per benchmark
+             instead of grouped bars, for many benchmarks or labels
 """
 
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")  # No display in worker processes or on servers
 import matplotlib.pyplot as plt
 import numpy as np
-from pathlib import Path
-import json
+
+from parse_results import timeline_sources, load_timelines
 
 # Load results
 PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 RESULTS_FILE = PROJECT_ROOT / "results" / "analysis" / "results.json"
 OUTPUT_DIR = PROJECT_ROOT / "docs" / "graphs"
 
+# Input hash of every rendered chart, to skip unchanged ones
+RENDER_CACHE = PROJECT_ROOT / ".cache" / "graph_hashes.json"
+
+# Bump when the drawing code changes so every chart is redrawn
+RENDER_VERSION = 1
+
+DPI = 300
+
+# Grouped bars stay readable up to this many benchmarks x labels
+FACET_THRESHOLD = 24
+
+CHARTS = [
+    {'name': 'ipc_comparison', 'metric': 'ipc',
+     'title': 'Branch Predictor IPC Comparison',
+     'ylabel': 'IPC (Instructions Per Cycle)'},
+    {'name': 'mispred_comparison', 'metric': 'mispredict_rate',
+     'title': 'Branch Predictor Misprediction Rates',
+     'ylabel': 'Misprediction Rate (%)'},
+    {'name': 'cycles_comparison', 'metric': 'num_cycles', 'scale': 0.001,
+     'title': 'Execution Cycles Comparison',
+     'ylabel': 'Cycles (thousands)'},
+]
+
 def load_results():
     """Load results from JSON"""
     with open(RESULTS_FILE, 'r') as f:
         return json.load(f)
 
-def plot_ipc_comparison(results):
-    """Generate IPC comparison bar chart"""
-    benchmarks = sorted(set(bm for pred_data in results.values() for bm in pred_data.keys()))
-    predictors = sorted(results.keys())
-    
-    x = np.arange(len(benchmarks))
-    width = 0.25
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    for i, predictor in enumerate(predictors):
-        ipcs = [results[predictor].get(bm, {}).get('ipc', 0) for bm in benchmarks]
-        ax.bar(x + i * width, ipcs, width, label=predictor.capitalize())
-    
-    ax.set_xlabel('Benchmark', fontsize=12)
-    ax.set_ylabel('IPC (Instructions Per Cycle)', fontsize=12)
-    ax.set_title('Branch Predictor IPC Comparison', fontsize=14, fontweight='bold')
-    ax.set_xticks(x + width)
-    ax.set_xticklabels([bm.upper() for bm in benchmarks])
-    ax.legend()
-    ax.grid(axis='y', alpha=0.3)
-    
-    plt.tight_layout()
-    output_path = OUTPUT_DIR / "ipc_comparison.png"
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"✓ Saved: {output_path}")
-    plt.close()
-
-def plot_mispred_comparison(results):
-    """Generate misprediction rate comparison bar chart"""
-    benchmarks = sorted(set(bm for pred_data in results.values() for bm in pred_data.keys()))
-    predictors = sorted(results.keys())
-    
-    x = np.arange(len(benchmarks))
-    width = 0.25
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    for i, predictor in enumerate(predictors):
-        mispreds = [results[predictor].get(bm, {}).get('mispredict_rate', 0) for bm in benchmarks]
-        ax.bar(x + i * width, mispreds, width, label=predictor.capitalize())
-    
-    ax.set_xlabel('Benchmark', fontsize=12)
-    ax.set_ylabel('Misprediction Rate (%)', fontsize=12)
-    ax.set_title('Branch Predictor Misprediction Rates', fontsize=14, fontweight='bold')
-    ax.set_xticks(x + width)
-    ax.set_xticklabels([bm.upper() for bm in benchmarks])
-    ax.legend()
-    ax.grid(axis='y', alpha=0.3)
-    
-    plt.tight_layout()
-    output_path = OUTPUT_DIR / "mispred_comparison.png"
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"✓ Saved: {output_path}")
-    plt.close()
-
-def plot_cycles_comparison(results):
-    """Generate cycle count comparison"""
-    benchmarks = sorted(set(bm for pred_data in results.values() for bm in pred_data.keys()))
-    predictors = sorted(results.keys())
-    
-    x = np.arange(len(benchmarks))
-    width = 0.25
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    for i, predictor in enumerate(predictors):
-        cycles = [results[predictor].get(bm, {}).get('num_cycles', 0) / 1000 for bm in benchmarks]
-        ax.bar(x + i * width, cycles, width, label=predictor.capitalize())
-    
-    ax.set_xlabel('Benchmark', fontsize=12)
-    ax.set_ylabel('Cycles (thousands)', fontsize=12)
-    ax.set_title('Execution Cycles Comparison', fontsize=14, fontweight='bold')
-    ax.set_xticks(x + width)
-    ax.set_xticklabels([bm.upper() for bm in benchmarks])
-    ax.legend()
-    ax.grid(axis='y', alpha=0.3)
-    
-    plt.tight_layout()
-    output_path = OUTPUT_DIR / "cycles_comparison.png"
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"✓ Saved: {output_path}")
-    plt.close()
+def bar_data(results, spec):
+    """{label: {benchmark: value}} for one metric, in a stable order"""
+    scale = spec.get('scale', 1)
+    data = {}
+    for label in sorted(results):
+        data[label] = {bm: (stats.get(spec['metric']) or 0) * scale
+                       for bm, stats in sorted(results[label].items())}
+    return data
+
+def plan_charts(results, sources, charts=CHARTS):
+    """One render job per chart: (kind, output path, spec, data)
+
+    A timeline job's data is the {predictor: signature} of its candidate
+    runs (parse_results.timeline_sources) until load_timeline_jobs()
+    replaces it with their intervals.
+    """
+    jobs = []
+    for spec in charts:
+        jobs.append(('bar', OUTPUT_DIR / f"{spec['name']}.png", spec, bar_data(results, spec)))
+
+    for benchmark, runs in sorted(sources.items()):
+        jobs.append(('timeline', OUTPUT_DIR / f"timeline_{benchmark}.png",
+                     {'benchmark': benchmark}, dict(sorted(runs.items()))))
+    return jobs
+
+def load_timeline_jobs(jobs):
+    """Parse the runs behind the given timeline jobs, in one pass
+
+    Returns the jobs with their intervals as data; a job none of whose
+    runs dumped stats periodically gets empty data and draws no chart.
+    """
+    runs = [(predictor, job[2]['benchmark']) for job in jobs if job[0] == 'timeline'
+            for predictor in job[3]]
+    timelines = load_timelines(runs)
+
+    loaded = []
+    for kind, output_path, spec, data in jobs:
+        if kind == 'timeline':
+            runs = {predictor: timelines[(predictor, spec['benchmark'])] for predictor in data
+                    if (predictor, spec['benchmark']) in timelines}
+            data = {predictor: {key: list(values) for key, values in intervals.items()}
+                    for predictor, intervals in runs.items()}
+        loaded.append((kind, output_path, spec, data))
+    return loaded
+
+def job_hash(job, dpi):
+    kind, output_path, spec, data = job
+    blob = json.dumps([RENDER_VERSION, dpi, kind, spec, data], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _finish(fig, output_path, dpi):
+    if fig.get_layout_engine() is None:
+        fig.tight_layout()
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+def plot_bars(output_path, spec, data, dpi=DPI):
+    """Grouped bars per benchmark, or one panel per benchmark when faceted"""
+    labels = list(data)
+    benchmarks = sorted({bm for values in data.values() for bm in values})
+
+    facet = spec.get('facet', 'auto')
+    if facet == 'auto':
+        facet = len(benchmarks) * len(labels) > FACET_THRESHOLD
+
+    if not facet:
+        x = np.arange(len(benchmarks))
+        width = 0.8 / max(1, len(labels))
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for i, label in enumerate(labels):
+            values = [data[label].get(bm, 0) for bm in benchmarks]
+            ax.bar(x + i * width, values, width, label=label.capitalize())
+
+        ax.set_xlabel('Benchmark', fontsize=12)
+        ax.set_ylabel(spec['ylabel'], fontsize=12)
+        ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+        ax.set_xticks(x + width * (len(labels) - 1) / 2)
+        ax.set_xticklabels([bm.upper() for bm in benchmarks])
+        ax.legend()
+        ax.grid(axis='y', alpha=0.3)
+        _finish(fig, output_path, dpi)
+        return
+
+    # Small multiples: one panel per benchmark, one bar per label
+    cols = int(np.ceil(np.sqrt(len(benchmarks))))
+    rows = int(np.ceil(len(benchmarks) / cols))
+    bar_height = 0.25
+    panel_height = max(2.5, bar_height * len(labels) + 1)
+    fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, panel_height * rows),
+                             squeeze=False, layout='constrained')
+
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    predictors = sorted({label.partition('@')[0] for label in labels})
+    for ax, benchmark in zip(axes.flat, benchmarks):
+        present = [label for label in labels if benchmark in data[label]]
+        values = [data[label][benchmark] for label in present]
+        y = np.arange(len(present))
+        ax.barh(y, values, color=[colors[predictors.index(label.partition('@')[0]) % len(colors)]
+                                  for label in present])
+        ax.set_yticks(y)
+        ax.set_yticklabels(present, fontsize=8)
+        ax.invert_yaxis()
+        ax.set_title(benchmark.upper(), fontsize=11)
+        ax.grid(axis='x', alpha=0.3)
+
+    for ax in list(axes.flat)[len(benchmarks):]:
+        ax.set_visible(False)
+    for ax in axes[-1]:
+        ax.set_xlabel(spec['ylabel'], fontsize=10)
+
+    fig.suptitle(spec['title'], fontsize=14, fontweight='bold')
+    _finish(fig, output_path, dpi)
+
+def plot_timeline(output_path, spec, runs, dpi=DPI):
+    """Per-interval misprediction rate and IPC for one benchmark
+
+    Args:
+        runs: {predictor: intervals} as returned by parse_results.parse_timeline
+    """
+    benchmark = spec['benchmark']
+    fig, (ax_mispred, ax_ipc) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+
+    for predictor, intervals in sorted(runs.items()):
+        # Plot against committed instructions so runs of different speed line up
+        x = np.cumsum(np.asarray(intervals['insts'])) / 1000
+        ax_mispred.plot(x, intervals['mispredict_rate'], marker='.',
+                        label=predictor.capitalize())
+        ax_ipc.plot(x, intervals['ipc'], marker='.', label=predictor.capitalize())
+
+    ax_mispred.set_ylabel('Misprediction Rate (%)', fontsize=12)
+    ax_mispred.set_title(f'{benchmark.upper()} Per-Interval Behavior',
+                         fontsize=14, fontweight='bold')
+    ax_mispred.legend()
+    ax_mispred.grid(alpha=0.3)
+
+    ax_ipc.set_xlabel('Instructions committed (thousands)', fontsize=12)
+    ax_ipc.set_ylabel('IPC', fontsize=12)
+    ax_ipc.grid(alpha=0.3)
+    _finish(fig, output_path, dpi)
+
+RENDERERS = {'bar': plot_bars, 'timeline': plot_timeline}
+
+def render_chart(job, dpi=DPI):
+    """Worker entry point: draw one chart and return its path"""
+    kind, output_path, spec, data = job
+    RENDERERS[kind](output_path, spec, data, dpi)
+    return output_path
+
+def load_render_cache():
+    try:
+        with open(RENDER_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_render_cache(hashes):
+    RENDER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = RENDER_CACHE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(hashes, indent=2, sort_keys=True))
+    os.replace(tmp, RENDER_CACHE)
+
+def render_all(jobs, workers=None, dpi=DPI, force=False):
+    """Render the jobs whose input changed; returns (rendered, skipped)"""
+    hashes = load_render_cache()
+    stale = []
+    for job in jobs:
+        output_path = job[1]
+        digest = job_hash(job, dpi)
+        cached = hashes.get(str(output_path))
+        # A timeline with no periodic runs has no file; its hash is kept as "empty:<hash>"
+        if not force and (cached == f"empty:{digest}" or
+                          cached == digest and output_path.exists()):
+            continue
+        stale.append((job, digest))
+
+    pending = []
+    for job, (_, digest) in zip(load_timeline_jobs([job for job, _ in stale]), stale):
+        if job[0] == 'timeline' and not job[3]:
+            hashes[str(job[1])] = f"empty:{digest}"
+        else:
+            pending.append((job, digest))
+
+    if len(pending) <= 1 or workers == 1:
+        for job, digest in pending:
+            print(f"✓ Saved: {render_chart(job, dpi)}")
+            hashes[str(job[1])] = digest
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_chart, job, dpi): (job, digest)
+                       for job, digest in pending}
+            for future in as_completed(futures):
+                job, digest = futures[future]
+                print(f"✓ Saved: {future.result()}")
+                hashes[str(job[1])] = digest
+
+    save_render_cache(hashes)
+    return len(pending), len(jobs) - len(stale)
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate comparison graphs")
+    parser.add_argument('--charts', type=Path,
+                        help='JSON list of bar chart specs (default: the built-in charts)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('--dpi', type=int, default=DPI, help=f'Resolution (default: {DPI})')
+    parser.add_argument('--force', action='store_true',
+                        help='Redraw every chart, even if its data is unchanged')
+
+    args = parser.parse_args()
+
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
+
     print("Generating performance comparison graphs...")
-    
+
     results = load_results()
-    
-    plot_ipc_comparison(results)
-    plot_mispred_comparison(results)
-    plot_cycles_comparison(results)
-    
-    print("\n✓ All graphs generated successfully")
+    charts = CHARTS
+    if args.charts:
+        with open(args.charts) as f:
+            charts = json.load(f)
+
+    # Only runs made with --stats-period have more than one interval;
+    # which ones is only known once a stale timeline's runs are parsed
+    jobs = plan_charts(results, timeline_sources(), charts)
+    rendered, skipped = render_all(jobs, args.jobs, args.dpi, args.force)
+
+    print(f"\n✓ {rendered} graph(s) rendered, {skipped} unchanged")
     print(f"   Location: {OUTPUT_DIR}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
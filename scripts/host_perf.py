@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Simulator host-performance telemetry
+
+Every gem5 run the runner finishes is appended to an SQLite history
+(results/analysis/telemetry.db). Each row holds gem5's own host stats
+(hostSeconds, hostInstRate, hostTickRate, hostMemory), the runner's
+wall-clock time and the child's peak RSS. It also records which machine,
+gem5 build and simulation config produced the run. Rows are never
+replaced, so the history survives rebuilds and re-runs.
+
+The report compares runs of the same benchmark, predictor and workload
+on the same host. A --multi run shares one gem5 process between
+several predictors, so each of its samples holds the whole process's
+wall time and peak RSS. Its workload carries a " multi=<predictors>"
+tag (multi_workload) so it is only ever compared with runs of the same
+group. It sets the latest (gem5 build, config) version
+against the version before it and flags throughput drops beyond a
+threshold.
+
+Usage:
+    python3 scripts/host_perf.py                  # regression report
+    python3 scripts/host_perf.py --ingest         # backfill from results/
+    python3 scripts/host_perf.py --history bfs    # samples for one benchmark
+"""
+
+import sys
+import time
+import socket
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from statistics import median
+
+from gem5_stats import parse_stats_tree
+from result_cache import file_digest, run_complete
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+RESULTS_DIR = PROJECT_ROOT / "results"
+TELEMETRY_DB = RESULTS_DIR / "analysis" / "telemetry.db"
+
+# Telemetry columns taken from stats.txt
+HOST_STATS = {
+    'host_seconds': 'hostSeconds',
+    'host_inst_rate': 'hostInstRate',
+    'host_tick_rate': 'hostTickRate',
+    'host_memory': 'hostMemory',
+    'sim_insts': 'simInsts',
+}
+
+# Throughput metrics the report can compare (higher is better)
+RATE_METRICS = ('host_inst_rate', 'host_tick_rate', 'wall_inst_rate')
+
+# Relative drop that counts as a regression
+REGRESSION_THRESHOLD = 0.20
+
+# Marks the workload of samples from a shared multi-predictor process
+MULTI_TAG = " multi="
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    run_dir TEXT NOT NULL,
+    label TEXT NOT NULL,
+    predictor TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    host TEXT NOT NULL,
+    gem5_build TEXT,
+    config TEXT,
+    wall_seconds REAL,
+    peak_rss INTEGER,
+    host_seconds REAL,
+    host_inst_rate REAL,
+    host_tick_rate REAL,
+    host_memory REAL,
+    sim_insts REAL,
+    UNIQUE (run_dir, finished_at)
+);
+CREATE INDEX IF NOT EXISTS samples_group ON samples(benchmark, label, workload, host);
+"""
+
+def open_telemetry(db_path=TELEMETRY_DB):
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Parallel runner threads each record through their own connection
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def build_identity(gem5_bin, sources):
+    """Short digests of the gem5 binary and of the simulation scripts
+
+    Either changing is a new "version" for the regression report.
+    """
+    gem5_build = file_digest(gem5_bin)[:12] if Path(gem5_bin).exists() else None
+    h = hashlib.sha256()
+    for path in sources:
+        path = Path(path)
+        if path.exists():
+            h.update(path.name.encode())
+            h.update(file_digest(path).encode())
+    return gem5_build, h.hexdigest()[:12]
+
+def record_run(run_dir, label, predictor, benchmark, workload="",
+               wall_seconds=None, peak_rss=None, gem5_build=None, config=None,
+               db_path=TELEMETRY_DB):
+    """Append one finished run to the telemetry history
+
+    Returns whether a sample was added: False if the run has no
+    readable stats.txt or this stats.txt was recorded before.
+    """
+    stats_path = Path(run_dir) / "stats.txt"
+    tree = parse_stats_tree(stats_path)
+    if tree is None:
+        return False
+
+    row = {key: tree.value(name) for key, name in HOST_STATS.items()}
+    row.update(
+        recorded_at=time.time(),
+        finished_at=stats_path.stat().st_mtime,
+        run_dir=str(run_dir),
+        label=label,
+        predictor=predictor,
+        benchmark=benchmark,
+        workload=workload,
+        host=socket.gethostname(),
+        gem5_build=gem5_build,
+        config=config,
+        wall_seconds=wall_seconds,
+        peak_rss=peak_rss,
+    )
+
+    columns = ", ".join(row)
+    marks = ", ".join("?" for _ in row)
+    conn = open_telemetry(db_path)
+    try:
+        with conn:
+            cur = conn.execute(f"INSERT OR IGNORE INTO samples ({columns}) VALUES ({marks})",
+                               list(row.values()))
+    finally:
+        conn.close()
+    return cur.rowcount > 0
+
+def ingest_results(results_dir=RESULTS_DIR, db_path=TELEMETRY_DB):
+    """Backfill telemetry from finished runs under results/
+
+    The gem5 build and config that produced old runs are unknown, so
+    they are left empty; only the runner records them.
+    """
+    added = 0
+    for stats_path in sorted(results_dir.glob("*/*/stats.txt")):
+        run_dir = stats_path.parent
+        if run_dir.parent.name == "analysis" or not run_complete(run_dir):
+            continue
+        label = run_dir.parent.name
+        if record_run(run_dir, label, label.partition('@')[0], run_dir.name,
+                      db_path=db_path):
+            added += 1
+    return added
+
+def multi_workload(workload, predictors):
+    """Workload key of the predictors of one shared gem5 process"""
+    return f"{workload}{MULTI_TAG}{','.join(sorted(predictors))}"
+
+def is_multi(workload):
+    return MULTI_TAG in workload
+
+def _metric(row, metric):
+    if metric == 'wall_inst_rate':
+        if row['sim_insts'] and row['wall_seconds']:
+            return row['sim_insts'] / row['wall_seconds']
+        return None
+    return row[metric]
+
+def find_regressions(conn, metric='host_inst_rate', threshold=REGRESSION_THRESHOLD,
+                     benchmarks=None):
+    """Compare the latest version of every run group with the one before it
+
+    Returns one dict per group that has two versions: the medians of the
+    metric under both, the relative change and whether it regressed.
+    """
+    rows = conn.execute(
+        "SELECT * FROM samples ORDER BY benchmark, label, workload, host, finished_at").fetchall()
+
+    groups = {}
+    for row in rows:
+        if benchmarks and row['benchmark'] not in benchmarks:
+            continue
+        value = _metric(row, metric)
+        if value is None:
+            continue
+        key = (row['benchmark'], row['label'], row['workload'], row['host'])
+        version = (row['gem5_build'], row['config'])
+        versions = groups.setdefault(key, [])
+        if not versions or versions[-1][0] != version:
+            versions.append((version, []))
+        versions[-1][1].append(value)
+
+    report = []
+    for (benchmark, label, workload, host), versions in sorted(groups.items()):
+        if len(versions) < 2:
+            continue
+        (old_version, old), (new_version, new) = versions[-2], versions[-1]
+        baseline, current = median(old), median(new)
+        change = current / baseline - 1 if baseline else 0.0
+        report.append({
+            'benchmark': benchmark,
+            'label': label,
+            'workload': workload,
+            'host': host,
+            'baseline': baseline,
+            'current': current,
+            'samples': (len(old), len(new)),
+            'change': change,
+            'regressed': change < -threshold,
+            'from': old_version,
+            'to': new_version,
+        })
+    return report
+
+def warn_regressions(benchmarks=None, db_path=TELEMETRY_DB):
+    """Print a warning per regressed run group; used after a campaign"""
+    if not Path(db_path).exists():
+        return 0
+    conn = open_telemetry(db_path)
+    try:
+        regressed = [e for e in find_regressions(conn, benchmarks=benchmarks)
+                     if e['regressed']]
+    finally:
+        conn.close()
+    for entry in regressed:
+        print(f"⚠ Simulator slowdown: {_group_name(entry)} on {entry['benchmark']} "
+              f"{entry['change']:+.0%} host_inst_rate ({_version_name(entry['from'])} -> "
+              f"{_version_name(entry['to'])})")
+    if regressed:
+        print("  Details: python3 scripts/host_perf.py")
+    return len(regressed)
+
+def _group_name(entry):
+    return f"{entry['label']} (multi)" if is_multi(entry['workload']) else entry['label']
+
+def _version_name(version):
+    gem5_build, config = version
+    return f"gem5 {gem5_build or '?'} / cfg {config or '?'}"
+
+def print_regressions(report, metric):
+    print(f"\n{'Benchmark':<16} {'Label':<22} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    print("-" * 76)
+    for entry in report:
+        flag = "⚠" if entry['regressed'] else " "
+        print(f"{entry['benchmark']:<16} {_group_name(entry):<22} {entry['baseline']:>12,.0f} "
+              f"{entry['current']:>12,.0f} {entry['change']:>+7.1%} {flag}")
+        if entry['regressed']:
+            print(f"    {_version_name(entry['from'])} -> {_version_name(entry['to'])}"
+                  f" on {entry['host']}")
+    print("-" * 76)
+    regressions = sum(1 for e in report if e['regressed'])
+    if regressions:
+        print(f"⚠ {regressions} {metric} regression(s)")
+    else:
+        print(f"✓ No {metric} regressions across {len(report)} compared group(s)")
+
+def print_history(conn, benchmark, metric):
+    rows = conn.execute(
+        "SELECT * FROM samples WHERE benchmark = ? ORDER BY label, finished_at",
+        (benchmark,)).fetchall()
+    print(f"{'Finished':<20} {'Label':<22} {'Version':<32} {metric:>14} {'RSS (MiB)':>10}")
+    print("-" * 102)
+    for row in rows:
+        value = _metric(row, metric)
+        rss = f"{row['peak_rss'] / 2**20:.0f}" if row['peak_rss'] else ""
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(row['finished_at'])):<20} "
+              f"{row['label']:<22} {_version_name((row['gem5_build'], row['config'])):<32} "
+              f"{'' if value is None else f'{value:,.0f}':>14} {rss:>10}")
+    print(f"\n{len(rows)} sample(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator host-performance telemetry")
+    parser.add_argument('--db', type=Path, default=TELEMETRY_DB, help='Telemetry database')
+    parser.add_argument('--ingest', action='store_true',
+                        help='Backfill telemetry from runs under results/')
+    parser.add_argument('--metric', choices=RATE_METRICS, default='host_inst_rate',
+                        help='Throughput metric to compare (default: host_inst_rate)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Relative drop flagged as a regression (default: 0.2)')
+    parser.add_argument('--benchmark', action='append',
+                        help='Only report these benchmarks (repeatable)')
+    parser.add_argument('--history', metavar='BENCHMARK',
+                        help='List every sample of one benchmark')
+
+    args = parser.parse_args()
+
+    if args.ingest:
+        added = ingest_results(RESULTS_DIR, args.db)
+        print(f"✓ Ingested {added} new sample(s) into {args.db}")
+
+    if not args.db.exists():
+        print(f"Telemetry database not found: {args.db}")
+        print("  Run experiments, or: python3 scripts/host_perf.py --ingest")
+        return
+
+    conn = open_telemetry(args.db)
+
+    if args.history:
+        print_history(conn, args.history, args.metric)
+        return
+
+    report = find_regressions(conn, args.metric, args.threshold, args.benchmark)
+    if not report:
+        print("Not enough history yet: every run group has a single gem5 build/config")
+        return
+    print_regressions(report, args.metric)
+
+    if any(entry['regressed'] for entry in report):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
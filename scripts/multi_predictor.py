@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Several predictors in one gem5 process
+
+`run_branch_pred.py --predictors bimodal gshare tournament` builds one
+independent system per predictor (own CPU, memory and SE process) under
+a single Root, so gem5 start-up, config and binary loading are paid once
+per benchmark instead of once per predictor. Each system's objects and
+stats are named system_<predictor>.*. Each time simulate() returns on
+a program exit the script dumps stats and records in multi.json which
+systems had finished by that dump:
+
+    {"exits": [{"predictor": "gshare", "system": "system_gshare",
+                "dump": 0, "tick": 265980000, "insts": 12193}, ...]}
+
+gem5 may only end the simulation loop once no system has a running
+thread left, so several systems (often all of them) can share one dump,
+and its tick is that of the slowest.
+
+This module groups runs that can share a process and splits the shared
+outputs back into an ordinary results/<label>/<benchmark>/ directory per
+predictor: stats.txt (every dump up to the system's exit, renamed to
+system.*), config.ini and config.json. The sim* totals of each dump are
+rewritten to the system's own: simInsts/simOps from its commit counts,
+simTicks/simSeconds/finalTick from its CPU's cycles and clock period,
+which stop advancing once its program has exited. The host* stats stay
+those of the whole shared process.
+"""
+
+import re
+import json
+import shutil
+from pathlib import Path
+
+from gem5_stats import BEGIN_MARKER, END_MARKER
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+# Shared gem5 output directories, one per multi-predictor run
+MULTI_DIR = PROJECT_ROOT / ".cache" / "multi"
+
+MULTI_FILE = "multi.json"
+
+# Files of the shared run copied unchanged into every predictor's directory
+# (timing.json records how many systems shared the process)
+SHARED_FILES = ("citations.bib", "stdout.txt", "stderr.txt", "timing.json")
+
+# Whole-simulation totals that are really one system's commit counts
+SIM_COUNTS = {
+    'simInsts': 'system.cpu.commitStats0.numInsts',
+    'simOps': 'system.cpu.commitStats0.numOps',
+}
+
+# A system's own simulated time is its CPU's cycles times its clock period
+OWN_CYCLES = 'system.cpu.numCycles'
+OWN_CLOCK = 'system.clk_domain.clock'
+
+def groupable(experiment):
+    """Whether a run can share a process: plain predictor, no checkpoint,
+    no ROI
+
+    Predictor overrides are predictor-specific, checkpoints are restored
+    into a single system, and ROI markers stop the whole process.
+    """
+    params = experiment['extra_params']
+    return not (params.get('bp_params') or params.get('fast_forward') or params.get('roi'))
+
+def group_experiments(experiments, multi=True):
+    """Indices of experiments, grouped into runs that share a gem5 process
+
+    Runs of the same benchmark and parameters that differ only in the
+    predictor form one group; everything else is a group of one. Groups
+    are in order of their first experiment.
+    """
+    groups, by_key = [], {}
+    for index, experiment in enumerate(experiments):
+        key = None
+        if multi and groupable(experiment):
+            key = (experiment['benchmark'],
+                   json.dumps(experiment['extra_params'], sort_keys=True))
+        group = by_key.get(key) if key is not None else None
+        if group is None or any(experiments[i]['predictor'] == experiment['predictor']
+                                for i in group):
+            group = []
+            groups.append(group)
+            if key is not None:
+                by_key[key] = group
+        group.append(index)
+    return groups
+
+def read_exits(group_dir):
+    """{predictor: exit record} from a multi-predictor run's multi.json"""
+    try:
+        with open(Path(group_dir) / MULTI_FILE) as f:
+            return {e['predictor']: e for e in json.load(f)['exits']}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def _renamer(system):
+    pattern = re.compile(rf"\b{re.escape(system)}\b")
+    return lambda text: pattern.sub("system", text)
+
+_VALUE_FIELD = re.compile(r"(\S+)\s+\S+")
+
+def _set_value(line, value):
+    """A stats line with its value replaced, keeping the column layout"""
+    match = _VALUE_FIELD.match(line)
+    name = match.group(1)
+    field = name + " " + str(value).rjust(match.end() - len(name) - 1)
+    return field + line[match.end():]
+
+def _own_time(stats):
+    """simTicks/simSeconds/finalTick of one system, from the {name: value}
+    of a dump, or {} if its cycles or clock are missing"""
+    try:
+        ticks = round(float(stats[OWN_CYCLES]) * float(stats[OWN_CLOCK]))
+        freq = float(stats['simFreq'])
+        # finalTick counts from the start of the simulation, simTicks from
+        # the last stats reset; keep that offset
+        offset = int(stats['finalTick']) - int(stats['simTicks'])
+    except (KeyError, ValueError):
+        return {}
+    return {'simTicks': ticks, 'simSeconds': f"{ticks / freq:.6f}",
+            'finalTick': ticks + offset}
+
+def _fix_counts(block):
+    """Rewrite the sim* totals of one dump to the system's own"""
+    stats = {}
+    for line in block:
+        fields = line.split(None, 2)
+        if len(fields) >= 2:
+            stats[fields[0]] = fields[1]
+    values = {total: stats[own] for total, own in SIM_COUNTS.items() if own in stats}
+    values.update(_own_time(stats))
+    if not values:
+        return block
+    return [_set_value(line, values[line.partition(' ')[0]])
+            if line.partition(' ')[0] in values else line for line in block]
+
+def split_stats(lines, system, last_dump):
+    """Lines of one system's stats.txt, from a multi-predictor stats.txt
+
+    Keeps dumps 0..last_dump (the one taken when the system exited), the
+    global stats of each and the system's own stats renamed to system.*.
+    """
+    prefix = system + "."
+    pad = " " * (len(system) - len("system"))
+    dump = -1
+    block = []
+    for line in lines:
+        if line.startswith(BEGIN_MARKER):
+            dump += 1
+            if dump > last_dump:
+                return
+        if dump < 0:
+            continue
+        name = line.partition(' ')[0]
+        if name.startswith(prefix):
+            # Keep the value columns aligned
+            line = "system" + name[len(system):] + pad + line[len(name):]
+        elif "." in name:
+            continue
+        block.append(line)
+        if line.startswith(END_MARKER):
+            yield from _fix_counts(block)
+            block = []
+    yield from block
+
+def split_config_ini(text, system):
+    """One system's config.ini: the root and that system's sections"""
+    rename = _renamer(system)
+    sections = []
+    for section in re.split(r"\n(?=\[)", text):
+        header = section.partition("\n")[0].strip("[]")
+        if header == "root":
+            section = re.sub(r"^children=.*$", "children=system", section, flags=re.M)
+        elif header != system and not header.startswith(system + "."):
+            continue
+        sections.append(rename(section.rstrip("\n")))
+    return "\n\n".join(sections) + "\n\n"
+
+def split_config_json(text, system, systems):
+    """One system's config.json, with that system as root.system"""
+    root = json.loads(text)
+    config = {key: value for key, value in root.items() if key not in systems}
+    config['system'] = root[system]
+    return _renamer(system)(json.dumps(config, indent=4)) + "\n"
+
+def split_run(group_dir, exit_record, systems, output_dir):
+    """Write one predictor's stats.txt and config files from a shared run"""
+    group_dir, output_dir = Path(group_dir), Path(output_dir)
+    system = exit_record['system']
+
+    with open(group_dir / "stats.txt") as src, open(output_dir / "stats.txt", "w") as out:
+        out.writelines(split_stats(src, system, exit_record['dump']))
+
+    config_ini = group_dir / "config.ini"
+    if config_ini.exists():
+        (output_dir / "config.ini").write_text(split_config_ini(config_ini.read_text(), system))
+    config_json = group_dir / "config.json"
+    if config_json.exists():
+        (output_dir / "config.json").write_text(
+            split_config_json(config_json.read_text(), system, systems))
+    for name in SHARED_FILES:
+        if (group_dir / name).exists():
+            shutil.copyfile(group_dir / name, output_dir / name)
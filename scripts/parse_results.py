@@ -3,85 +3,583 @@
 Parse gem5 statistics and generate comparison tables
 """
 
-import re
+import os
 import json
+import hashlib
+import tempfile
+import itertools
+from array import array
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from gem5_stats import (parse_stats_tree, parse_stats_text, parse_stats_timeline,
+                        stream_stats_timeline)
+import results_db
+from result_cache import run_complete, stats_complete, INCOMPLETE_FILE
+from run_archive import open_archive
 
 PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 RESULTS_DIR = PROJECT_ROOT / "results"
 
+# Directories under results/ that are not predictor labels
+SKIP_DIRS = {'analysis'}
+
+# Parsed metrics of every run, keyed by the file they came from
+PARSE_INDEX = RESULTS_DIR / "analysis" / "parse_index.json"
+
+# Bump when extract_metrics() changes so every run is reparsed
+PARSE_INDEX_VERSION = 2
+
+# Threads stat-ing run directories (latency-bound on NFS)
+SCAN_THREADS = 16
+
+# Below this many runs to parse, worker processes cost more than they save
+PARALLEL_PARSE_MIN = 32
+
+# Metrics pulled out of each stats.txt. Each maps to candidate stat paths,
+# tried in order, so renamed stats across gem5 versions keep resolving
+# (e.g. gem5 25 replaced branchPred.lookups with lookups_0::total).
+# Current gem5 names come first: a candidate missing from the dump costs
+# a scan of all of it, and the old and new names never appear together.
+METRICS = {
+    'sim_ticks': ['simTicks'],
+    'sim_seconds': ['simSeconds'],
+    'num_insts': [
+        'system.cpu.commitStats0.numInsts',
+        'system.cpu.numInsts',
+        'system.cpu.thread_0.numInsts',
+        'simInsts',
+    ],
+    'num_cycles': ['system.cpu.numCycles'],
+    'ipc': ['system.cpu.ipc'],
+    'branch_pred_lookups': [
+        'system.cpu.branchPred.lookups_0::total',
+        'system.cpu.branchPred.lookups',
+    ],
+    'branch_pred_cond_predicted': ['system.cpu.branchPred.condPredicted'],
+    'branch_pred_cond_incorrect': ['system.cpu.branchPred.condIncorrect'],
+}
+
+# Simulator speed and footprint, kept for capacity planning (host_perf.py)
+HOST_METRICS = {
+    'host_seconds': ['hostSeconds'],
+    'host_inst_rate': ['hostInstRate'],
+    'host_tick_rate': ['hostTickRate'],
+    'host_memory': ['hostMemory'],
+}
+
+# Region-of-interest metrics (run_branch_pred.py --roi), measured between
+# the stats dumps at the benchmark's ROI markers
+ROI_FILE = "roi.json"
+ROI_METRICS = ['roi_sim_ticks', 'roi_num_insts', 'roi_num_cycles', 'roi_ipc',
+               'roi_branch_pred_cond_predicted', 'roi_branch_pred_cond_incorrect',
+               'roi_mispredict_rate']
+
+# Per-run metric columns, in export order
+RESULT_COLUMNS = list(METRICS) + ['mispredict_rate'] + list(HOST_METRICS) + ROI_METRICS
+
+# Trace-replay results (replay.py --export) sit next to gem5 runs in
+# results/; they only carry the branch metrics
+REPLAY_FILE = "replay.json"
+
+# Whole-program metrics rebuilt from sampled intervals (simpoint.py)
+SIMPOINT_FILE = "simpoint.json"
+
+# Files a run's metrics can come from, in order of preference
+RESULT_FILES = ("stats.txt", SIMPOINT_FILE, REPLAY_FILE)
+
+def extract_metrics(tree):
+    """Pull the METRICS out of a parsed StatTree"""
+    
+    stats = {key: tree.first_value(paths) for key, paths in METRICS.items()}
+    stats.update((key, tree.first_value(paths)) for key, paths in HOST_METRICS.items())
+    
+    # Calculate misprediction rate
+    predicted = stats.get('branch_pred_cond_predicted')
+    incorrect = stats.get('branch_pred_cond_incorrect')
+    if predicted is not None and incorrect is not None:
+        stats['mispredict_rate'] = (incorrect / predicted * 100) if predicted > 0 else 0
+    else:
+        stats['mispredict_rate'] = None
+    
+    return stats
+
+def per_kinst(stats, key):
+    """A count per thousand committed instructions, so runs of different
+    problem sizes compare (e.g. MPKI from branch_pred_cond_incorrect)"""
+    insts = stats.get('num_insts')
+    value = stats.get(key)
+    if not insts or value is None:
+        return None
+    return value * 1000 / insts
+
 def parse_stats_file(stats_path):
     """Extract key statistics from gem5 stats.txt file"""
     
-    if not stats_path.exists():
+    tree = parse_stats_tree(stats_path)
+    if tree is None:
+        return None
+    
+    return extract_metrics(tree)
+
+def parse_simpoint_file(record_path):
+    """Rebuilt metrics from a simpoint.json record, or None if missing"""
+    
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    return simpoint_metrics(record)
+
+def simpoint_metrics(record):
+    metrics = record.get('metrics') or {}
+    return {key: metrics.get(key) for key in RESULT_COLUMNS}
+
+def parse_replay_file(replay_path):
+    """Branch metrics from a replay.json record, or None if missing"""
+    
+    try:
+        with open(replay_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    return replay_metrics(record)
+
+def replay_metrics(record):
+    return {
+        'branch_pred_cond_predicted': record.get('branches'),
+        'branch_pred_cond_incorrect': record.get('mispredicted'),
+        'mispredict_rate': record.get('mispredict_rate'),
+    }
+
+# Series tracked across periodic dumps (run_branch_pred.py --stats-period).
+# Dumps are cumulative, so per-interval values come from differencing.
+TIMELINE_SERIES = dict(METRICS, final_tick=['finalTick'])
+
+def parse_timeline(stats_path):
+    """Per-interval metrics from every stats dump in a stats.txt
+
+    Returns a dict of parallel arrays (tick, insts, cycles, ipc,
+    mispredict_rate), one entry per interval, or None if the file is
+    missing.
+    """
+    timeline = parse_stats_timeline(stats_path, TIMELINE_SERIES)
+    if timeline is None:
         return None
+    return timeline_intervals(timeline)
+
+def timeline_intervals(timeline):
+    """Difference cumulative dumps into per-interval metrics"""
+    ticks = timeline['final_tick']
+    insts = timeline['num_insts']
+    cycles = timeline['num_cycles']
+    predicted = timeline['branch_pred_cond_predicted']
+    incorrect = timeline['branch_pred_cond_incorrect']
+    
+    intervals = {key: array('d') for key in
+                 ('tick', 'insts', 'cycles', 'ipc', 'mispredict_rate')}
+    
+    prev = (0.0, 0.0, 0.0, 0.0, 0.0)
+    for i in range(len(timeline)):
+        cur = (ticks[i], insts[i], cycles[i], predicted[i], incorrect[i])
+        d_tick, d_insts, d_cycles, d_pred, d_incorrect = (
+            c - p for c, p in zip(cur, prev))
+        
+        # The exit dump can land on the same tick as the last periodic one
+        if not d_tick > 0:
+            continue
+        prev = cur
+        
+        intervals['tick'].append(cur[0])
+        intervals['insts'].append(d_insts)
+        intervals['cycles'].append(d_cycles)
+        intervals['ipc'].append(d_insts / d_cycles if d_cycles > 0 else float('nan'))
+        intervals['mispredict_rate'].append(
+            d_incorrect / d_pred * 100 if d_pred > 0 else float('nan'))
     
-    stats = {}
-    content = stats_path.read_text()
-    
-    # Key metrics to extract (using regex)
-    patterns = {
-        'sim_ticks': r'simTicks\s+(\d+)',
-        'sim_seconds': r'simSeconds\s+([\d.]+)',
-        'num_insts': r'system\.cpu\.numInsts\s+(\d+)',
-        'num_cycles': r'system\.cpu\.numCycles\s+(\d+)',
-        'ipc': r'system\.cpu\.ipc\s+([\d.]+)',
-        'branch_pred_lookups': r'system\.cpu\.branchPred\.lookups\s+(\d+)',
-        'branch_pred_cond_predicted': r'system\.cpu\.branchPred\.condPredicted\s+(\d+)',
-        'branch_pred_cond_incorrect': r'system\.cpu\.branchPred\.condIncorrect\s+(\d+)',
+    return intervals
+
+def roi_metrics(lines, record):
+    """ROI_METRICS from a stats.txt's lines and its roi.json record
+
+    Dumps are cumulative, so the ROI is the end dump minus the begin dump.
+    Returns {} when the record does not hold a complete region.
+    """
+    try:
+        begin, end = record['begin']['dump'], record['end']['dump']
+    except (KeyError, TypeError):
+        return {}
+    timeline = stream_stats_timeline(lines, TIMELINE_SERIES)
+    if not 0 <= begin < end < len(timeline):
+        return {}
+    
+    def delta(key):
+        return timeline[key][end] - timeline[key][begin]
+    
+    insts, cycles = delta('num_insts'), delta('num_cycles')
+    predicted, incorrect = delta('branch_pred_cond_predicted'), delta('branch_pred_cond_incorrect')
+    return {
+        'roi_sim_ticks': delta('final_tick'),
+        'roi_num_insts': insts,
+        'roi_num_cycles': cycles,
+        'roi_ipc': insts / cycles if cycles > 0 else None,
+        'roi_branch_pred_cond_predicted': predicted,
+        'roi_branch_pred_cond_incorrect': incorrect,
+        'roi_mispredict_rate': incorrect / predicted * 100 if predicted > 0 else None,
     }
+
+def parse_roi_file(stats_path):
+    """ROI metrics of a run directory's stats.txt, {} without roi.json"""
+    try:
+        with open(stats_path.parent / ROI_FILE) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    with open(stats_path) as f:
+        return roi_metrics(f, record)
+
+def report_missing_metrics(results):
+    """Warn about metrics that could not be found in some runs"""
+    missing = defaultdict(list)
+    for predictor, benchmarks in results.items():
+        for benchmark, stats in benchmarks.items():
+            for key in METRICS:
+                # Replay records leave out the metrics they cannot model
+                if key in stats and stats[key] is None:
+                    missing[key].append(f"{predictor}/{benchmark}")
     
-    for key, pattern in patterns.items():
-        match = re.search(pattern, content)
-        if match:
-            try:
-                # Try to parse as int first, then float
-                value = int(match.group(1))
-            except ValueError:
-                value = float(match.group(1))
-            stats[key] = value
-        else:
-            stats[key] = None
+    for key, runs in sorted(missing.items()):
+        print(f"⚠ {key} not found in {len(runs)} run(s): {', '.join(runs)}")
+
+def _label_dirs():
+    if not RESULTS_DIR.exists():
+        return []
+    return sorted(entry.path for entry in os.scandir(RESULTS_DIR)
+                  if entry.is_dir() and entry.name not in SKIP_DIRS
+                  and not entry.name.startswith('.'))
+
+def _scan_label(label_dir, with_sources=False):
+    runs = sorted(entry.path for entry in os.scandir(label_dir) if entry.is_dir())
+    if with_sources:
+        return [(Path(run_dir), _run_source(run_dir)) for run_dir in runs]
+    return [Path(run_dir) for run_dir in runs]
+
+def run_dirs():
+    """results/<label>/<benchmark>/ directories, skipping results/analysis"""
+    return [run_dir for label_dir in _label_dirs() for run_dir in _scan_label(label_dir)]
+
+def _run_source(run_dir):
+    """(result file, size, mtime_ns) of a run directory
+
+    The result file is the first of stats.txt, simpoint.json or
+    replay.json; 'incomplete' for a run the runner has not finished,
+    None if there is nothing to parse.
+    """
+    if os.path.exists(os.path.join(run_dir, INCOMPLETE_FILE)):
+        return ('incomplete', 0, 0)
+    for name in RESULT_FILES:
+        try:
+            st = os.stat(os.path.join(run_dir, name))
+        except FileNotFoundError:
+            continue
+        return (name, st.st_size, st.st_mtime_ns)
+    return None
+
+def scan_sources():
+    """(run_dir, _run_source()) of every run directory
+
+    Label directories are listed and stat-ed concurrently: on NFS every
+    call is a round trip, and with thousands of runs the walk itself is
+    the slow part.
+    """
+    with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+        scans = pool.map(_scan_label, _label_dirs(), itertools.repeat(True))
+        return [run for runs in scans for run in runs]
+
+def _content_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def parse_run(run_dir, name):
+    """Worker entry point: (content hash, metrics) of one run's result file"""
+    path = Path(run_dir) / name
+    digest = _content_hash(path)
+    if name == "stats.txt":
+        if not stats_complete(path):
+            return digest, None
+        metrics = parse_stats_file(path)
+        if metrics is not None:
+            metrics.update(parse_roi_file(path))
+        return digest, metrics
+    if name == SIMPOINT_FILE:
+        return digest, parse_simpoint_file(path)
+    return digest, parse_replay_file(path)
+
+def load_parse_index(index_path):
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != PARSE_INDEX_VERSION:
+        return {}
+    return index.get('runs', {})
+
+def save_parse_index(index_path, runs):
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=index_path.parent, prefix=".parse_index-")
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': PARSE_INDEX_VERSION, 'runs': runs}, f, separators=(',', ':'))
+    os.replace(tmp, index_path)
+
+def _run_name(key):
+    """label/benchmark of a parse index key ('archive:' marks packed runs)"""
+    return key.partition('archive:')[2] or key
+
+def collect_results(index_path=PARSE_INDEX, jobs=None, reparse=False):
+    """Collect results, reparsing only runs that changed since last time
+
+    Every parsed run is kept in a persistent index under its run name,
+    with the size, mtime and content hash of the file it came from.
+    A run whose size and mtime still match is not read at all. If only
+    the mtime moved, the content hash decides. New and changed runs are
+    parsed in parallel, and runs that disappeared are dropped from the
+    index.
+
+    Returns (results, changed): the nested {label: {benchmark: metrics}}
+    dict and the set of run names whose metrics were (re)parsed or removed.
+    """
+    index = {} if reparse else load_parse_index(index_path)
+    fresh = {}
+    pending = []
     
-    # Calculate misprediction rate
-    if stats.get('branch_pred_cond_predicted') and stats.get('branch_pred_cond_incorrect'):
-        predicted = stats['branch_pred_cond_predicted']
-        incorrect = stats['branch_pred_cond_incorrect']
-        stats['mispredict_rate'] = (incorrect / predicted * 100) if predicted > 0 else 0
+    for run_dir, source in scan_sources():
+        run = f"{run_dir.parent.name}/{run_dir.name}"
+        if source is None:
+            continue
+        if source[0] == 'incomplete':
+            # A killed or failed run's stats are not a result
+            print(f"⚠ Skipping incomplete run: {run}")
+            continue
+        
+        name, size, mtime_ns = source
+        entry = index.get(run)
+        if entry and (entry['file'], entry['size']) == (name, size):
+            if entry['mtime_ns'] == mtime_ns:
+                fresh[run] = entry
+                continue
+            if entry['hash'] == _content_hash(run_dir / name):
+                fresh[run] = dict(entry, mtime_ns=mtime_ns)
+                continue
+        pending.append((run, run_dir, name, size, mtime_ns))
+    
+    changed = set()
+    if len(pending) >= PARALLEL_PARSE_MIN and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(pool.map(parse_run, [p[1] for p in pending], [p[2] for p in pending],
+                                   chunksize=16))
     else:
-        stats['mispredict_rate'] = None
+        parsed = [parse_run(run_dir, name) for _, run_dir, name, _, _ in pending]
     
-    return stats
+    for (run, _, name, size, mtime_ns), (digest, metrics) in zip(pending, parsed):
+        if not metrics:
+            print(f"⚠ Skipping unreadable or truncated run: {run}")
+            continue
+        fresh[run] = {'file': name, 'size': size, 'mtime_ns': mtime_ns,
+                      'hash': digest, 'metrics': metrics}
+        changed.add(run)
+    
+    # Packed runs (run_archive.py); a finished copy on disk takes precedence.
+    # The archive already knows each member's content hash
+    archive = open_archive()
+    if archive is not None:
+        with archive:
+            hashes = {}
+            for name in reversed(RESULT_FILES):
+                hashes.update((run, (name, h)) for run, h in archive.member_hashes(name).items())
+            for run, (name, digest) in sorted(hashes.items()):
+                if run in fresh:
+                    continue
+                key = f"archive:{run}"
+                entry = index.get(key)
+                if entry and entry['hash'] == digest:
+                    fresh[key] = entry
+                    continue
+                metrics = parse_archived_run(archive, run)
+                if metrics:
+                    fresh[key] = {'file': name, 'size': 0, 'mtime_ns': 0,
+                                  'hash': digest, 'metrics': metrics}
+                    changed.add(run)
+    
+    changed |= {_run_name(key) for key in index} - {_run_name(key) for key in fresh}
+    if changed or set(index) != set(fresh):
+        save_parse_index(index_path, fresh)
+    
+    results = defaultdict(lambda: defaultdict(dict))
+    for key, entry in sorted(fresh.items()):
+        predictor, benchmark = _run_name(key).split('/', 1)
+        results[predictor][benchmark] = entry['metrics']
+    
+    return results, changed
 
 def collect_all_results():
     """Collect results from all experiments"""
     
-    results = defaultdict(lambda: defaultdict(dict))
-    
     if not RESULTS_DIR.exists():
         print(f"Results directory not found: {RESULTS_DIR}")
         return None
     
-    # Iterate through results/predictor/benchmark/
-    for predictor_dir in RESULTS_DIR.iterdir():
-        if not predictor_dir.is_dir():
-            continue
-        
-        predictor = predictor_dir.name
-        
-        for benchmark_dir in predictor_dir.iterdir():
-            if not benchmark_dir.is_dir():
+    return collect_results()[0]
+
+def parse_archived_run(archive, run):
+    """Metrics of one archived run, read without unpacking anything else"""
+    
+    text = archive.read_text(run, "stats.txt")
+    if text is not None:
+        metrics = extract_metrics(parse_stats_text(text))
+        roi = archive.read_text(run, ROI_FILE)
+        if roi is not None:
+            try:
+                metrics.update(roi_metrics(text.splitlines(), json.loads(roi)))
+            except ValueError:
+                pass
+        return metrics
+    
+    for name, metrics in ((SIMPOINT_FILE, simpoint_metrics), (REPLAY_FILE, replay_metrics)):
+        text = archive.read_text(run, name)
+        if text is not None:
+            try:
+                return metrics(json.loads(text))
+            except ValueError:
+                return None
+    return None
+
+def on_disk(run_dir):
+    """Whether a run is read from its directory rather than the archive"""
+    return run_dir.is_dir() and run_complete(run_dir)
+
+def timeline_sources():
+    """{benchmark: {predictor: signature}} of every run a timeline could
+    come from, without parsing any of them
+    
+    The signature changes whenever the run's stats could have: the result
+    file, size and mtime of its directory, and the content hash of an
+    archived stats.txt. Cheap enough to decide which timeline charts are
+    stale before load_timelines() reads anything.
+    """
+    
+    sources = defaultdict(dict)
+    
+    if RESULTS_DIR.exists():
+        for run_dir, source in scan_sources():
+            sources[run_dir.name][run_dir.parent.name] = [source, None]
+    
+    archive = open_archive()
+    if archive is not None:
+        with archive:
+            for run, digest in archive.member_hashes("stats.txt").items():
+                predictor, benchmark = run.split('/', 1)
+                sources[benchmark].setdefault(predictor, [None, None])[1] = digest
+    
+    return sources
+
+def load_timelines(runs):
+    """Per-interval metrics of the given (predictor, benchmark) runs
+    
+    Returns {(predictor, benchmark): intervals} for the runs that dumped
+    stats periodically. A finished directory on disk takes precedence
+    over the archived copy.
+    """
+    
+    timelines = {}
+    archive = open_archive()
+    try:
+        for predictor, benchmark in runs:
+            run_dir = RESULTS_DIR / predictor / benchmark
+            if on_disk(run_dir):
+                intervals = parse_timeline(run_dir / "stats.txt")
+            else:
+                text = archive.read_text(f"{predictor}/{benchmark}", "stats.txt") if archive else None
+                if text is None:
+                    continue
+                intervals = timeline_intervals(stream_stats_timeline(text.splitlines(), TIMELINE_SERIES))
+            if intervals and len(intervals['tick']) > 1:
+                timelines[(predictor, benchmark)] = intervals
+    finally:
+        if archive is not None:
+            archive.close()
+    
+    return timelines
+
+def collect_timelines():
+    """Per-interval metrics for every run that dumped stats periodically"""
+    
+    runs = [(predictor, benchmark) for benchmark, predictors in timeline_sources().items()
+            for predictor in predictors]
+    
+    timelines = defaultdict(dict)
+    for (predictor, benchmark), intervals in load_timelines(runs).items():
+        timelines[predictor][benchmark] = intervals
+    
+    return timelines
+
+def store_results(results, db_path, all_stats=False, changed=None):
+    """Bulk load collected results into the SQLite results store
+
+    Runs that no longer exist on disk are pruned. With all_stats, every
+    stat in stats.txt is stored alongside the extracted metrics. With a
+    `changed` set of run names (collect_results), only those runs and
+    runs missing from the store are written.
+    """
+    conn = results_db.open_store(db_path, RESULT_COLUMNS)
+    archive = open_archive()
+    
+    stored = {row['run_dir'] for row in conn.execute("SELECT run_dir FROM runs")}
+    runs, keep = [], []
+    for predictor, benchmarks in results.items():
+        for benchmark, stats in benchmarks.items():
+            run = f"{predictor}/{benchmark}"
+            keep.append(run)
+            if (changed is not None and not all_stats
+                    and run not in changed and run in stored):
                 continue
-            
-            benchmark = benchmark_dir.name
-            stats_path = benchmark_dir / "stats.txt"
-            
-            stats = parse_stats_file(stats_path)
-            if stats:
-                results[predictor][benchmark] = stats
+            run_dir = RESULTS_DIR / predictor / benchmark
+            read_text = None
+            if archive is not None and not on_disk(run_dir):
+                read_text = lambda name, run=run: archive.read_text(run, name)
+            row_stats = dict(stats)
+            tree = None
+            if all_stats and read_text is None:
+                tree = parse_stats_tree(run_dir / "stats.txt")
+            elif all_stats:
+                text = read_text("stats.txt")
+                tree = parse_stats_text(text) if text is not None else None
+            if tree is not None:
+                row_stats.update((name, tree.value(name)) for name in tree.names())
+            params = results_db.run_params(run_dir, predictor, benchmark, read_text)
+            runs.append({
+                'run_dir': run_dir.relative_to(RESULTS_DIR),
+                'label': predictor,
+                'predictor': params['predictor'],
+                'benchmark': benchmark,
+                'params': params,
+                'stats': row_stats,
+            })
     
-    return results
+    if archive is not None:
+        archive.close()
+    
+    results_db.insert_runs(conn, runs)
+    pruned = results_db.prune_runs(conn, keep)
+    print(f"✓ Stored {len(keep)} runs in {db_path} ({len(runs)} updated, {pruned} removed)")
+    return conn
 
 def print_comparison_table(results):
     """Print formatted comparison table"""
@@ -105,8 +603,15 @@ def print_comparison_table(results):
         print(f"\n{benchmark.upper()}")
         print("-" * 80)
         
+        # ROI columns only for benchmarks run with --roi
+        has_roi = any((results[p].get(benchmark) or {}).get('roi_num_insts') is not None
+                      for p in predictors)
+        
         # Table header
-        print(f"{'Predictor':<15} {'IPC':<10} {'Mispred %':<12} {'Instructions':<15} {'Cycles':<15}")
+        header = f"{'Predictor':<15} {'IPC':<10} {'Mispred %':<12} {'MPKI':<8} {'Instructions':<15} {'Cycles':<15}"
+        if has_roi:
+            header += f" {'ROI IPC':<10} {'ROI Mispred %':<14} {'ROI Insts':<12}"
+        print(header)
         print("-" * 80)
         
         for predictor in predictors:
@@ -115,20 +620,65 @@ def print_comparison_table(results):
             if stats:
                 ipc = f"{stats.get('ipc', 0):.4f}" if stats.get('ipc') else "N/A"
                 mispredict = f"{stats.get('mispredict_rate', 0):.2f}%" if stats.get('mispredict_rate') is not None else "N/A"
+                mpki = per_kinst(stats, 'branch_pred_cond_incorrect')
+                mpki = f"{mpki:.2f}" if mpki is not None else "N/A"
                 insts = f"{stats.get('num_insts', 0):,}" if stats.get('num_insts') else "N/A"
                 cycles = f"{stats.get('num_cycles', 0):,}" if stats.get('num_cycles') else "N/A"
                 
-                print(f"{predictor:<15} {ipc:<10} {mispredict:<12} {insts:<15} {cycles:<15}")
+                row = f"{predictor:<15} {ipc:<10} {mispredict:<12} {mpki:<8} {insts:<15} {cycles:<15}"
+                if has_roi:
+                    roi_ipc = f"{stats['roi_ipc']:.4f}" if stats.get('roi_ipc') else "N/A"
+                    roi_rate = f"{stats['roi_mispredict_rate']:.2f}%" if stats.get('roi_mispredict_rate') is not None else "N/A"
+                    roi_insts = f"{stats['roi_num_insts']:,.0f}" if stats.get('roi_num_insts') else "N/A"
+                    row += f" {roi_ipc:<10} {roi_rate:<14} {roi_insts:<12}"
+                print(row)
             else:
                 print(f"{predictor:<15} {'NO DATA':<10}")
         
         print()
 
+def print_scaling_table(conn):
+    """Accuracy and simulator speed against problem size, per benchmark
+
+    Runs are grouped by predictor across their size/seed variants
+    (run_all_experiments.py --size), ordered by instruction count.
+    """
+    rows = results_db.query_runs(
+        conn, columns=['predictor', 'benchmark', 'size', 'seed', 'num_insts',
+                       'mispredict_rate', 'mpki', 'branches_per_kinst', 'host_inst_rate'],
+        order_by="m.benchmark, m.predictor, m.num_insts")
+    
+    print("\n" + "=" * 96)
+    print("SCALING WITH PROBLEM SIZE")
+    print("=" * 96)
+    
+    benchmark = None
+    for row in rows:
+        if row['num_insts'] is None:
+            continue
+        if row['benchmark'] != benchmark:
+            benchmark = row['benchmark']
+            print(f"\n{benchmark.upper()}")
+            print("-" * 96)
+            print(f"{'Predictor':<12} {'Size':>10} {'Seed':>6} {'Instructions':>14} "
+                  f"{'Mispred %':>10} {'MPKI':>8} {'Br/KI':>8} {'Host inst/s':>14}")
+            print("-" * 96)
+        
+        def cell(key, fmt):
+            return format(row[key], fmt) if row[key] is not None else "N/A"
+        
+        print(f"{row['predictor']:<12} {row['size'] or 'default':>10} {row['seed'] or 0:>6} "
+              f"{cell('num_insts', ',.0f'):>14} {cell('mispredict_rate', '.2f'):>10} "
+              f"{cell('mpki', '.2f'):>8} {cell('branches_per_kinst', '.1f'):>8} "
+              f"{cell('host_inst_rate', ',.0f'):>14}")
+
 def export_json(results, output_path):
     """Export results to JSON file"""
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, 'w') as f:
-        json.dump(results, f, indent=2)
+        # One-shot encoding takes the C encoder's fast path; json.dump streams
+        # thousands of tiny writes
+        f.write(json.dumps(results, indent=2))
     print(f"✓ Exported to {output_path}")
 
 def export_csv(results, output_path):
@@ -142,8 +692,9 @@ def export_csv(results, output_path):
         
         # Header
         writer.writerow([
-            'Predictor', 'Benchmark', 'IPC', 'Misprediction Rate (%)',
-            'Instructions', 'Cycles', 'Sim Seconds'
+            'Predictor', 'Benchmark', 'IPC', 'Misprediction Rate (%)', 'MPKI',
+            'Instructions', 'Cycles', 'Sim Seconds',
+            'ROI IPC', 'ROI Misprediction Rate (%)', 'ROI Instructions', 'ROI Cycles'
         ])
         
         # Data rows
@@ -154,34 +705,92 @@ def export_csv(results, output_path):
                     benchmark,
                     stats.get('ipc', ''),
                     stats.get('mispredict_rate', ''),
+                    per_kinst(stats, 'branch_pred_cond_incorrect') or '',
                     stats.get('num_insts', ''),
                     stats.get('num_cycles', ''),
-                    stats.get('sim_seconds', '')
+                    stats.get('sim_seconds', ''),
+                    stats.get('roi_ipc') or '',
+                    stats.get('roi_mispredict_rate') if stats.get('roi_mispredict_rate') is not None else '',
+                    stats.get('roi_num_insts') or '',
+                    stats.get('roi_num_cycles') or '',
                 ])
     
     print(f"✓ Exported to {output_path}")
 
+def export_timeline_csv(timelines, output_path):
+    """Export per-interval metrics to CSV file"""
+    import csv
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            'Predictor', 'Benchmark', 'Interval', 'Tick', 'Instructions',
+            'Cycles', 'IPC', 'Misprediction Rate (%)'
+        ])
+        
+        for predictor, benchmarks in sorted(timelines.items()):
+            for benchmark, intervals in sorted(benchmarks.items()):
+                for i in range(len(intervals['tick'])):
+                    writer.writerow([
+                        predictor,
+                        benchmark,
+                        i,
+                        int(intervals['tick'][i]),
+                        int(intervals['insts'][i]),
+                        int(intervals['cycles'][i]),
+                        intervals['ipc'][i],
+                        intervals['mispredict_rate'][i],
+                    ])
+    
+    print(f"✓ Exported to {output_path}")
+
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Parse gem5 experiment results")
     parser.add_argument('--json', action='store_true', help='Export to JSON')
     parser.add_argument('--csv', action='store_true', help='Export to CSV')
+    parser.add_argument('--timeline', action='store_true',
+                       help='Export per-interval metrics from periodic stat dumps')
     parser.add_argument('--output-dir', type=Path, default=RESULTS_DIR / "analysis",
                        help='Output directory for exports')
+    parser.add_argument('--db', type=Path, default=results_db.DB_PATH,
+                       help='SQLite results store to update')
+    parser.add_argument('--all-stats', action='store_true',
+                       help='Store every stat from stats.txt, not just the key metrics')
+    parser.add_argument('--scaling', action='store_true',
+                       help='Show accuracy and simulator speed against problem size')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='Processes parsing new or changed runs (default: all cores)')
+    parser.add_argument('--reparse', action='store_true',
+                       help='Ignore the parse index and reparse every run')
     
     args = parser.parse_args()
     
     print("Collecting results...")
-    results = collect_all_results()
+    if not RESULTS_DIR.exists():
+        print(f"Results directory not found: {RESULTS_DIR}")
+        return
+    results, changed = collect_results(PARSE_INDEX, args.jobs, args.reparse)
     
     if not results:
         print("No results found")
         return
     
+    report_missing_metrics(results)
+    
+    # Everything below reads back from the store
+    conn = store_results(results, args.db, args.all_stats, None if args.reparse else changed)
+    results = results_db.fetch_results(conn, RESULT_COLUMNS)
+    
     # Print comparison table
     print_comparison_table(results)
     
+    if args.scaling:
+        print_scaling_table(conn)
+    
     # Export if requested
     if args.json:
         export_json(results, args.output_dir / "results.json")
@@ -189,6 +798,13 @@ def main():
     if args.csv:
         export_csv(results, args.output_dir / "results.csv")
     
+    if args.timeline:
+        timelines = collect_timelines()
+        if timelines:
+            export_timeline_csv(timelines, args.output_dir / "timeline.csv")
+        else:
+            print("No periodic stat dumps found (run with --stats-period)")
+    
     print("\n✓ Analysis complete")
 
 if __name__ == "__main__":
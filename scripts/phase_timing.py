@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Where gem5 runs spend their wall-clock time
+
+run_branch_pred.py writes timing.json next to every run's stats.txt
+(src/phase_timer.py). It holds exclusive seconds per phase: gem5
+start-up before the script, imports, system build, SEWorkload init,
+instantiate, simulate, stats dumps, checkpoints and the rest of the script.
+This module adds those up over many runs. The runner prints the
+breakdown after a campaign, with its own wall time per run. Whatever the
+sidecar does not cover (process spawn and gem5 teardown) is shown as
+"unaccounted".
+
+A multi-predictor run's timing.json is copied to every predictor it
+simulated, so each copy counts for 1/systems of a run.
+
+Usage:
+    python3 scripts/phase_timing.py                   # every run in results/
+    python3 scripts/phase_timing.py --label gshare    # one label
+    python3 scripts/phase_timing.py --benchmark bfs
+"""
+
+import json
+import argparse
+from pathlib import Path
+
+from result_cache import run_complete
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+RESULTS_DIR = PROJECT_ROOT / "results"
+
+TIMING_FILE = "timing.json"
+
+# Display order; phases a newer script adds are listed after these
+PHASES = ["startup", "import", "build", "workload_init", "instantiate",
+          "simulate", "stats_dump", "checkpoint", "other"]
+
+def read_timing(run_dir):
+    """A run's timing.json record, or None if missing or unreadable"""
+    try:
+        with open(Path(run_dir) / TIMING_FILE) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return record if isinstance(record.get('phases'), dict) else None
+
+def aggregate(records):
+    """Add up (timing record, wall seconds or None) pairs
+
+    Returns {'runs', 'seconds': {phase: total}, 'total'}, with the part
+    of the runner's wall time the records do not cover as "unaccounted".
+    """
+    seconds, runs, total = {}, 0.0, 0.0
+    for record, wall in records:
+        share = 1 / max(1, record.get('systems', 1))
+        for name, value in record['phases'].items():
+            seconds[name] = seconds.get(name, 0.0) + value * share
+        covered = record.get('total', sum(record['phases'].values()))
+        if wall is not None and wall > covered:
+            seconds['unaccounted'] = seconds.get('unaccounted', 0.0) + (wall - covered) * share
+        runs += share
+        total += max(covered, wall or 0.0) * share
+    return {'runs': runs, 'seconds': seconds, 'total': total}
+
+def campaign_breakdown(results):
+    """aggregate() over the runner's results that ran gem5 this time"""
+    records = []
+    for result in results:
+        if result['status'] != 'success':
+            continue
+        record = read_timing(result['output_dir'])
+        if record is not None:
+            records.append((record, result['elapsed']))
+    return aggregate(records)
+
+def collect_results(results_dir=RESULTS_DIR, labels=None, benchmarks=None):
+    """aggregate() over the finished runs under results/ (no wall times)"""
+    records = []
+    for path in sorted(Path(results_dir).glob(f"*/*/{TIMING_FILE}")):
+        run_dir = path.parent
+        if run_dir.parent.name == "analysis" or not run_complete(run_dir):
+            continue
+        if labels and run_dir.parent.name not in labels:
+            continue
+        if benchmarks and run_dir.name not in benchmarks:
+            continue
+        record = read_timing(run_dir)
+        if record is not None:
+            records.append((record, None))
+    return aggregate(records)
+
+def print_breakdown(breakdown, title="Phase timing"):
+    """Per-phase total, mean per run and share of the total"""
+    runs, seconds, total = breakdown['runs'], breakdown['seconds'], breakdown['total']
+    if not runs:
+        return
+    names = [p for p in PHASES if p in seconds]
+    names += sorted(p for p in seconds if p not in PHASES and p != 'unaccounted')
+    if 'unaccounted' in seconds:
+        names.append('unaccounted')
+
+    print(f"\n{title} ({runs:g} run(s), {total:.1f}s)")
+    print(f"{'Phase':<16} {'Total (s)':>10} {'Per run (s)':>12} {'Share':>7}")
+    print("-" * 48)
+    for name in names:
+        share = seconds[name] / total if total else 0.0
+        print(f"{name:<16} {seconds[name]:>10.2f} {seconds[name] / runs:>12.3f} {share:>7.1%}")
+    print("-" * 48)
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate per-phase gem5 run timings")
+    parser.add_argument('--results-dir', type=Path, default=RESULTS_DIR,
+                        help='Results directory (default: results/)')
+    parser.add_argument('--label', action='append',
+                        help='Only runs with this label (repeatable)')
+    parser.add_argument('--benchmark', action='append',
+                        help='Only this benchmark (repeatable)')
+
+    args = parser.parse_args()
+
+    breakdown = collect_results(args.results_dir, args.label, args.benchmark)
+    if not breakdown['runs']:
+        print(f"No {TIMING_FILE} found under {args.results_dir}")
+        print("  Runs write one from this version of run_branch_pred.py on")
+        return
+    print_breakdown(breakdown)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Trace-replay branch predictor models
+
+Replays committed conditional branches (a .btrace from branch_trace.py,
+or raw gem5 Exec debug output) through NumPy models of the predictors in
+configs/. A model gives a misprediction rate in seconds, where a MinorCPU
+run takes minutes. Use it to screen predictor changes before simulating.
+
+Models and their parameters (named as in configs/*.create_predictor()):
+    bimodal     PC-indexed table of saturating counters
+                globalPredictorSize, globalCtrBits
+    gshare      counters indexed by PC xor global history
+                globalPredictorSize, globalCtrBits, historyLength
+    tournament  local (per-PC history) and global predictors plus a
+                global-history-indexed choice table, as in TournamentBP
+                localPredictorSize, localHistoryTableSize, localCtrBits,
+                globalPredictorSize, globalCtrBits,
+                choicePredictorSize, choiceCtrBits
+All models also take instShiftAmt (PC bits dropped before indexing).
+
+Nothing is simulated one branch at a time. Global and local histories
+come straight from the recorded outcomes. Each counter table is a
+segmented parallel prefix scan: the events are sorted by table entry,
+and every update is the map x -> clip(x + a, lo, hi). These maps stay
+closed under composition, so about log2(n) vectorised passes give each
+entry's counter value before every access.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from configs.params import parse_value
+from branch_trace import TraceReader, parse_exec_trace, DIRECT_COND, DEFAULT_CHUNK_RECORDS
+from parse_results import REPLAY_FILE
+
+def _log2(size, name):
+    if size <= 0 or size & (size - 1):
+        raise ValueError(f"{name} must be a power of two, got {size}")
+    return size.bit_length() - 1
+
+def _sort_keys(slots):
+    # Tables are small: 16-bit keys let NumPy use its linear-time radix sort
+    if slots.size and slots.max() < 1 << 16:
+        return slots.astype(np.uint16)
+    return slots
+
+def _groups(slots, rows=1):
+    """Stable sort by slot
+
+    With rows > 1, slots is a flattened (rows, n) array whose rows use
+    disjoint, increasing slot ranges (stacked configurations); each row is
+    then sorted on its own, which keeps the keys small.
+
+    Returns (order, sorted slots, rank within slot, index of each slot's
+    last event in sorted order).
+    """
+    n = len(slots)
+    if rows > 1:
+        grid = slots.reshape(rows, -1)
+        local = grid - grid.min(axis=1, keepdims=True)
+        order = np.argsort(_sort_keys(local), axis=1, kind='stable')
+        order += np.arange(rows)[:, None] * grid.shape[1]
+        order = order.ravel()
+    else:
+        order = np.argsort(_sort_keys(slots), kind='stable')
+    s = slots[order]
+    first = np.ones(n, dtype=bool)
+    first[1:] = s[1:] != s[:-1]
+    starts = np.flatnonzero(first)
+    rank = np.arange(n) - np.repeat(starts, np.diff(np.append(starts, n)))
+    ends = np.append(starts[1:], n) - 1
+    return order, s, rank, ends
+
+def counter_scan(slots, up, table, bits, update=None, rows=1):
+    """Run a table of saturating counters over a batch of events
+
+    Args:
+        slots: Table index of each event
+        up: True where the counter is incremented, False where decremented
+        table: Counter values; updated in place to the state after the batch
+        bits: Counter width (at most 14), or one width per event
+        update: Optional mask; events where it is False read but don't write
+        rows: Number of stacked configurations slots is laid out in (see _groups)
+
+    Returns the counter value each event saw (before its own update).
+    """
+    n = len(slots)
+    if n == 0:
+        return np.empty(0, dtype=table.dtype)
+
+    bits = np.asarray(bits, dtype=np.int16)
+    if bits.min() < 1 or bits.max() > 14:
+        raise ValueError(f"Counter width must be 1-14 bits, got {bits.min()}-{bits.max()}")
+    order, s, rank, ends = _groups(slots, rows)
+    top = (np.int16(1) << bits) - 1
+    if top.ndim:
+        top = top[order]
+    limit = int(top.max())
+
+    # Each event is x -> clip(x + a, lo, hi); inclusive scan within each slot
+    # |a| beyond the widest counter's top changes nothing, so it is clamped to fit int16
+    a = np.where(up[order], 1, -1).astype(np.int16)
+    if update is not None:
+        a[~update[order]] = 0
+    lo = np.zeros(n, dtype=np.int16)
+    hi = np.broadcast_to(top, n).astype(np.int16)
+
+    longest = int(rank.max()) + 1
+    k = 1
+    while k < longest:
+        valid = rank[k:] >= k
+        ca, clo, chi = a[k:], lo[k:], hi[k:]
+        # current o previous: shift the earlier map's bounds through the later one
+        na = np.where(valid, np.clip(a[:-k] + ca, -limit, limit), ca)
+        nlo = np.where(valid, np.clip(lo[:-k] + ca, clo, chi), clo)
+        nhi = np.where(valid, np.clip(hi[:-k] + ca, clo, chi), chi)
+        a[k:], lo[k:], hi[k:] = na, nlo, nhi
+        k *= 2
+
+    init = table[s].astype(np.int16)
+    after = np.clip(init + a, lo, hi)
+    before = init.copy()
+    before[1:] = np.where(rank[1:] > 0, after[:-1], init[1:])
+
+    table[s[ends]] = after[ends]
+
+    seen = np.empty(n, dtype=table.dtype)
+    seen[order] = before
+    return seen
+
+def global_history(taken, carry):
+    """Global history register before each branch
+
+    Args:
+        taken: Outcomes of this batch
+        carry: Outcomes of the last len(carry) earlier branches, oldest first
+
+    Returns (history, new carry); bit 0 is the most recent outcome.
+    """
+    length = len(carry)
+    n = len(taken)
+    history = np.zeros(n, dtype=np.int64)
+    if length == 0:
+        return history, carry
+    ext = np.concatenate((carry, taken))
+    for j in range(1, length + 1):
+        history |= ext[length - j:length - j + n].astype(np.int64) << (j - 1)
+    return history, ext[-length:]
+
+def local_history(slots, taken, table, length, rows=1):
+    """Per-slot history register before each branch; table updated in place"""
+    n = len(slots)
+    if n == 0 or length == 0:
+        return np.zeros(n, dtype=np.int64)
+
+    mask = (1 << length) - 1
+    order, s, rank, ends = _groups(slots, rows)
+    t = taken[order].astype(np.int64)
+
+    history = (table[s] << np.minimum(rank, length)) & mask
+    for j in range(1, length + 1):
+        history[j:] |= np.where(rank[j:] >= j, t[:-j] << (j - 1), 0)
+
+    table[s[ends]] = ((history[ends] << 1) | t[ends]) & mask
+
+    out = np.empty(n, dtype=np.int64)
+    out[order] = history
+    return out
+
+class BimodalModel:
+    """PC-indexed saturating counters"""
+
+    name = "bimodal"
+
+    def __init__(self, globalPredictorSize=4096, globalCtrBits=2, instShiftAmt=2):
+        self.index_bits = _log2(globalPredictorSize, "globalPredictorSize")
+        self.ctr_bits = globalCtrBits
+        self.shift = instShiftAmt
+
+    def storage_bits(self):
+        return (1 << self.index_bits) * self.ctr_bits
+
+class GshareModel:
+    """Counters indexed by PC xor global history"""
+
+    name = "gshare"
+
+    def __init__(self, globalPredictorSize=4096, globalCtrBits=2, historyLength=None,
+                 instShiftAmt=2):
+        self.index_bits = _log2(globalPredictorSize, "globalPredictorSize")
+        self.ctr_bits = globalCtrBits
+        self.history_length = self.index_bits if historyLength is None else historyLength
+        self.shift = instShiftAmt
+
+    def storage_bits(self):
+        return (1 << self.index_bits) * self.ctr_bits + self.history_length
+
+class TournamentModel:
+    """Local/global predictors with a choice table, after gem5's TournamentBP"""
+
+    name = "tournament"
+
+    def __init__(self, localPredictorSize=2048, localHistoryTableSize=2048, localCtrBits=2,
+                 globalPredictorSize=8192, globalCtrBits=2,
+                 choicePredictorSize=8192, choiceCtrBits=2, instShiftAmt=2):
+        self.local_history_bits = _log2(localPredictorSize, "localPredictorSize")
+        self.lht_bits = _log2(localHistoryTableSize, "localHistoryTableSize")
+        self.global_bits = _log2(globalPredictorSize, "globalPredictorSize")
+        self.choice_bits = _log2(choicePredictorSize, "choicePredictorSize")
+        self.local_ctr_bits = localCtrBits
+        self.global_ctr_bits = globalCtrBits
+        self.choice_ctr_bits = choiceCtrBits
+        self.history_length = max(self.global_bits, self.choice_bits)
+        self.shift = instShiftAmt
+
+    def storage_bits(self):
+        return ((1 << self.lht_bits) * self.local_history_bits
+                + (1 << self.local_history_bits) * self.local_ctr_bits
+                + (1 << self.global_bits) * self.global_ctr_bits
+                + (1 << self.choice_bits) * self.choice_ctr_bits
+                + self.history_length)
+
+MODELS = {
+    'bimodal': BimodalModel,
+    'gshare': GshareModel,
+    'tournament': TournamentModel,
+}
+
+class ModelBank:
+    """K configurations of one predictor, replayed together
+
+    State is stacked over the configuration axis: every table is one flat
+    array holding each configuration's copy back to back, indexed through
+    per-configuration offsets. A batch of n branches becomes one scan over
+    K x n events instead of K passes over the trace.
+    """
+
+    def __init__(self, predictor, configs):
+        if predictor not in MODELS:
+            raise ValueError(f"No replay model for predictor: {predictor}")
+        self.predictor = predictor
+        self.configs = [dict(c) for c in configs]
+        self.models = [MODELS[predictor](**c) for c in self.configs]
+        self.shift = self._column('shift')
+
+        if predictor == 'tournament':
+            self.lht_off, self.local_histories = self._table('lht_bits', np.int64)
+            self.local_off, self.local_counters = self._table('local_history_bits')
+            self.global_off, self.global_counters = self._table('global_bits')
+            self.choice_off, self.choice_counters = self._table('choice_bits')
+        else:
+            self.offsets, self.counters = self._table('index_bits')
+
+        if predictor != 'bimodal':
+            self.history = np.zeros(int(self._column('history_length').max()), dtype=bool)
+
+    def __len__(self):
+        return len(self.models)
+
+    def _column(self, attr):
+        """(K, 1) array of one attribute across configurations"""
+        return np.array([getattr(m, attr) for m in self.models], dtype=np.int64)[:, None]
+
+    def _table(self, bits_attr, dtype=np.int32):
+        sizes = 1 << self._column(bits_attr)[:, 0]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))[:, None]
+        return offsets, np.zeros(int(sizes.sum()), dtype=dtype)
+
+    def _counters(self, slots, up, table, bits_attr, update=None):
+        """Stacked counter_scan; returns (K, n) taken/not-taken predictions"""
+        bits = self._column(bits_attr)
+        seen = counter_scan(slots.ravel(), np.broadcast_to(up, slots.shape).ravel(), table,
+                            np.broadcast_to(bits, slots.shape).ravel(),
+                            None if update is None else update.ravel(), rows=len(self))
+        return seen.reshape(slots.shape) >> (bits - 1) == 1
+
+    def _masked(self, values, bits_attr):
+        return values & ((1 << self._column(bits_attr)) - 1)
+
+    def predict(self, pcs, taken):
+        """(K, n) predictions for a batch of conditional branches
+
+        State carries over from batch to batch.
+        """
+        pc = pcs[None, :] >> self.shift
+
+        if self.predictor == 'bimodal':
+            slots = self._masked(pc, 'index_bits') + self.offsets
+            return self._counters(slots, taken, self.counters, 'ctr_bits')
+
+        history, self.history = global_history(taken, self.history)
+
+        if self.predictor == 'gshare':
+            history = self._masked(history[None, :], 'history_length')
+            slots = self._masked(pc ^ history, 'index_bits') + self.offsets
+            return self._counters(slots, taken, self.counters, 'ctr_bits')
+
+        lht_slots = self._masked(pc, 'lht_bits') + self.lht_off
+        local_hist = local_history(lht_slots.ravel(), np.tile(taken, len(self)),
+                                   self.local_histories,
+                                   int(self._column('local_history_bits').max()), len(self))
+        local_slots = self._masked(local_hist.reshape(lht_slots.shape),
+                                   'local_history_bits') + self.local_off
+        local_pred = self._counters(local_slots, taken, self.local_counters, 'local_ctr_bits')
+
+        global_slots = self._masked(history[None, :], 'global_bits') + self.global_off
+        global_pred = self._counters(global_slots, taken, self.global_counters,
+                                     'global_ctr_bits')
+
+        # The choice counter only moves when the two disagree, towards the one that was right
+        choice_slots = self._masked(history[None, :], 'choice_bits') + self.choice_off
+        use_global = self._counters(choice_slots, global_pred == taken, self.choice_counters,
+                                    'choice_ctr_bits', update=local_pred != global_pred)
+
+        return np.where(use_global, global_pred, local_pred)
+
+    def mispredictions(self, pcs, taken, batch_events=1 << 22):
+        """(K,) misprediction counts for a batch
+
+        Long batches are split so the K x n working set stays bounded.
+        """
+        wrong = np.zeros(len(self), dtype=np.int64)
+        step = max(1, batch_events // len(self))
+        for start in range(0, len(pcs), step):
+            t = taken[start:start + step]
+            wrong += np.count_nonzero(self.predict(pcs[start:start + step], t) != t, axis=1)
+        return wrong
+
+def create_model(predictor, **params):
+    """Single-configuration bank, with the same overrides as --bp-param"""
+    return ModelBank(predictor, [params])
+
+def trace_chunks(path, chunk_records=DEFAULT_CHUNK_RECORDS):
+    """Yield (pcs, taken) arrays of conditional branches from a trace
+
+    Accepts a .btrace file or a text file of gem5 Exec debug output.
+    """
+    path = Path(path)
+    if path.suffix == ".btrace":
+        with TraceReader(path) as trace:
+            for pcs, _targets, taken, btypes in trace.iter_chunks():
+                cond = btypes == DIRECT_COND
+                yield pcs[cond], taken[cond]
+        return
+
+    pcs, taken = [], []
+    with open(path, errors="replace") as f:
+        for pc, _target, was_taken, btype in parse_exec_trace(f):
+            if btype != DIRECT_COND:
+                continue
+            pcs.append(pc)
+            taken.append(was_taken)
+            if len(pcs) >= chunk_records:
+                yield np.array(pcs, dtype=np.int64), np.array(taken, dtype=bool)
+                pcs, taken = [], []
+    if pcs:
+        yield np.array(pcs, dtype=np.int64), np.array(taken, dtype=bool)
+
+def replay(banks, chunks):
+    """Run every bank over the same branch stream, reading it once
+
+    Returns one dict per configuration: predictor, params, branches,
+    mispredicted, mispredict_rate (a percentage, comparable to
+    condIncorrect / condPredicted from gem5) and storage_bits.
+    """
+    branches = 0
+    wrong = [np.zeros(len(bank), dtype=np.int64) for bank in banks]
+    for pcs, taken in chunks:
+        branches += len(pcs)
+        for bank, counts in zip(banks, wrong):
+            counts += bank.mispredictions(pcs, taken)
+
+    results = []
+    for bank, counts in zip(banks, wrong):
+        for params, model, mispredicted in zip(bank.configs, bank.models, counts.tolist()):
+            results.append({
+                'predictor': bank.predictor,
+                'params': params,
+                'branches': branches,
+                'mispredicted': mispredicted,
+                'mispredict_rate': mispredicted / branches * 100 if branches else None,
+                'storage_bits': model.storage_bits(),
+            })
+    return results
+
+def _parse_param(text):
+    name, sep, value = text.partition('=')
+    if not sep:
+        raise ValueError(f"Expected NAME=VALUE, got: {text}")
+    return name, parse_value(value)
+
+def plan_scan(spec, method=None, budget=None, seed=None):
+    """{predictor: [param dicts]} from a sweep spec (see sweep.py)
+
+    Replay is cheap, so without a sampling override the whole grid is
+    scanned regardless of the spec's gem5 budget.
+    """
+    from sweep import knob_levels, sample_points
+
+    sampling = spec.get('sampling', {})
+    plan = {}
+    for predictor, knobs in sorted(spec['predictors'].items()):
+        if predictor not in MODELS:
+            print(f"⚠ No replay model for {predictor}, skipping")
+            continue
+        levels = {name: knob_levels(knob) for name, knob in knobs.items()}
+        plan[predictor] = sample_points(levels, method or 'grid', budget,
+                                        seed if seed is not None else sampling.get('seed', 0))
+    return plan
+
+def export_results(results, benchmark):
+    """Write scan results where parse_results.py picks them up
+
+    Each configuration becomes results/replay-<predictor>@<hash>/<benchmark>/
+    with a replay.json record and params.json, so it flows into the
+    results store, the JSON/CSV exports and the graphs like a gem5 run.
+    """
+    import json
+    import run_all_experiments as runner
+    from sweep import point_label
+
+    for r in results:
+        label = "replay-" + point_label(r['predictor'], r['params'])
+        output_dir = runner.output_dir_for(label, benchmark)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        record = {key: r[key] for key in ('branches', 'mispredicted', 'mispredict_rate',
+                                          'storage_bits')}
+        with open(output_dir / REPLAY_FILE, 'w') as f:
+            json.dump(record, f, indent=2)
+        runner.write_params(output_dir, {'predictor': r['predictor'], 'cpu_model': 'replay',
+                                         'storage_bits': r['storage_bits'],
+                                         'bp_params': r['params']})
+    print(f"✓ Exported {len(results)} configuration(s) to results/replay-*/")
+
+def print_results(title, results):
+    print(f"\n{title}")
+    print("-" * 80)
+    print(f"{'Predictor':<12} {'Storage (KiB)':>14} {'Mispred %':>10}  Parameters")
+    for r in sorted(results, key=lambda r: (r['predictor'], r['mispredict_rate'] or 0)):
+        rate = f"{r['mispredict_rate']:.2f}%" if r['mispredict_rate'] is not None else "N/A"
+        params = ", ".join(f"{k}={v}" for k, v in sorted(r['params'].items()))
+        print(f"{r['predictor']:<12} {r['storage_bits'] / 8192:>14.2f} {rate:>10}  {params}")
+
+def run_replay(trace, banks):
+    configs = sum(len(bank) for bank in banks)
+    start = time.perf_counter()
+    results = replay(banks, trace_chunks(trace))
+    elapsed = time.perf_counter() - start
+
+    branches = results[0]['branches'] if results else 0
+    print(f"\nReplayed {branches:,} branches x {configs} configuration(s) in {elapsed:.2f}s "
+          f"({branches * configs / max(elapsed, 1e-9) / 1e6:.1f}M predictions/s)")
+    return results
+
+def main():
+    from branch_trace import trace_path_for
+
+    parser = argparse.ArgumentParser(description="Replay a branch trace through predictor models")
+    parser.add_argument('trace', nargs='?', type=Path,
+                        help='.btrace file or gem5 Exec debug output')
+    parser.add_argument('--predictor', choices=list(MODELS) + ['all'], default='all')
+    parser.add_argument('--bp-param', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override a model parameter (repeatable), e.g. globalPredictorSize=8192')
+    parser.add_argument('--scan', type=Path, metavar='SPEC',
+                        help='Replay every configuration of a sweep spec in one pass per trace')
+    parser.add_argument('--method', choices=('grid', 'random', 'lhs'),
+                        help='Sample the scan instead of covering the full grid')
+    parser.add_argument('--budget', type=int, help='Per-predictor point budget for --method')
+    parser.add_argument('--seed', type=int, help='Sampling seed')
+    parser.add_argument('--export', action='store_true',
+                        help='Write scan results to results/ for parse_results.py')
+
+    args = parser.parse_args()
+
+    if args.scan:
+        from sweep import load_spec
+        import run_all_experiments as runner
+
+        try:
+            spec = load_spec(args.scan)
+            plan = plan_scan(spec, args.method, args.budget, args.seed)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+        if args.trace:
+            traces = {args.trace.stem: args.trace}
+        else:
+            traces = {b: trace_path_for(runner.BENCHMARK_DIR / b)
+                      for b in spec.get('benchmarks', runner.BENCHMARKS)}
+
+        for benchmark, trace in traces.items():
+            if not trace.exists():
+                print(f"✗ {benchmark}: no trace (run: python3 scripts/branch_trace.py capture "
+                      f"--benchmark {benchmark})")
+                continue
+            banks = [ModelBank(p, configs) for p, configs in plan.items()]
+            results = run_replay(trace, banks)
+            print_results(f"{benchmark.upper()} - {trace.name}", results)
+            if args.export:
+                export_results(results, benchmark)
+        return
+
+    if args.trace is None:
+        parser.error("a trace is required unless --scan is given")
+    if not args.trace.exists():
+        print(f"Trace not found: {args.trace}")
+        sys.exit(1)
+
+    try:
+        params = dict(_parse_param(p) for p in args.bp_param)
+        predictors = list(MODELS) if args.predictor == 'all' else [args.predictor]
+        banks = [create_model(p, **params) for p in predictors]
+    except (TypeError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    results = run_replay(args.trace, banks)
+    print_results(args.trace.name, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of finished gem5 runs
+
+A run is keyed by a fingerprint of everything that can change its output:
+the benchmark binary, the gem5 binary, the simulation scripts and the
+resolved predictor parameters. Finished runs are stored under
+<cache_dir>/<key[:2]>/<key>/ and copied back into results/ on a hit.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+# Bump when the fingerprint recipe changes so old entries stop matching
+FINGERPRINT_VERSION = 1
+
+# Marker written next to stats.txt recording which fingerprint produced it
+FINGERPRINT_FILE = "fingerprint.txt"
+
+# Marker the runner keeps in a results directory while gem5 writes to it;
+# only removed once the run succeeded
+INCOMPLETE_FILE = "INCOMPLETE"
+
+STATS_END_MARKER = "End Simulation Statistics"
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, memoized on (path, size, mtime)"""
+    path = Path(path)
+    st = path.stat()
+    memo_key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            return _digest_memo[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+def run_fingerprint(gem5_bin, sources, benchmark_path, params):
+    """Fingerprint of a single run
+
+    Args:
+        gem5_bin: Path to the gem5 binary
+        sources: Simulation scripts the run depends on
+        benchmark_path: Path to the RISC-V benchmark binary
+        params: Dict of resolved run parameters (predictor, sizes, ...)
+    """
+    key = {
+        'version': FINGERPRINT_VERSION,
+        'gem5': file_digest(gem5_bin),
+        'sources': {Path(s).name: file_digest(s) for s in sources},
+        'binary': file_digest(benchmark_path),
+        'params': params,
+    }
+    blob = json.dumps(key, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+def stats_complete(stats_path):
+    """True if stats.txt exists and gem5 finished writing it"""
+    stats_path = Path(stats_path)
+    if not stats_path.is_file():
+        return False
+
+    # The end marker is the last line gem5 writes; only read the tail
+    with open(stats_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read().decode(errors='replace')
+    return STATS_END_MARKER in tail
+
+def run_complete(run_dir):
+    """False for a results directory left behind by a killed or failed run
+
+    Periodic stats dumps each end with the end marker, so a run killed
+    between dumps leaves a stats.txt that looks finished; the runner's
+    INCOMPLETE marker is what tells them apart.
+    """
+    run_dir = Path(run_dir)
+    if (run_dir / INCOMPLETE_FILE).exists():
+        return False
+    stats_path = run_dir / "stats.txt"
+    return not stats_path.exists() or stats_complete(stats_path)
+
+def read_fingerprint(output_dir):
+    """Fingerprint recorded in a results directory, or None"""
+    marker = Path(output_dir) / FINGERPRINT_FILE
+    if not marker.is_file():
+        return None
+    return marker.read_text().strip()
+
+def write_fingerprint(output_dir, key):
+    """Record which fingerprint produced a results directory"""
+    (Path(output_dir) / FINGERPRINT_FILE).write_text(key + "\n")
+
+class ResultCache:
+    """On-disk store of finished runs, addressed by fingerprint"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def entry_dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def lookup(self, key, output_dir, force=False):
+        """Populate output_dir from a matching finished run
+
+        Returns True on a hit. A results directory that already holds a
+        complete stats.txt from the same fingerprint counts as a hit
+        without copying anything. With force every lookup is a miss.
+        A hit clears any INCOMPLETE marker an interrupted run left behind,
+        and any file of an earlier run that the entry does not have.
+        """
+        output_dir = Path(output_dir)
+
+        if force:
+            self._count(hit=False)
+            return False
+
+        if (read_fingerprint(output_dir) == key
+                and stats_complete(output_dir / "stats.txt")):
+            (output_dir / INCOMPLETE_FILE).unlink(missing_ok=True)
+            self._count(hit=True)
+            return True
+
+        entry = self.entry_dir(key)
+        if not stats_complete(entry / "stats.txt"):
+            self._count(hit=False)
+            return False
+
+        members = [m for m in entry.iterdir() if m.is_file() and m.name != INCOMPLETE_FILE]
+        names = {m.name for m in members}
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # e.g. a roi.json or timing.json the cached run never wrote
+        for stale in output_dir.iterdir():
+            if stale.is_file() and stale.name not in names and stale.name != INCOMPLETE_FILE:
+                stale.unlink()
+        for member in members:
+            shutil.copy2(member, output_dir / member.name)
+        write_fingerprint(output_dir, key)
+        (output_dir / INCOMPLETE_FILE).unlink(missing_ok=True)
+
+        self._count(hit=True)
+        return True
+
+    def store(self, key, output_dir):
+        """Copy a finished run into the cache
+
+        Only runs with a complete stats.txt are stored. The entry is built
+        in a temporary directory and renamed into place so concurrent
+        readers never see a partial entry.
+        """
+        output_dir = Path(output_dir)
+        if not stats_complete(output_dir / "stats.txt"):
+            return False
+
+        write_fingerprint(output_dir, key)
+
+        entry = self.entry_dir(key)
+        if entry.exists():
+            return True
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:8]}-", dir=entry.parent))
+        try:
+            for member in output_dir.iterdir():
+                if member.is_file():
+                    shutil.copy2(member, staging / member.name)
+            os.rename(staging, entry)
+        except OSError:
+            # Another writer got there first, or the copy failed
+            shutil.rmtree(staging, ignore_errors=True)
+            return entry.exists()
+        return True
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def report(self):
+        """Print hit/miss totals"""
+        total = self.hits + self.misses
+        if total == 0:
+            return
+        print(f"Cache: {self.hits} hit(s), {self.misses} miss(es) "
+              f"({self.hits / total * 100:.0f}% reused) - {self.cache_dir}")
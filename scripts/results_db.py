@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite store for experiment results
+
+Three tables:
+    runs    one row per results/<label>/<benchmark>/ directory; the label
+            is the predictor name, or predictor@variant for sweep points
+    params  (run, name, value) for every knob of a run - predictor, CPU
+            model, predictor table sizes, anything in params.json
+    stats   (run, name, value) for the extracted metrics and, optionally,
+            every stat in stats.txt
+
+The run_metrics view pivots the metrics into columns and adds derived
+metrics (MPKI, CPI) so they can be filtered and sorted in SQL.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+DB_PATH = PROJECT_ROOT / "results" / "analysis" / "results.db"
+
+# Optional per-run parameter file written by the runner
+PARAMS_FILE = "params.json"
+
+# Columns of the runs table that can be filtered on directly
+RUN_COLUMNS = ('label', 'predictor', 'benchmark', 'cpu_model')
+
+# config.json fields that say nothing about the predictor itself
+_CONFIG_NOISE = {'type', 'cxx_class', 'name', 'path', 'eventq_index'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_dir TEXT UNIQUE NOT NULL,
+    label TEXT NOT NULL,
+    predictor TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    cpu_model TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_predictor_benchmark ON runs(predictor, benchmark);
+CREATE INDEX IF NOT EXISTS runs_benchmark ON runs(benchmark);
+CREATE INDEX IF NOT EXISTS runs_cpu_model ON runs(cpu_model);
+
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS params_name_value ON params(name, value);
+
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stats_name ON stats(name);
+"""
+
+# Derived metrics, computed from the pivoted metric columns
+DERIVED_METRICS = {
+    'mpki': "1000.0 * branch_pred_cond_incorrect / NULLIF(num_insts, 0)",
+    'cpi': "1.0 * num_cycles / NULLIF(num_insts, 0)",
+    'branches_per_kinst': "1000.0 * branch_pred_cond_predicted / NULLIF(num_insts, 0)",
+}
+
+def open_store(db_path=DB_PATH, metrics=None):
+    """Open (and create if needed) the results store
+
+    Args:
+        db_path: SQLite file location
+        metrics: Metric names to expose as columns of the run_metrics view
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    if metrics:
+        create_metrics_view(conn, metrics)
+    return conn
+
+def create_metrics_view(conn, metrics):
+    """(Re)create the run_metrics view: one row per run, one column per metric"""
+    pivots = ",\n        ".join(
+        f"MAX(CASE WHEN s.name = '{m}' THEN s.value END) AS {m}" for m in metrics)
+    derived = ",\n    ".join(f"{expr} AS {name}" for name, expr in DERIVED_METRICS.items())
+
+    conn.executescript(f"""
+DROP VIEW IF EXISTS run_metrics;
+CREATE VIEW run_metrics AS
+SELECT *,
+    {derived}
+FROM (
+    SELECT r.id, r.run_dir, r.label, r.predictor, r.benchmark, r.cpu_model,
+        {pivots}
+    FROM runs r LEFT JOIN stats s ON s.run_id = r.id
+    GROUP BY r.id
+);
+""")
+
+def config_params(config_path):
+    """Predictor and CPU parameters from a gem5 config.json
+
+    Returns {} if the file is missing or unreadable.
+    """
+    try:
+        with open(config_path) as f:
+            return config_params_text(f.read())
+    except OSError:
+        return {}
+
+def config_params_text(text):
+    """config_params() on config.json contents already in memory"""
+    try:
+        config = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+
+    cpu = config.get('system', {}).get('cpu')
+    if isinstance(cpu, list):
+        cpu = cpu[0] if cpu else None
+    if not cpu:
+        return {}
+
+    params = {'cpu_model': cpu.get('type')}
+    bp = cpu.get('branchPred')
+    if bp:
+        params['bp.type'] = bp.get('type')
+        _flatten_params(bp, 'bp', params)
+    return params
+
+def _flatten_params(node, prefix, out):
+    for key, value in node.items():
+        if key in _CONFIG_NOISE:
+            continue
+        if isinstance(value, dict):
+            _flatten_params(value, f"{prefix}.{key}", out)
+        elif isinstance(value, (int, float, str, bool)):
+            out[f"{prefix}.{key}"] = value
+
+def run_params(run_dir, predictor, benchmark, read_text=None):
+    """Every known parameter of a finished run
+
+    `predictor` may be a results directory label like bimodal@1a2b3c4d;
+    params.json, when present, has the final say. read_text(name) reads
+    the run's files from elsewhere (e.g. the run archive) instead of
+    run_dir.
+    """
+    params = {'predictor': predictor.partition('@')[0], 'benchmark': benchmark}
+    if read_text is None:
+        run_dir = Path(run_dir)
+        params.update(config_params(run_dir / "config.json"))
+        params_file = run_dir / PARAMS_FILE
+        params_text = params_file.read_text() if params_file.exists() else None
+    else:
+        params.update(config_params_text(read_text("config.json")))
+        params_text = read_text(PARAMS_FILE)
+
+    if params_text is not None:
+        try:
+            params.update(json.loads(params_text))
+        except ValueError:
+            pass
+    return params
+
+def insert_runs(conn, runs):
+    """Bulk insert or replace runs
+
+    Args:
+        runs: Iterable of dicts with run_dir, label, predictor, benchmark,
+              params (dict) and stats (dict of name -> number)
+    """
+    with conn:
+        for run in runs:
+            run_dir = str(run['run_dir'])
+            conn.execute("DELETE FROM runs WHERE run_dir = ?", (run_dir,))
+            params = run.get('params', {})
+            cur = conn.execute(
+                "INSERT INTO runs (run_dir, label, predictor, benchmark, cpu_model) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (run_dir, run.get('label', run['predictor']), run['predictor'],
+                 run['benchmark'], params.get('cpu_model')))
+            run_id = cur.lastrowid
+
+            conn.executemany(
+                "INSERT INTO params (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, name, _sql_value(value)) for name, value in params.items()])
+            conn.executemany(
+                "INSERT INTO stats (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, name, value) for name, value in run['stats'].items()
+                 if value is not None])
+
+def prune_runs(conn, keep_run_dirs):
+    """Delete runs whose directory is not in keep_run_dirs"""
+    keep = {str(d) for d in keep_run_dirs}
+    stale = [row['run_dir'] for row in conn.execute("SELECT run_dir FROM runs")
+             if row['run_dir'] not in keep]
+    with conn:
+        conn.executemany("DELETE FROM runs WHERE run_dir = ?", [(d,) for d in stale])
+    return len(stale)
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def query_runs(conn, columns=None, order_by=None, **filters):
+    """Rows of run_metrics matching every filter
+
+    Filters on predictor/benchmark/cpu_model match the run directly; any
+    other name matches a parameter, e.g. query_runs(conn,
+    **{'bp.globalPredictorSize': 4096}). Columns that are not metrics are
+    looked up as parameters too.
+    """
+    where, args = [], []
+    for name, value in filters.items():
+        if name in RUN_COLUMNS:
+            where.append(f"m.{name} = ?")
+            args.append(value)
+        else:
+            where.append("EXISTS (SELECT 1 FROM params p WHERE p.run_id = m.id "
+                         "AND p.name = ? AND p.value = ?)")
+            args += [name, _sql_value(value)]
+
+    view_columns = {row[1] for row in conn.execute("PRAGMA table_info(run_metrics)")}
+    select_parts, select_args = [], []
+    for column in columns or []:
+        if column in view_columns:
+            select_parts.append(f'm."{column}"')
+        else:
+            # Not a metric: show the parameter of that name instead
+            select_parts.append("(SELECT p.value FROM params p WHERE p.run_id = m.id "
+                                f"AND p.name = ?) AS \"{column}\"")
+            select_args.append(column)
+    select = ", ".join(select_parts) if select_parts else "m.*"
+    args = select_args + args
+    sql = f"SELECT {select} FROM run_metrics m"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f' ORDER BY {order_by or "m.label, m.benchmark"}'
+    return [dict(row) for row in conn.execute(sql, args)]
+
+def fetch_results(conn, metrics):
+    """Nested {label: {benchmark: {metric: value}}} view of the store
+
+    Same shape parse_results.collect_all_results() returns, so the JSON
+    and CSV exports are unchanged.
+    """
+    results = {}
+    for row in query_runs(conn, columns=['label', 'benchmark'] + list(metrics)):
+        stats = {m: _native(row[m]) for m in metrics}
+        results.setdefault(row['label'], {})[row['benchmark']] = stats
+    return results
+
+def _native(value):
+    """Counts come back from REAL columns as floats; restore ints"""
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+        return int(value)
+    return value
+
+def _parse_filter(text):
+    name, sep, value = text.partition('=')
+    if not sep:
+        raise ValueError(f"Expected NAME=VALUE, got: {text}")
+    try:
+        value = int(value)
+    except ValueError:
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    return name, value
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the results store")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help='Results database')
+    parser.add_argument('--where', action='append', default=[], metavar='NAME=VALUE',
+                        help='Filter on a run column or parameter (repeatable)')
+    parser.add_argument('--columns', default='predictor,benchmark,ipc,mispredict_rate,mpki',
+                        help='Comma-separated run_metrics columns to show')
+    parser.add_argument('--params', action='store_true',
+                        help='List known parameter names and exit')
+
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"Results database not found: {args.db}")
+        print("  Run: python3 scripts/parse_results.py")
+        return
+
+    conn = open_store(args.db)
+
+    if args.params:
+        for row in conn.execute("SELECT DISTINCT name FROM params ORDER BY name"):
+            print(row['name'])
+        return
+
+    columns = [c.strip() for c in args.columns.split(',') if c.strip()]
+    filters = dict(_parse_filter(w) for w in args.where)
+    rows = query_runs(conn, columns=columns, **filters)
+
+    print("  ".join(f"{c:<16}" for c in columns))
+    print("-" * (18 * len(columns)))
+    for row in rows:
+        cells = []
+        for c in columns:
+            value = row[c]
+            if isinstance(value, float):
+                value = f"{value:.4f}"
+            cells.append(f"{'' if value is None else value!s:<16}")
+        print("  ".join(cells))
+    print(f"\n{len(rows)} run(s)")
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,30 @@ Runs all predictors (bimodal, gshare, tournament) on all benchmarks
 
 import os
 import sys
+import time
+import signal
 import subprocess
 import argparse
+import json
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from result_cache import (ResultCache, run_fingerprint, run_complete, stats_complete,
+                          FINGERPRINT_FILE, INCOMPLETE_FILE)
+from campaign_journal import CampaignJournal, finished_runs, JOURNAL_FILE
+from run_monitor import RunMonitor, RunHistory, STALL_TIMEOUT, RUNAWAY_FACTOR
+import host_perf
+import build_variants
+import phase_timing
+import run_archive
+import scheduler
+from parse_results import ROI_FILE
+import multi_predictor
 
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent.absolute()
@@ -16,6 +37,37 @@ GEM5_BIN = PROJECT_ROOT / "gem5" / "build" / "RISCV" / "gem5.opt"
 BENCHMARK_DIR = PROJECT_ROOT / "benchmarks"
 RESULTS_DIR = PROJECT_ROOT / "results"
 SRC_DIR = PROJECT_ROOT / "src"
+CACHE_DIR = PROJECT_ROOT / ".cache" / "runs"
+
+CONFIGS_DIR = PROJECT_ROOT / "configs"
+
+# Simulation scripts whose contents feed into every run's fingerprint
+SIM_SOURCES = [
+    SRC_DIR / "run_branch_pred.py",
+    SRC_DIR / "system_setup.py",
+] + sorted(CONFIGS_DIR.glob("*.py"))
+
+# Fast-forward checkpoints shared by every predictor of a benchmark
+CHECKPOINT_DIR = PROJECT_ROOT / ".cache" / "checkpoints"
+CHECKPOINT_SOURCES = [SRC_DIR / "run_branch_pred.py", SRC_DIR / "system_setup.py"]
+
+# Resolved parameters of each run, for parse_results / results_db
+PARAMS_FILE = "params.json"
+
+# Files run_branch_pred.py writes only in some runs; claim_output drops
+# them so an earlier run's copy is never read as this run's
+RUN_SIDECARS = (ROI_FILE, phase_timing.TIMING_FILE)
+
+# Run parameters passed on to the benchmark itself ([size] [seed])
+WORKLOAD_PARAMS = ('size', 'seed')
+
+# Benchmarks whose seed-0 (original) input does not grow with the size:
+# BFS's fixed graph only ever reaches 7 nodes from node 0
+SIZE_NEEDS_SEED = ("bfs_riscv",)
+
+# Run parameters that pick the binary instead of becoming a
+# run_branch_pred.py flag (compiler-flag variant, see build_variants.py)
+BINARY_PARAMS = ('variant',)
 
 # Predictors to test
 PREDICTORS = ["bimodal", "gshare", "tournament"]
@@ -27,6 +79,42 @@ BENCHMARKS = [
     "hash_lookup_riscv"
 ]
 
+# Limits for every gem5 child. Hung runs are caught from their progress
+# (run_monitor.py); the wall-clock timeout is an optional hard cap
+LIMITS = {
+    'timeout': None,
+    'stall_timeout': STALL_TIMEOUT,
+    'runaway_factor': RUNAWAY_FACTOR,
+}
+
+# Host resources parallel runs may use (scheduler.py); main updates it.
+# max_memory None means whatever is available minus reserve_memory
+RESOURCES = {
+    'max_memory': None,
+    'reserve_memory': scheduler.RESERVE_MEMORY,
+    'reserve_cpus': 0,
+}
+
+# Simulated ticks between PROGRESS lines (1 ms of simulated time)
+PROGRESS_PERIOD = 10**9
+
+# Instruction counts and host times of finished runs, for ETAs
+HISTORY_FILE = PROJECT_ROOT / ".cache" / "run_history.json"
+_history = None
+_history_lock = threading.Lock()
+
+# gem5 children currently running, so Ctrl-C can take them all down
+_active_procs = set()
+_active_lock = threading.Lock()
+_shutdown = threading.Event()
+
+# Output directories whose run should be killed (work_queue.py claim lost)
+_cancelled = set()
+
+# One lock per checkpoint key so a checkpoint is only ever built once
+_checkpoint_locks = {}
+_checkpoint_locks_lock = threading.Lock()
+
 def check_prerequisites():
     """Verify gem5 binary and benchmarks exist"""
     errors = []
@@ -49,54 +137,690 @@ def check_prerequisites():
     
     print("✓ All prerequisites found")
 
-def run_experiment(predictor, benchmark, output_dir):
-    """Run a single experiment: predictor + benchmark"""
+def run_params(predictor, extra_params=None):
+    """Resolved run_branch_pred.py parameters for one experiment"""
+    params = {'predictor': predictor}
+    params.update(extra_params or {})
+    return params
+
+def check_workload(benchmarks, sizes, seed):
+    """Error message if a size would not scale one of the benchmarks, else None"""
+    fixed = [b for b in benchmarks if b in SIZE_NEEDS_SEED]
+    if seed == 0 and any(sizes) and fixed:
+        return (f"--size does not scale {', '.join(fixed)} with seed 0 (the original "
+                f"fixed input); add --seed N with N > 0")
+    return None
+
+def benchmark_path_for(benchmark, params=None):
+    """The binary a run simulates: benchmarks/<benchmark> or a variant build"""
+    variant = (params or {}).get('variant')
+    if variant:
+        return build_variants.variant_binary(variant, benchmark)
+    return BENCHMARK_DIR / benchmark
+
+def params_to_args(params):
+    """Turn a parameter dict into run_branch_pred.py command-line flags
+
+    Predictor overrides (params['bp_params']) become repeated
+    --bp-param NAME=VALUE flags.
+    """
+    args = []
+    for key, value in sorted(params.items()):
+        if key == 'bp_params':
+            for name, bp_value in sorted(value.items()):
+                args += ["--bp-param", f"{name}={bp_value}"]
+        else:
+            args += ["--" + key.replace("_", "-"), str(value)]
+    return args
+
+def gem5_command(output_dir, benchmark_path, args, gem5_options=()):
+    """gem5 command line running run_branch_pred.py on a benchmark
+
+    gem5_options (e.g. --debug-flags) go to gem5 itself, before the script.
+    """
+    return [
+        str(GEM5_BIN),
+        "--outdir", str(output_dir),
+    ] + list(gem5_options) + [
+        str(SRC_DIR / "run_branch_pred.py"),
+        "--binary", str(benchmark_path),
+        "--progress-period", str(PROGRESS_PERIOD),
+    ] + list(args)
+
+def run_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = RunHistory(HISTORY_FILE)
+        return _history
+
+def history_key(benchmark, params):
+    """Runs that execute the same instructions share a history entry;
+    the predictor and stats dumps change the timing, not the work"""
+    length = {k: v for k, v in params.items()
+              if k not in ('predictor', 'bp_params', 'stats_period')}
+    return f"{benchmark} {json.dumps(length, sort_keys=True)}"
+
+def make_monitor(name, expected=None):
+    return RunMonitor(name, expected, stall_timeout=LIMITS['stall_timeout'],
+                      runaway_factor=LIMITS['runaway_factor'])
+
+def record_telemetry(result, workload, peak_rss):
+    """Append a finished run to the host-performance history (host_perf.py)"""
+    output_dir = result['output_dir']
+    try:
+        gem5_build, config = host_perf.build_identity(GEM5_BIN, SIM_SOURCES)
+        host_perf.record_run(output_dir, result['label'], result['predictor'],
+                             output_dir.name, workload, result['elapsed'], peak_rss,
+                             gem5_build, config)
+    except (OSError, sqlite3.Error) as e:
+        print(f"  ⚠ Telemetry not recorded for {output_dir}: {e}")
+
+def write_params(output_dir, params):
+    """Record a run's resolved parameters next to its stats"""
+    flat = {k: v for k, v in params.items() if k != 'bp_params'}
+    for name, value in params.get('bp_params', {}).items():
+        flat[f"bp.{name}"] = value
+    (output_dir / PARAMS_FILE).write_text(json.dumps(flat, indent=2, sort_keys=True) + "\n")
+
+def new_result(predictor, benchmark, output_dir, label=None):
+    """Outcome of a run that has not happened yet"""
+    return {
+        'predictor': predictor,
+        'label': label or predictor,
+        'benchmark': benchmark,
+        'output_dir': output_dir,
+        'status': 'cancelled',
+        'returncode': None,
+        'elapsed': 0.0,
+    }
+
+def claim_output(output_dir, predictor, benchmark):
+    """Create a run's output directory, dropping any stale fingerprint so
+    a failed run can never masquerade as a cached one, and an earlier
+    run's roi.json/timing.json so they are not read as this run's. The
+    INCOMPLETE marker stays until the run succeeds, so whatever stats.txt a killed
+    or crashed run leaves behind is never read as a result"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / FINGERPRINT_FILE).unlink(missing_ok=True)
+    for name in RUN_SIDECARS:
+        (output_dir / name).unlink(missing_ok=True)
+    (output_dir / INCOMPLETE_FILE).write_text(f"{predictor} on {benchmark}\n")
+
+def finish_run(result, params, workload, peak_rss, cache=None, key=None):
+    """Record a successful run: params, telemetry under `workload` and
+    the result cache"""
+    output_dir = result['output_dir']
+    write_params(output_dir, params)
+    (output_dir / INCOMPLETE_FILE).unlink(missing_ok=True)
+    record_telemetry(result, workload, peak_rss)
+    if key is not None:
+        cache.store(key, output_dir)
+
+def run_experiment(predictor, benchmark, output_dir, verbose=True,
+                   cache=None, force=False, extra_params=None, label=None):
+    """Run a single experiment: predictor + benchmark
+
+    With a cache, a finished run with the same fingerprint is reused
+    instead of re-simulated (unless force is set), and successful runs
+    are stored for next time.
+
+    Returns a dict describing the outcome (status, return code, elapsed time).
+    """
     
-    benchmark_path = BENCHMARK_DIR / benchmark
-    run_script = SRC_DIR / "run_branch_pred.py"
+    params = run_params(predictor, extra_params)
+    benchmark_path = benchmark_path_for(benchmark, params)
+    result = new_result(predictor, benchmark, output_dir, label)
     
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if _shutdown.is_set():
+        return result
+    
+    key = None
+    if cache is not None:
+        key = run_fingerprint(GEM5_BIN, SIM_SOURCES, benchmark_path, params)
+        if cache.lookup(key, output_dir, force):
+            result['status'] = 'cached'
+            if verbose:
+                print(f"  Reusing: {predictor} on {benchmark} ({key[:12]})")
+            return result
+    
+    claim_output(output_dir, predictor, benchmark)
+    
+    # Fast-forwarded runs restore a per-benchmark checkpoint; the
+    # fingerprint only needs the fast-forward length, the command needs
+    # the checkpoint itself
+    sim_params = {k: v for k, v in params.items() if k not in BINARY_PARAMS}
+    checkpoint_error = None
+    fast_forward = sim_params.pop('fast_forward', 0)
+    if fast_forward:
+        workload = {k: sim_params[k] for k in WORKLOAD_PARAMS if k in sim_params}
+        checkpoint, checkpoint_error = ensure_checkpoint(benchmark_path, fast_forward,
+                                                         verbose, workload)
+        sim_params['restore_checkpoint'] = checkpoint
     
     # Build gem5 command
-    cmd = [
-        str(GEM5_BIN),
-        "--outdir", str(output_dir),
-        str(run_script),
-        "--binary", str(benchmark_path),
-        "--predictor", predictor
-    ]
+    cmd = gem5_command(output_dir, benchmark_path, params_to_args(sim_params))
+    
+    history = run_history()
+    run_key = history_key(benchmark, params)
+    monitor = make_monitor(f"{label or predictor} + {benchmark}", history.expected(run_key))
+    
+    if verbose:
+        print(f"  Running: {predictor} on {benchmark}")
+        print(f"    Output: {output_dir}")
+    
+    start = time.monotonic()
+    
+    if checkpoint_error:
+        result['status'] = 'failed'
+        result['error'] = checkpoint_error
+    else:
+        status, returncode, error = run_gem5(cmd, output_dir, monitor=monitor)
+        result['status'] = status
+        result['returncode'] = returncode
+        if error:
+            result['error'] = error
+    
+    result['elapsed'] = time.monotonic() - start
     
-    print(f"  Running: {predictor} on {benchmark}")
-    print(f"    Output: {output_dir}")
+    if result['status'] == 'success':
+        if monitor.insts:
+            history.record(run_key, monitor.insts, result['elapsed'])
+        finish_run(result, params, run_key, monitor.peak_rss, cache, key)
     
+    if verbose:
+        print(f"    {describe_result(result)}")
+    
+    return result
+
+def _pump_output(stream, out, monitor):
+    """Copy the child's stdout to disk line by line, feeding the monitor"""
+    for line in stream:
+        out.write(line)
+        monitor.feed(line)
+    stream.close()
+
+def run_gem5(cmd, output_dir, timeout=None, monitor=None):
+    """Run one gem5 child, streaming stdout/stderr into output_dir
+
+    Each child gets its own session so Ctrl-C reaches only us and we
+    decide how to tear the children down. stdout is read as it is
+    produced so the monitor can report progress and kill runs that
+    stall or run away; `timeout` (default LIMITS['timeout']) is a hard
+    wall-clock cap on top of that.
+
+    Returns (status, returncode, error) where status is one of success,
+    failed, timeout, stalled, runaway, killed or error.
+    """
+    timeout = timeout or LIMITS['timeout']
+    monitor = monitor or make_monitor(output_dir.name)
+    status = None
     try:
-        # Run gem5 simulation
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=300  # 5 minute timeout per experiment
-        )
+        with open(output_dir / "stdout.txt", 'w', buffering=1) as out, \
+             open(output_dir / "stderr.txt", 'w') as err:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=err,
+                text=True,
+                start_new_session=True
+            )
+            reader = threading.Thread(target=_pump_output,
+                                      args=(proc.stdout, out, monitor), daemon=True)
+            reader.start()
+            with _active_lock:
+                _active_procs.add(proc)
+            try:
+                # Interrupted while we were starting up
+                if _shutdown.is_set():
+                    _kill_process(proc)
+                deadline = time.monotonic() + timeout if timeout else None
+                while True:
+                    monitor.sample_memory(proc.pid)
+                    try:
+                        proc.wait(timeout=1)
+                        break
+                    except subprocess.TimeoutExpired:
+                        pass
+                    if deadline is not None and time.monotonic() > deadline:
+                        _kill_process(proc)
+                        status = 'timeout'
+                        break
+                    if str(output_dir) in _cancelled:
+                        _kill_process(proc)
+                        status = 'killed'
+                        break
+                    verdict = monitor.check()
+                    if verdict:
+                        _kill_process(proc)
+                        status = verdict
+                        break
+                    monitor.report()
+            except BaseException:
+                _kill_process(proc)
+                raise
+            finally:
+                with _active_lock:
+                    _active_procs.discard(proc)
+                reader.join()
+    except Exception as e:
+        return 'error', None, str(e)
+    
+    if status in ('stalled', 'runaway'):
+        return status, proc.returncode, monitor.reason
+    if status is None:
+        if _shutdown.is_set() and proc.returncode != 0:
+            status = 'killed'
+        elif proc.returncode == 0:
+            status = 'success'
+        else:
+            status = 'failed'
+    return status, proc.returncode, None
+
+def checkpoint_key(benchmark_path, fast_forward, workload=None):
+    """Checkpoints depend on the binary and its size/seed, gem5, the system
+    config and the fast-forward length - never on the predictor"""
+    params = {'mode': 'checkpoint', 'fast_forward': fast_forward}
+    params.update(workload or {})
+    return run_fingerprint(GEM5_BIN, CHECKPOINT_SOURCES, benchmark_path, params)
+
+def ensure_checkpoint(benchmark_path, fast_forward, verbose=True, workload=None):
+    """Path of the fast-forward checkpoint for a benchmark, creating it once
+
+    Concurrent callers for the same checkpoint wait for the first one;
+    the checkpoint is written to a staging directory and renamed into
+    place so other processes never see a half-written one.
+
+    Returns (checkpoint_dir, error).
+    """
+    key = checkpoint_key(benchmark_path, fast_forward, workload)
+    entry = CHECKPOINT_DIR / key[:2] / key
+    checkpoint = entry / "cpt"
+    
+    with _checkpoint_locks_lock:
+        lock = _checkpoint_locks.setdefault(key, threading.Lock())
+    
+    with lock:
+        if (checkpoint / "m5.cpt").exists():
+            return checkpoint, None
+        
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:8]}-", dir=entry.parent))
+        cmd = gem5_command(staging, benchmark_path, [
+            "--fast-forward", str(fast_forward),
+            "--take-checkpoint", str(staging / "cpt"),
+        ] + params_to_args(workload or {}))
         
-        # Save stdout/stderr
-        (output_dir / "stdout.txt").write_text(result.stdout)
-        (output_dir / "stderr.txt").write_text(result.stderr)
+        if verbose:
+            print(f"  Fast-forwarding {benchmark_path.name} by {fast_forward:,} instructions")
+        status, returncode, error = run_gem5(cmd, staging)
         
-        if result.returncode == 0:
-            print(f"    ✓ Success")
-            return True
+        if status != 'success' or not (staging / "cpt" / "m5.cpt").exists():
+            shutil.rmtree(staging, ignore_errors=True)
+            return None, f"checkpoint {status}: {error or f'return code {returncode}'}"
+        
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another process published the same checkpoint first
+            shutil.rmtree(staging, ignore_errors=True)
+        return checkpoint, None
+
+def describe_result(result):
+    """One-line human readable outcome of an experiment"""
+    status = result['status']
+    if status == 'success':
+        return f"✓ Success ({result['elapsed']:.1f}s)"
+    if status == 'cached':
+        return "✓ Cached"
+    if status == 'failed':
+        if result.get('error'):
+            return f"✗ Failed ({result['error']})"
+        return f"✗ Failed (return code: {result['returncode']})"
+    if status == 'timeout':
+        return f"✗ Timeout (>{LIMITS['timeout']}s)"
+    if status in ('stalled', 'runaway'):
+        return f"✗ {status.capitalize()} ({result.get('error')})"
+    if status == 'error':
+        return f"✗ Error: {result.get('error')}"
+    return f"✗ {status.capitalize()}"
+
+def _kill_process(proc):
+    """Kill a gem5 child and everything in its process group"""
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+    proc.wait()
+
+def cancel_run(output_dir, cancel=True):
+    """Kill the gem5 run writing to output_dir (or lift that order)"""
+    with _active_lock:
+        if cancel:
+            _cancelled.add(str(output_dir))
         else:
-            print(f"    ✗ Failed (return code: {result.returncode})")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        print(f"    ✗ Timeout (>5 minutes)")
-        return False
-    except Exception as e:
-        print(f"    ✗ Error: {e}")
-        return False
+            _cancelled.discard(str(output_dir))
+
+def kill_all_children():
+    """Kill every gem5 child that is still running"""
+    _shutdown.set()
+    with _active_lock:
+        procs = list(_active_procs)
+    for proc in procs:
+        _kill_process(proc)
+
+def output_dir_for(predictor, benchmark):
+    """results/predictor/benchmark/ for a given experiment"""
+    return RESULTS_DIR / predictor / benchmark.replace("_riscv", "")
+
+def workload_label(predictor, size=0, seed=0, variant=None):
+    """Results label for a compiler variant or a non-default problem size
+    or seed, e.g. bimodal@n10000-s3 or gshare@O3-n10000"""
+    parts = [variant] if variant else []
+    if size:
+        parts.append(f"n{size}")
+    if seed:
+        parts.append(f"s{seed}")
+    return f"{predictor}@{'-'.join(parts)}" if parts else predictor
+
+def make_experiment(predictor, benchmark, extra_params=None, label=None):
+    """Describe one run for run_serial/run_parallel
+
+    `label` names the results directory (defaults to the predictor), so
+    parameter variants of one predictor land side by side.
+    """
+    label = label or predictor
+    return {
+        'predictor': predictor,
+        'benchmark': benchmark,
+        'label': label,
+        'output_dir': output_dir_for(label, benchmark),
+        'extra_params': dict(extra_params or {}),
+    }
+
+def experiment_id(experiment):
+    """Stable name of an experiment: label, benchmark and a params hash"""
+    blob = json.dumps(experiment['extra_params'], sort_keys=True).encode()
+    name = f"{experiment['label']}__{experiment['benchmark']}"
+    return f"{name.replace('/', '_')}__{hashlib.sha256(blob).hexdigest()[:8]}"
+
+def _submit_args(experiment, verbose, cache, force):
+    return (experiment['predictor'], experiment['benchmark'],
+            experiment['output_dir'], verbose, cache, force,
+            experiment['extra_params'], experiment['label'])
+
+def run_journaled(experiment, verbose, cache=None, force=False, journal=None):
+    """run_experiment, with its start and outcome appended to the journal"""
+    if journal is None:
+        return run_experiment(*_submit_args(experiment, verbose, cache, force))
+    
+    run_id = experiment_id(experiment)
+    journal.started(run_id, experiment)
+    result = run_experiment(*_submit_args(experiment, verbose, cache, force))
+    journal.finished(run_id, experiment, result)
+    return result
+
+def run_multi(experiments, verbose=True, cache=None, force=False, journal=None):
+    """Run experiments that differ only in the predictor as one gem5 process
+
+    run_branch_pred.py --predictors simulates one system per predictor,
+    and the shared output is split back into each experiment's results
+    directory (multi_predictor.py). Cached runs are reused as usual; if
+    only one run is left, it is simulated on its own.
+
+    Returns a result dict per experiment, in order.
+    """
+    results = [None] * len(experiments)
+    todo = []
+    for i, experiment in enumerate(experiments):
+        result = new_result(experiment['predictor'], experiment['benchmark'],
+                            experiment['output_dir'], experiment['label'])
+        params = run_params(experiment['predictor'], experiment['extra_params'])
+        key = None
+        if cache is not None:
+            key = run_fingerprint(GEM5_BIN, SIM_SOURCES,
+                                  benchmark_path_for(experiment['benchmark'], params), params)
+            if cache.lookup(key, experiment['output_dir'], force):
+                result['status'] = 'cached'
+                if verbose:
+                    print(f"  Reusing: {experiment['predictor']} on {experiment['benchmark']} ({key[:12]})")
+                if journal is not None:
+                    journal.started(experiment_id(experiment), experiment)
+                    journal.finished(experiment_id(experiment), experiment, result)
+        results[i] = result
+        if result['status'] != 'cached':
+            todo.append((i, experiment, params, key))
+    
+    if len(todo) == 1:
+        i, experiment, _, _ = todo[0]
+        results[i] = run_journaled(experiment, verbose, cache, force, journal)
+    if len(todo) < 2 or _shutdown.is_set():
+        return results
+    
+    benchmark = todo[0][1]['benchmark']
+    predictors = [experiment['predictor'] for _, experiment, _, _ in todo]
+    names = ", ".join(experiment['label'] for _, experiment, _, _ in todo)
+    group_dir = multi_predictor.MULTI_DIR / experiment_id(todo[0][1])
+    shutil.rmtree(group_dir, ignore_errors=True)
+    group_dir.mkdir(parents=True)
+    
+    sim_params = {k: v for k, v in todo[0][2].items()
+                  if k != 'predictor' and k not in BINARY_PARAMS}
+    cmd = gem5_command(group_dir, benchmark_path_for(benchmark, todo[0][2]),
+                       params_to_args(sim_params) + ["--predictors"] + predictors)
+    
+    for _, experiment, _, _ in todo:
+        if journal is not None:
+            journal.started(experiment_id(experiment), experiment)
+        claim_output(experiment['output_dir'], experiment['predictor'], benchmark)
+    
+    run_key = history_key(benchmark, todo[0][2])
+    monitor = make_monitor(f"{names} + {benchmark}", run_history().expected(run_key))
+    # Wall time and peak RSS are the whole process's, so the samples are
+    # kept apart from single runs
+    telemetry_key = multi_telemetry_key([experiment for _, experiment, _, _ in todo])
+    
+    if verbose:
+        print(f"  Running: {names} on {benchmark} in one process")
+        print(f"    Output: {group_dir}")
+    
+    start = time.monotonic()
+    status, returncode, error = run_gem5(cmd, group_dir, monitor=monitor)
+    elapsed = time.monotonic() - start
+    exits = multi_predictor.read_exits(group_dir) if status == 'success' else {}
+    systems = [record['system'] for record in exits.values()]
+    
+    for i, experiment, params, key in todo:
+        result = results[i]
+        result.update(status=status, returncode=returncode, elapsed=elapsed)
+        if error:
+            result['error'] = error
+        record = exits.get(experiment['predictor'])
+        if status == 'success' and record is None:
+            result.update(status='failed', error=f"no exit in {multi_predictor.MULTI_FILE}")
+        elif status == 'success':
+            try:
+                multi_predictor.split_run(group_dir, record, systems, experiment['output_dir'])
+                finish_run(result, params, telemetry_key, monitor.peak_rss, cache, key)
+            except (OSError, ValueError, KeyError) as e:
+                result.update(status='failed', error=f"splitting shared output: {e}")
+        if journal is not None:
+            journal.finished(experiment_id(experiment), experiment, result)
+        if verbose:
+            print(f"    {result['label']}: {describe_result(result)}")
+    
+    # A failed shared run stays behind for inspection
+    if all(results[i]['status'] == 'success' for i, _, _, _ in todo):
+        shutil.rmtree(group_dir, ignore_errors=True)
+    return results
+
+def run_group(experiments, verbose, cache=None, force=False, journal=None):
+    """Run one group from multi_predictor.group_experiments()"""
+    if len(experiments) == 1:
+        return [run_journaled(experiments[0], verbose, cache, force, journal)]
+    return run_multi(experiments, verbose, cache, force, journal)
+
+def resume_experiments(experiments, journal_path=JOURNAL_FILE):
+    """Split experiments into (to run, already finished)
+
+    A run is finished only if the journal records a successful finish and
+    its results directory still holds a complete stats.txt without the
+    INCOMPLETE marker (or was packed into the run archive); an existing
+    directory alone proves nothing.
+    """
+    done = finished_runs(journal_path)
+    packed = run_archive.archived_runs()
+    pending, finished = [], []
+    for experiment in experiments:
+        output_dir = experiment['output_dir']
+        on_disk = run_complete(output_dir) and stats_complete(output_dir / "stats.txt")
+        archived = str(output_dir.relative_to(RESULTS_DIR)) in packed
+        if experiment_id(experiment) in done and (on_disk or archived):
+            finished.append(experiment)
+        else:
+            pending.append(experiment)
+    return pending, finished
+
+def run_serial(experiments, cache=None, force=False, journal=None, multi=False):
+    """Run experiments one after another, printing as we go
+
+    With multi, runs that differ only in the predictor share one gem5
+    process (run_multi).
+    """
+    results = [None] * len(experiments)
+    total = len(experiments)
+    
+    for group in multi_predictor.group_experiments(experiments, multi):
+        members = [experiments[i] for i in group]
+        labels = ", ".join(e['label'] for e in members)
+        print(f"[{group[0] + 1}/{total}] {labels} + {members[0]['benchmark']}")
+        for i, result in zip(group, run_group(members, True, cache, force, journal)):
+            results[i] = result
+        print()
+    
+    return results
+
+def estimate_experiment(estimator, experiment):
+    """(peak memory, seconds) predicted for one experiment from telemetry"""
+    params = run_params(experiment['predictor'], experiment['extra_params'])
+    return estimator.estimate(experiment['output_dir'].name, experiment['label'],
+                              experiment['predictor'],
+                              history_key(experiment['benchmark'], params))
+
+def multi_telemetry_key(experiments):
+    """Telemetry workload of predictors simulated in one gem5 process"""
+    params = run_params(experiments[0]['predictor'], experiments[0]['extra_params'])
+    return host_perf.multi_workload(history_key(experiments[0]['benchmark'], params),
+                                    [e['predictor'] for e in experiments])
+
+def estimate_group(estimator, experiments):
+    """(peak memory, seconds) predicted for a group sharing one gem5 process
+
+    An earlier run of the same group measured the whole process, so its
+    samples are used as they are. Otherwise the single-run estimates add
+    up: the systems are simulated one after another in a single thread.
+    """
+    estimates = [estimate_experiment(estimator, e) for e in experiments]
+    if len(estimates) == 1:
+        return estimates[0]
+    workload = multi_telemetry_key(experiments)
+    shared = [estimator.measured(e['output_dir'].name, e['label'], workload)
+              for e in experiments]
+    memory = max((m for m, _ in shared if m), default=None)
+    seconds = max((s for _, s in shared if s), default=None)
+    if memory is None:
+        memory = sum(m or scheduler.DEFAULT_MEMORY for m, _ in estimates)
+    if seconds is None and all(s for _, s in estimates):
+        seconds = sum(s for _, s in estimates)
+    return memory, seconds
+
+def run_parallel(experiments, jobs, cache=None, force=False, journal=None, multi=False):
+    """Run experiments concurrently on at most `jobs` workers
+
+    Runs are started longest predicted first and only while the host has
+    a free core and memory for their predicted peak (scheduler.py, within
+    RESOURCES). With multi, runs that differ only in the predictor share
+    one gem5 process. Results are returned in the same order as
+    `experiments`.
+    """
+    results = [None] * len(experiments)
+    total = len(experiments)
+    done = 0
+    groups = multi_predictor.group_experiments(experiments, multi)
+    
+    slots = min(jobs, max(1, scheduler.available_cpus() - RESOURCES['reserve_cpus']))
+    budget = scheduler.ResourceBudget(slots, RESOURCES['max_memory'],
+                                      RESOURCES['reserve_memory'])
+    estimator = scheduler.RunEstimator(history=run_history())
+    estimates = [estimate_group(estimator, [experiments[i] for i in group]) for group in groups]
+    pending = scheduler.longest_first(estimates)
+    print(f"Scheduling {total} runs in {len(groups)} gem5 process(es): {budget.describe()}"
+          if len(groups) < total else f"Scheduling {total} runs: {budget.describe()}")
+    
+    with ThreadPoolExecutor(max_workers=slots) as pool:
+        running = {}
+        try:
+            while pending or running:
+                # Admit in longest-first order; a run that does not fit
+                # lets smaller ones behind it start (backfill)
+                for index in list(pending):
+                    memory = estimates[index][0]
+                    if not budget.fits(memory):
+                        continue
+                    budget.acquire(memory)
+                    future = pool.submit(run_group, [experiments[i] for i in groups[index]],
+                                         False, cache, force, journal)
+                    running[future] = index
+                    pending.remove(index)
+                
+                finished, _ = wait(running, timeout=scheduler.ADMIT_POLL,
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    budget.release(estimates[index][0])
+                    for i, result in zip(groups[index], future.result()):
+                        results[i] = result
+                        done += 1
+                        print(f"[{done}/{total}] {result['label']} + {result['benchmark']}: "
+                              f"{describe_result(result)}")
+        except KeyboardInterrupt:
+            # Kill children before the pool joins its workers, otherwise
+            # leaving the `with` block would wait for every simulation
+            kill_all_children()
+            raise
+    
+    return results
+
+def run_experiments(experiments, jobs=1, cache=None, force=False, journal=None, multi=False):
+    """Run experiments serially or on a worker pool; Ctrl-C kills them all
+
+    With a CampaignJournal, the campaign and every run's state changes
+    are appended to it as they happen. With multi, runs that differ only
+    in the predictor share one gem5 process.
+    """
+    jobs = max(1, min(jobs, len(experiments)))
+    if journal is not None:
+        journal.campaign([(experiment_id(e), e) for e in experiments])
+    try:
+        if jobs == 1:
+            return run_serial(experiments, cache, force, journal, multi)
+        return run_parallel(experiments, jobs, cache, force, journal, multi)
+    except KeyboardInterrupt:
+        kill_all_children()
+        print("\n✗ Interrupted - killed all running gem5 processes")
+        sys.exit(130)
+
+def print_summary(results):
+    """Print the per-experiment outcome table in grid order"""
+    width = max([12] + [len(r['label']) + 1 for r in results])
+    print(f"{'Predictor':<{width}} {'Benchmark':<20} {'Status':<10} {'Time (s)':>9}")
+    print("-" * (width + 48))
+    for result in results:
+        print(f"{result['label']:<{width}} {result['benchmark']:<20} "
+              f"{result['status']:<10} {result['elapsed']:>9.1f}")
+    print("-" * (width + 48))
 
 def main():
     parser = argparse.ArgumentParser(
@@ -119,56 +843,240 @@ def main():
         action="store_true",
         help="Clean results directory before running"
     )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Maximum concurrent gem5 simulations, 0 for one per core; runs "
+             "only start while memory allows (default: 1)"
+    )
+    parser.add_argument(
+        "--stats-period",
+        type=int,
+        default=0,
+        help="Dump gem5 stats every N ticks for per-interval timelines"
+    )
+    parser.add_argument(
+        "--fast-forward",
+        type=int,
+        default=0,
+        metavar="INSTS",
+        help="Fast-forward INSTS instructions on an atomic CPU and checkpoint "
+             "once per benchmark; detailed runs restore from it"
+    )
+    parser.add_argument(
+        "--roi",
+        choices=["off", "dump", "exit"],
+        default="off",
+        help="Dump stats at the benchmarks' ROI markers for roi_* metrics; "
+             "exit also stops each run at the end of its ROI (default: off)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-simulate even when a cached result matches"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help=f"Result cache location (default: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither reuse nor store cached results"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs="+",
+        default=[0],
+        metavar="N",
+        help="Benchmark problem size(s): BFS nodes, factorial rounds, hash "
+             "keys; several values make a size axis (default: built-in size). "
+             "BFS needs a non-zero --seed to scale"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Benchmark input seed (default: 0, the original fixed inputs)"
+    )
+    parser.add_argument(
+        "--variant",
+        nargs="+",
+        metavar="NAME",
+        help="Compiler-flag variant(s) from benchmarks/variants.json; each is "
+             "built if needed (scripts/build_variants.py) and makes a variant "
+             "axis (default: the Makefile binaries)"
+    )
+    parser.add_argument(
+        "--queue",
+        type=Path,
+        metavar="DIR",
+        help="Add the experiments to a shared work queue instead of running "
+             "them (drain with scripts/work_queue.py worker DIR)"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=scheduler.parse_size,
+        metavar="SIZE",
+        help="Memory all parallel runs together may use, e.g. 32G "
+             "(default: available memory minus --reserve-memory)"
+    )
+    parser.add_argument(
+        "--reserve-memory",
+        type=scheduler.parse_size,
+        default=scheduler.RESERVE_MEMORY,
+        metavar="SIZE",
+        help="Memory always left free for other tenants (default: 1G)"
+    )
+    parser.add_argument(
+        "--reserve-cpus",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Cores left for other tenants when running in parallel (default: 0)"
+    )
+    parser.add_argument(
+        "--multi",
+        action="store_true",
+        help="Simulate all predictors of a benchmark in one gem5 process, "
+             "one system per predictor (not with --fast-forward)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip runs the campaign journal records as finished and whose "
+             "stats.txt is complete; re-run everything else"
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=JOURNAL_FILE,
+        help=f"Campaign journal (default: {JOURNAL_FILE})"
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=STALL_TIMEOUT,
+        metavar="SECONDS",
+        help=f"Kill a run that reports no progress for this long (default: {STALL_TIMEOUT})"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Hard wall-clock cap per run (default: none)"
+    )
     
     args = parser.parse_args()
+    if args.clean and args.resume:
+        parser.error("--clean would delete the results --resume continues from")
+    if args.multi and args.fast_forward:
+        parser.error("--multi cannot restore fast-forward checkpoints")
+    workload_error = check_workload(BENCHMARKS if args.benchmark == "all" else [args.benchmark],
+                                    args.size, args.seed)
+    if workload_error:
+        parser.error(workload_error)
+    LIMITS.update(timeout=args.timeout, stall_timeout=args.stall_timeout)
+    RESOURCES.update(max_memory=args.max_memory, reserve_memory=args.reserve_memory,
+                     reserve_cpus=args.reserve_cpus)
+    if args.jobs == 0:
+        args.jobs = max(1, scheduler.available_cpus() - args.reserve_cpus)
     
     # Clean results if requested
     if args.clean and RESULTS_DIR.exists():
         print(f"🗑️  Cleaning {RESULTS_DIR}")
-        import shutil
         shutil.rmtree(RESULTS_DIR)
     
     # Check prerequisites
-    check_prerequisites()
+    if not args.queue:
+        check_prerequisites()
     
     # Determine which experiments to run
     predictors_to_run = PREDICTORS if args.predictor == "all" else [args.predictor]
     benchmarks_to_run = BENCHMARKS if args.benchmark == "all" else [args.benchmark]
     
-    # Run experiments
-    total = len(predictors_to_run) * len(benchmarks_to_run)
-    current = 0
-    successes = 0
-    failures = 0
+    extra_params = {}
+    if args.stats_period > 0:
+        extra_params['stats_period'] = args.stats_period
+    if args.fast_forward > 0:
+        extra_params['fast_forward'] = args.fast_forward
+    if args.roi != "off":
+        extra_params['roi'] = args.roi
+    
+    if args.variant:
+        try:
+            missing = build_variants.build_variants(args.variant, benchmarks_to_run,
+                                                    jobs=args.jobs)
+        except (OSError, ValueError) as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        if missing:
+            print(f"✗ Variant binaries missing: {', '.join(missing)}")
+            sys.exit(1)
+    
+    experiments = []
+    for variant in args.variant or [None]:
+        for size in args.size:
+            workload = {k: v for k, v in (('variant', variant), ('size', size),
+                                          ('seed', args.seed)) if v}
+            for p in predictors_to_run:
+                for b in benchmarks_to_run:
+                    experiments.append(make_experiment(p, b, dict(extra_params, **workload),
+                                                       workload_label(p, size, args.seed, variant)))
+    total = len(experiments)
+    jobs = max(1, min(args.jobs, total))
     
     print(f"\n🚀 Starting {total} experiments")
     print(f"   Predictors: {', '.join(predictors_to_run)}")
     print(f"   Benchmarks: {', '.join(benchmarks_to_run)}")
+    if args.variant:
+        print(f"   Variants: {', '.join(args.variant)}")
+    if args.size != [0] or args.seed:
+        print(f"   Sizes: {', '.join(str(s or 'default') for s in args.size)} (seed {args.seed})")
+    if jobs > 1:
+        print(f"   Jobs: {jobs}")
     print()
     
-    for predictor in predictors_to_run:
-        for benchmark in benchmarks_to_run:
-            current += 1
-            print(f"[{current}/{total}] {predictor} + {benchmark}")
-            
-            # Create output directory: results/predictor/benchmark/
-            output_dir = RESULTS_DIR / predictor / benchmark.replace("_riscv", "")
-            
-            # Run experiment
-            success = run_experiment(predictor, benchmark, output_dir)
-            
-            if success:
-                successes += 1
-            else:
-                failures += 1
-            
-            print()
+    if args.queue:
+        import work_queue
+        added = work_queue.enqueue(args.queue, experiments, requeue=args.force,
+                                      journal=CampaignJournal(args.journal))
+        print(f"✓ Queued {added} new job(s) in {args.queue} "
+              f"({total - added} already queued or done)")
+        print(f"  Run on each host: python3 scripts/work_queue.py worker {args.queue} -j N")
+        return
+    
+    finished = []
+    if args.resume:
+        experiments, finished = resume_experiments(experiments, args.journal)
+        print(f"Resuming: {len(finished)} run(s) already finished, "
+              f"{len(experiments)} to run")
+        print()
+    
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    journal = CampaignJournal(args.journal)
+    results = []
+    if experiments:
+        results = run_experiments(experiments, jobs, cache, args.force, journal, args.multi)
+    
+    successes = len(finished) + sum(1 for r in results if r['status'] in ('success', 'cached'))
+    failures = total - successes
     
     # Summary
     print("=" * 60)
+    print_summary(results)
+    phase_timing.print_breakdown(phase_timing.campaign_breakdown(results))
     print(f"✓ Completed: {successes}/{total} experiments successful")
     if failures > 0:
         print(f"✗ Failed: {failures}/{total} experiments")
+    if cache is not None:
+        cache.report()
+    host_perf.warn_regressions([b.replace("_riscv", "") for b in benchmarks_to_run])
     print(f"Results saved to: {RESULTS_DIR}")
     print()
     print("Next steps:")
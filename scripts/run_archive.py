@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Single-file archive of finished runs
+
+A results directory holds ~220 KB in six files, most of it repeated from
+run to run: citations.bib is identical everywhere and config.ini /
+config.json differ in a few predictor fields. At tens of thousands of
+runs that is a lot of inodes and slow directory walks on NFS.
+
+pack consolidates finished runs into one SQLite file:
+
+    blobs         content-addressed (SHA-256) and stored once, however
+                  many runs share them
+    dictionaries  the first copy of each member name (stats.txt,
+                  config.ini, ...) is kept as a zlib preset dictionary,
+                  so later copies compress down to their differences
+    members       (run, member name) -> blob, the index
+
+Any one member of any one run is read with a single indexed lookup and
+one decompression; parse_results.py reads archived runs this way
+without unpacking anything.
+
+Usage:
+    python3 scripts/run_archive.py pack [--remove]   # results/*/* -> results/archive.db
+    python3 scripts/run_archive.py list
+    python3 scripts/run_archive.py cat gshare/bfs stats.txt
+    python3 scripts/run_archive.py unpack gshare/bfs
+    python3 scripts/run_archive.py info
+"""
+
+import os
+import sys
+import time
+import zlib
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+from result_cache import run_complete, stats_complete
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+RESULTS_DIR = PROJECT_ROOT / "results"
+ARCHIVE_FILE = RESULTS_DIR / "archive.db"
+
+# zlib preset dictionaries are capped at its 32 KiB window
+DICTIONARY_SIZE = 32 * 1024
+
+COMPRESSION_LEVEL = 9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    member TEXT UNIQUE NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    dictionary INTEGER REFERENCES dictionaries(id),
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    packed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS members (
+    run TEXT NOT NULL REFERENCES runs(run) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    mtime REAL NOT NULL,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS members_hash ON members(hash);
+"""
+
+class RunArchive:
+    """Indexed, deduplicated, compressed store of run directories
+
+    Runs are named label/benchmark, as under results/.
+    """
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(SCHEMA)
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Reading
+
+    def runs(self):
+        """Names of every archived run, sorted"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT run FROM runs ORDER BY run")]
+
+    def members(self, run):
+        """{member name: (content hash, size, mtime)} of one run"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT m.name, m.hash, b.size, m.mtime FROM members m "
+                "JOIN blobs b ON b.hash = m.hash WHERE m.run = ?", (run,)).fetchall()
+        return {name: (digest, size, mtime) for name, digest, size, mtime in rows}
+
+    def member_hashes(self, name):
+        """{run: content hash} of one member name across every run, in one query"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT run, hash FROM members WHERE name = ?",
+                                           (name,)).fetchall())
+
+    def read(self, run, name):
+        """Bytes of one member, or None if the run or member is not archived"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.data, b.dictionary FROM members m JOIN blobs b ON b.hash = m.hash "
+                "WHERE m.run = ? AND m.name = ?", (run, name)).fetchone()
+            if row is None:
+                return None
+            data, dictionary = row
+            if dictionary is None:
+                return zlib.decompress(data)
+            return zlib.decompressobj(zdict=self._dictionary(dictionary)).decompress(data)
+
+    def read_text(self, run, name):
+        data = self.read(run, name)
+        return None if data is None else data.decode(errors='replace')
+
+    def _dictionary(self, dictionary_id):
+        if dictionary_id not in self._dictionaries:
+            row = self._conn.execute("SELECT data FROM dictionaries WHERE id = ?",
+                                     (dictionary_id,)).fetchone()
+            self._dictionaries[dictionary_id] = row[0]
+        return self._dictionaries[dictionary_id]
+
+    # Writing
+
+    def _dictionary_for(self, name, data):
+        """Preset dictionary id for a member name, made from its first copy"""
+        row = self._conn.execute("SELECT id FROM dictionaries WHERE member = ?",
+                                 (name,)).fetchone()
+        if row:
+            return row[0]
+        cur = self._conn.execute("INSERT INTO dictionaries (member, data) VALUES (?, ?)",
+                                 (name, data[-DICTIONARY_SIZE:]))
+        return cur.lastrowid
+
+    def _store_blob(self, name, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+            return digest
+        dictionary = self._dictionary_for(name, data)
+        packer = zlib.compressobj(COMPRESSION_LEVEL, zdict=self._dictionary(dictionary))
+        compressed = packer.compress(data) + packer.flush()
+        self._conn.execute("INSERT INTO blobs (hash, size, dictionary, data) VALUES (?, ?, ?, ?)",
+                           (digest, len(data), dictionary, compressed))
+        return digest
+
+    def add_run(self, run, run_dir):
+        """Archive every file of a run directory, replacing an older copy"""
+        run_dir = Path(run_dir)
+        with self._lock, self._conn:
+            replaced = self._delete_run(run)
+            self._conn.execute("INSERT INTO runs (run, packed_at) VALUES (?, ?)",
+                               (run, time.time()))
+            for member in sorted(run_dir.iterdir()):
+                if not member.is_file():
+                    continue
+                digest = self._store_blob(member.name, member.read_bytes())
+                self._conn.execute("INSERT INTO members (run, name, hash, mtime) VALUES (?, ?, ?, ?)",
+                                   (run, member.name, digest, member.stat().st_mtime))
+            self._drop_orphans(replaced)
+
+    def remove_run(self, run):
+        with self._lock, self._conn:
+            self._drop_orphans(self._delete_run(run))
+
+    def _delete_run(self, run):
+        """Delete a run's index entries; returns the blob hashes it used"""
+        hashes = [row[0] for row in self._conn.execute(
+            "SELECT hash FROM members WHERE run = ?", (run,))]
+        self._conn.execute("DELETE FROM runs WHERE run = ?", (run,))
+        return hashes
+
+    def _drop_orphans(self, hashes):
+        """Delete the blobs among `hashes` that no run refers to any more"""
+        for digest in set(hashes):
+            self._conn.execute("DELETE FROM blobs WHERE hash = ? AND NOT EXISTS "
+                               "(SELECT 1 FROM members WHERE hash = ?)", (digest, digest))
+
+    def extract(self, run, dest):
+        """Write one archived run back out as a directory"""
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        for name, (_, _, mtime) in self.members(run).items():
+            target = dest / name
+            target.write_bytes(self.read(run, name))
+            os.utime(target, (mtime, mtime))
+
+    def info(self):
+        with self._lock:
+            q = self._conn.execute
+            return {
+                'runs': q("SELECT COUNT(*) FROM runs").fetchone()[0],
+                'members': q("SELECT COUNT(*) FROM members").fetchone()[0],
+                'blobs': q("SELECT COUNT(*) FROM blobs").fetchone()[0],
+                'raw_bytes': q("SELECT COALESCE(SUM(b.size), 0) FROM members m "
+                               "JOIN blobs b ON b.hash = m.hash").fetchone()[0],
+                'stored_bytes': q("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()[0]
+                                + q("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM dictionaries").fetchone()[0],
+            }
+
+def archived_runs(path=ARCHIVE_FILE):
+    """Names of archived runs, or an empty set without an archive"""
+    if not Path(path).exists():
+        return set()
+    with RunArchive(path) as archive:
+        return set(archive.runs())
+
+def open_archive(path=ARCHIVE_FILE):
+    """The archive for reading, or None if there is none"""
+    if not Path(path).exists():
+        return None
+    return RunArchive(path)
+
+def packable_runs(results_dir=RESULTS_DIR):
+    """(run name, directory) of every finished run under results/"""
+    runs = []
+    for run_dir in sorted(results_dir.glob("*/*")):
+        label = run_dir.parent.name
+        if not run_dir.is_dir() or label == "analysis" or label.startswith("."):
+            continue
+        if not run_complete(run_dir):
+            continue
+        # Runs that wrote stats must have finished writing them
+        if (run_dir / "stats.txt").exists() and not stats_complete(run_dir / "stats.txt"):
+            continue
+        runs.append((f"{label}/{run_dir.name}", run_dir))
+    return runs
+
+def pack(archive, runs, remove=False):
+    """Add runs to the archive; with remove, delete each directory once its
+    archived copy has been read back and verified"""
+    packed = 0
+    for run, run_dir in runs:
+        archive.add_run(run, run_dir)
+        packed += 1
+        if not remove:
+            continue
+        members = archive.members(run)
+        for member in run_dir.iterdir():
+            if not member.is_file():
+                continue
+            stored = archive.read(run, member.name)
+            if member.name not in members or stored != member.read_bytes():
+                raise RuntimeError(f"archived copy of {run}/{member.name} does not match")
+        shutil.rmtree(run_dir)
+        try:
+            run_dir.parent.rmdir()
+        except OSError:
+            pass  # Other runs of the label are still on disk
+    return packed
+
+def _size(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack finished runs into a single-file archive")
+    parser.add_argument('--archive', type=Path, default=ARCHIVE_FILE,
+                        help=f'Archive file (default: {ARCHIVE_FILE})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('pack', help='Archive finished runs under results/')
+    p.add_argument('runs', nargs='*', help='Runs to pack as label/benchmark (default: all finished)')
+    p.add_argument('--remove', action='store_true',
+                   help='Delete each run directory once it is archived and verified')
+
+    sub.add_parser('list', help='List archived runs')
+    sub.add_parser('info', help='Archive size and deduplication')
+
+    p = sub.add_parser('cat', help='Print one member of an archived run')
+    p.add_argument('run')
+    p.add_argument('member')
+
+    p = sub.add_parser('unpack', help='Restore archived runs into results/')
+    p.add_argument('runs', nargs='+')
+    p.add_argument('--dest', type=Path, default=RESULTS_DIR, help='Results root to restore into')
+
+    args = parser.parse_args()
+
+    with RunArchive(args.archive) as archive:
+        if args.command == 'pack':
+            runs = packable_runs()
+            if args.runs:
+                runs = [(run, d) for run, d in runs if run in args.runs]
+            packed = pack(archive, runs, args.remove)
+            info = archive.info()
+            print(f"✓ Packed {packed} run(s) into {args.archive}")
+            print(f"  {info['runs']} run(s), {_size(info['raw_bytes'])} -> "
+                  f"{_size(info['stored_bytes'])} stored")
+
+        elif args.command == 'list':
+            for run in archive.runs():
+                print(run)
+
+        elif args.command == 'info':
+            info = archive.info()
+            ratio = info['raw_bytes'] / info['stored_bytes'] if info['stored_bytes'] else 0
+            print(f"Runs:      {info['runs']}")
+            print(f"Members:   {info['members']} ({info['blobs']} distinct)")
+            print(f"Raw:       {_size(info['raw_bytes'])}")
+            print(f"Stored:    {_size(info['stored_bytes'])} ({ratio:.1f}x)")
+
+        elif args.command == 'cat':
+            data = archive.read(args.run, args.member)
+            if data is None:
+                print(f"✗ {args.run}/{args.member} is not archived", file=sys.stderr)
+                sys.exit(1)
+            sys.stdout.buffer.write(data)
+
+        elif args.command == 'unpack':
+            known = set(archive.runs())
+            for run in args.runs:
+                if run not in known:
+                    print(f"✗ {run} is not archived")
+                    continue
+                archive.extract(run, args.dest / run)
+                print(f"✓ Restored {args.dest / run}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Live monitoring of running gem5 simulations
+
+run_branch_pred.py prints "PROGRESS tick=<tick> insts=<insts>" every
+--progress-period simulated ticks. The runner streams each child's stdout
+through a RunMonitor, which reports progress with an ETA taken from
+earlier runs of the same benchmark and decides when a run is hung:
+
+    stalled   no progress line for max(stall timeout, 10x the usual gap)
+    runaway   more than RUNAWAY_FACTOR times the instructions the same
+              run needed before (e.g. stuck in a loop after a bad edit)
+
+Instruction counts and host times of finished runs are kept in
+.cache/run_history.json.
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+PROGRESS_LINE = re.compile(r"^PROGRESS tick=(\d+) insts=(\d+)")
+
+# Seconds without a progress line before a run counts as stalled
+STALL_TIMEOUT = 120
+
+# Times the usual progress gap a run may go quiet (slow phases, restores)
+STALL_GAP_FACTOR = 10
+
+# Times the expected instruction count before a run counts as runaway
+RUNAWAY_FACTOR = 3.0
+
+# Seconds between progress reports of one run
+REPORT_INTERVAL = 15
+
+def peak_rss(pid):
+    """Peak resident set size of a live process in bytes (Linux), or None"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def format_duration(seconds):
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class RunHistory:
+    """Instruction counts and host seconds of finished runs, by run key"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self._runs = json.load(f)
+        except (OSError, ValueError):
+            self._runs = {}
+
+    def expected(self, key):
+        """{'insts', 'seconds'} of the last finished run with this key, or None"""
+        with self._lock:
+            return self._runs.get(key)
+
+    def record(self, key, insts, seconds):
+        with self._lock:
+            self._runs[key] = {'insts': insts, 'seconds': round(seconds, 1)}
+            snapshot = json.dumps(self._runs, indent=2, sort_keys=True)
+
+        # Atomic rewrite so concurrent runners never read half a file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".history-")
+        with os.fdopen(fd, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp, self.path)
+
+class RunMonitor:
+    """Progress, ETA and stall/runaway verdict for one gem5 child
+
+    feed() is called from the thread reading the child's stdout,
+    check() and report() from the thread waiting on the child.
+    """
+
+    def __init__(self, name, expected=None, stall_timeout=STALL_TIMEOUT,
+                 runaway_factor=RUNAWAY_FACTOR, report_interval=REPORT_INTERVAL):
+        self.name = name
+        self.expected = expected
+        self.stall_timeout = stall_timeout
+        self.runaway_factor = runaway_factor
+        self.report_interval = report_interval
+
+        self.started = time.monotonic()
+        self.last_seen = self.started
+        self.last_report = self.started
+        self.ticks = 0
+        self.insts = 0
+        self.gaps = []
+        self.reason = None
+        self.peak_rss = None
+
+    def feed(self, line):
+        match = PROGRESS_LINE.match(line)
+        if not match:
+            return
+        now = time.monotonic()
+        self.gaps.append(now - self.last_seen)
+        self.last_seen = now
+        self.ticks, self.insts = int(match.group(1)), int(match.group(2))
+
+    def sample_memory(self, pid):
+        """Track the child's peak RSS; sampled while it runs, so the last
+        poll interval before exit can be missed"""
+        rss = peak_rss(pid)
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def eta(self):
+        """Seconds left, from the expected instruction count and the current rate"""
+        if not self.expected or not self.insts:
+            return None
+        elapsed = self.last_seen - self.started
+        remaining = max(0, self.expected['insts'] - self.insts)
+        return remaining * elapsed / self.insts
+
+    def check(self):
+        """'stalled', 'runaway' or None; the reason is left in self.reason"""
+        now = time.monotonic()
+        quiet = now - self.last_seen
+        gaps = sorted(self.gaps)
+        limit = self.stall_timeout
+        if gaps:
+            limit = max(limit, STALL_GAP_FACTOR * gaps[len(gaps) // 2])
+        if quiet > limit:
+            self.reason = f"no progress for {format_duration(quiet)} (limit {format_duration(limit)})"
+            return 'stalled'
+
+        if self.expected and self.runaway_factor:
+            cap = self.runaway_factor * self.expected['insts']
+            if self.expected['insts'] and self.insts > cap:
+                self.reason = (f"{self.insts:,} instructions, over {self.runaway_factor:g}x "
+                               f"the {self.expected['insts']:,} of earlier runs")
+                return 'runaway'
+        return None
+
+    def report(self, force=False):
+        """Print a progress line at most every report_interval seconds"""
+        now = time.monotonic()
+        if not force and now - self.last_report < self.report_interval:
+            return
+        self.last_report = now
+        if not self.insts:
+            return
+
+        line = f"  … {self.name}: {self.insts:,} insts @ tick {self.ticks:,}"
+        if self.expected and self.expected.get('insts'):
+            done = min(100.0, 100.0 * self.insts / self.expected['insts'])
+            line += f" ({done:.0f}%"
+            eta = self.eta()
+            if eta is not None:
+                line += f", ETA {format_duration(eta)}"
+            line += ")"
+        line += f" [{format_duration(now - self.started)}]"
+        print(line, flush=True)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Resource-aware admission of parallel gem5 runs
+
+A gem5 run takes one core and, here, ~400 MB - more with big inputs or
+large predictor tables - so "-j N" alone can walk a shared host into the
+OOM killer. The runner asks this module three things:
+
+    estimate   expected peak memory and duration of a run, from the
+               host_perf.py telemetry of earlier runs of the same
+               benchmark and predictor (falling back to the same
+               benchmark, then to DEFAULT_MEMORY)
+    order      longest predicted run first, which keeps the makespan
+               close to the optimum (longest-processing-time rule);
+               runs with no history go first since they may be long
+    fits       whether a run can start now: a free slot, room in the
+               memory budget for its predicted peak, and enough memory
+               actually available on the host after the reserve
+
+Slots and the memory budget can be capped to leave headroom for other
+tenants (run_all_experiments.py --reserve-cpus/--max-memory/--reserve-memory).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from statistics import median
+
+from host_perf import TELEMETRY_DB, is_multi
+
+# Memory assumed for a run with no telemetry at all
+DEFAULT_MEMORY = 512 * 2**20
+
+# Predicted peaks are padded by this factor before admission
+MEMORY_MARGIN = 1.25
+
+# Memory left free for everything else on the host
+RESERVE_MEMORY = 1 * 2**30
+
+# Seconds between admission checks while runs are waiting for memory
+ADMIT_POLL = 2.0
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+def parse_size(text):
+    """Bytes from a size like 512M, 16G or 1.5GiB (plain numbers are bytes)"""
+    match = _SIZE.match(str(text))
+    if not match:
+        raise ValueError(f"not a size: {text}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+def format_size(n):
+    if n is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def memory_available():
+    """MemAvailable from /proc/meminfo in bytes, or None off Linux"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class RunEstimator:
+    """Peak memory and wall-clock seconds of a run, from past telemetry"""
+
+    def __init__(self, db_path=TELEMETRY_DB, history=None):
+        self.history = history
+        self._samples = {}
+        if not Path(db_path).exists():
+            return
+        try:
+            conn = sqlite3.connect(db_path, timeout=30)
+            rows = conn.execute(
+                "SELECT benchmark, label, predictor, workload, wall_seconds, "
+                "peak_rss, host_memory FROM samples ORDER BY finished_at").fetchall()
+            conn.close()
+        except sqlite3.Error:
+            return
+        for benchmark, label, predictor, workload, seconds, rss, host_memory in rows:
+            memory = max(m for m in (rss, host_memory, 0) if m is not None) or None
+            self._samples.setdefault(benchmark, []).append(
+                (label, predictor, workload, seconds, memory))
+
+    def measured(self, benchmark, label, workload):
+        """(peak bytes, seconds) of earlier runs with exactly this label
+        and workload; either is None without samples"""
+        exact = [s for s in self._samples.get(benchmark, [])
+                 if s[0] == label and s[2] == workload]
+        memory = [s[4] for s in exact if s[4]]
+        seconds = [s[3] for s in exact if s[3]]
+        return (median(memory) if memory else None,
+                median(seconds[-5:]) if seconds else None)
+
+    def estimate(self, benchmark, label, predictor, workload):
+        """(peak bytes, seconds or None) for one run
+
+        Memory comes from the same run (benchmark, label, workload), else
+        the same benchmark and predictor, else the benchmark's largest
+        single-process run. Duration comes from the same run, else the run
+        history (same work, any predictor).
+        """
+        memory, seconds = self.measured(benchmark, label, workload)
+
+        if memory is None:
+            # Shared multi-predictor samples hold a whole group's peak
+            samples = [s for s in self._samples.get(benchmark, []) if not is_multi(s[2])]
+            same_predictor = [s for s in samples if s[1] == predictor and s[2] == workload]
+            for group in (same_predictor, samples):
+                values = [s[4] for s in group if s[4]]
+                if values:
+                    memory = max(values)
+                    break
+
+        if seconds is None and self.history is not None:
+            expected = self.history.expected(workload)
+            if expected:
+                seconds = expected.get('seconds')
+        return memory, seconds
+
+def longest_first(estimates):
+    """Indices of `estimates` ((memory, seconds) pairs) in admission order"""
+    def key(i):
+        memory, seconds = estimates[i]
+        # Unknown durations first, then longest, larger memory breaking ties
+        return (seconds is not None, -(seconds or 0), -(memory or 0))
+    return sorted(range(len(estimates)), key=key)
+
+class ResourceBudget:
+    """Slots and memory handed out to running gem5 children"""
+
+    def __init__(self, slots, memory_budget=None, reserve_memory=RESERVE_MEMORY):
+        self.slots = max(1, slots)
+        self.reserve_memory = reserve_memory or 0
+        if memory_budget is None:
+            available = memory_available()
+            memory_budget = available - self.reserve_memory if available else None
+        self.memory_budget = memory_budget
+        self.running = 0
+        self.memory_used = 0
+        self._lock = threading.Lock()
+
+    def need(self, memory):
+        """Bytes to set aside for a run with this predicted peak"""
+        return int((memory or DEFAULT_MEMORY) * MEMORY_MARGIN)
+
+    def fits(self, memory):
+        """Whether a run with this predicted peak can start now
+
+        When nothing is running, any run fits, so a run bigger than the
+        whole budget still gets to run on its own instead of waiting forever.
+        """
+        need = self.need(memory)
+        with self._lock:
+            if self.running == 0:
+                return True
+            if self.running >= self.slots:
+                return False
+            if self.memory_budget is not None and self.memory_used + need > self.memory_budget:
+                return False
+        available = memory_available()
+        return available is None or available - self.reserve_memory >= need
+
+    def acquire(self, memory):
+        with self._lock:
+            self.running += 1
+            self.memory_used += self.need(memory)
+
+    def release(self, memory):
+        with self._lock:
+            self.running -= 1
+            self.memory_used -= self.need(memory)
+
+    def describe(self):
+        budget = format_size(self.memory_budget) if self.memory_budget else "unlimited"
+        return f"{self.slots} slot(s), {budget} memory budget"
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+SimPoint-style sampled simulation
+
+Full MinorCPU runs grow with program length. This pipeline simulates
+only a handful of representative intervals per predictor:
+
+    1. profile     run the benchmark once on AtomicSimpleCPU with gem5's
+                   SimPoint probe, one basic-block vector (BBV) per
+                   --interval instructions
+    2. cluster     randomly project the BBVs to 15 dimensions, run
+                   k-means for k = 1..--max-k and keep the smallest k
+                   whose BIC reaches 90% of the best (as SimPoint does)
+    3. pick        the --reps intervals closest to each centroid; each
+                   cluster is weighted by its share of all intervals
+    4. checkpoint  one atomic run takes a checkpoint --warmup
+                   instructions before every picked interval
+    5. simulate    for each predictor, restore every checkpoint, warm
+                   up, reset stats and measure one interval on MinorCPU
+    6. rebuild     weight the per-instruction rates of each interval into
+                   whole-program IPC and misprediction rate
+
+Steps 1-4 are cached per binary in .cache/simpoints/. The rebuilt
+metrics go to results/<predictor>@simpoint/<benchmark>/simpoint.json, in
+the record format parse_results.py produces, plus 95% error bounds from
+the spread between representatives of the same cluster. The per-interval
+runs stay in sp<interval>/ subdirectories next to it.
+"""
+
+import re
+import sys
+import gzip
+import json
+import math
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import run_all_experiments as runner
+from result_cache import ResultCache, run_fingerprint
+from gem5_stats import parse_stats_tree
+from parse_results import METRICS, SIMPOINT_FILE, parse_stats_file
+
+SIMPOINT_DIR = runner.PROJECT_ROOT / ".cache" / "simpoints"
+BBV_FILE = "simpoint.bb.gz"
+SIMPOINTS_FILE = "simpoints.json"
+
+DEFAULT_INTERVAL = 1_000_000
+PROJECTION_DIMS = 15
+BIC_THRESHOLD = 0.9
+
+# Metrics rebuilt as per-instruction rates scaled to the whole program
+RATE_METRICS = ['sim_ticks', 'sim_seconds', 'num_cycles', 'branch_pred_lookups',
+                'branch_pred_cond_predicted', 'branch_pred_cond_incorrect']
+
+BBV_ENTRY = re.compile(r":(\d+):(\d+)")
+
+def profile_dir(benchmark_path, interval):
+    """Cache directory for one binary's profile, clustering and checkpoints"""
+    key = run_fingerprint(runner.GEM5_BIN, runner.CHECKPOINT_SOURCES, benchmark_path,
+                          {'mode': 'simpoint', 'interval': interval})
+    return SIMPOINT_DIR / f"{Path(benchmark_path).name}-{key[:12]}"
+
+def collect_bbv(benchmark_path, interval, verbose=True):
+    """Profile a benchmark once; returns (work dir, error)"""
+    work = profile_dir(benchmark_path, interval)
+    if (work / BBV_FILE).exists():
+        return work, None
+
+    work.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{work.name}-", dir=work.parent))
+    cmd = runner.gem5_command(staging, benchmark_path, [
+        "--simpoint-profile", str(interval),
+    ])
+    if verbose:
+        print(f"  Profiling {benchmark_path.name} (BBV every {interval:,} instructions)")
+    status, returncode, error = runner.run_gem5(cmd, staging)
+
+    if status != 'success' or not (staging / BBV_FILE).exists():
+        shutil.rmtree(staging, ignore_errors=True)
+        return None, f"profile {status}: {error or f'return code {returncode}'}"
+
+    try:
+        staging.rename(work)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+    return work, None
+
+def read_bbv(path):
+    """Sparse BBVs from a simpoint.bb.gz
+
+    Returns (rows, block ids, counts, number of intervals) as arrays.
+    """
+    rows, ids, counts = [], [], []
+    n = 0
+    with gzip.open(path, 'rt') as f:
+        for line in f:
+            if not line.startswith('T'):
+                continue
+            for block, count in BBV_ENTRY.findall(line):
+                rows.append(n)
+                ids.append(int(block))
+                counts.append(int(count))
+            n += 1
+    return (np.array(rows, dtype=np.int64), np.array(ids, dtype=np.int64),
+            np.array(counts, dtype=np.float64), n)
+
+def project_bbv(rows, ids, counts, n, dims=PROJECTION_DIMS, seed=0):
+    """Normalise each BBV to sum 1 and randomly project it to `dims` dimensions"""
+    totals = np.bincount(rows, weights=counts, minlength=n)
+    weights = counts / np.maximum(totals[rows], 1)
+
+    # One fixed random direction per basic block
+    rng = np.random.default_rng(seed)
+    projection = rng.uniform(-1, 1, size=(int(ids.max()) + 1 if len(ids) else 1, dims))
+
+    points = np.empty((n, dims))
+    for d in range(dims):
+        points[:, d] = np.bincount(rows, weights=weights * projection[ids, d], minlength=n)
+    return points
+
+def _sq_dists(x, centers):
+    """(n, k) squared distances from every point to every center"""
+    d = (x * x).sum(1)[:, None] - 2 * x @ centers.T + (centers * centers).sum(1)[None, :]
+    return np.maximum(d, 0)
+
+def kmeans(x, k, rng, iters=100):
+    """Lloyd's k-means with k-means++ seeding; returns (centers, labels, sse)"""
+    n = len(x)
+    centers = np.empty((k, x.shape[1]))
+    centers[0] = x[rng.integers(n)]
+    d2 = ((x - centers[0]) ** 2).sum(1)
+    for i in range(1, k):
+        total = d2.sum()
+        pick = rng.choice(n, p=d2 / total) if total > 0 else rng.integers(n)
+        centers[i] = x[pick]
+        d2 = np.minimum(d2, ((x - centers[i]) ** 2).sum(1))
+
+    for _ in range(iters):
+        labels = _sq_dists(x, centers).argmin(1)
+        sizes = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=x[:, d], minlength=k)
+                         for d in range(x.shape[1])], axis=1)
+        updated = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], centers)
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    dists = _sq_dists(x, centers)
+    labels = dists.argmin(1)
+    return centers, labels, float(dists[np.arange(n), labels].sum())
+
+def bic(x, labels, k, sse):
+    """Bayesian information criterion of a clustering (SimPoint's formulation)"""
+    n, d = x.shape
+    if n <= k:
+        return -math.inf
+    variance = max(sse / (d * (n - k)), 1e-12)
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    loglik = float((sizes * np.log(sizes) - sizes * math.log(n)
+                    - sizes * d / 2 * math.log(2 * math.pi * variance)
+                    - d * (sizes - 1) / 2).sum())
+    free_params = (k - 1) + k * d + 1
+    return loglik - free_params / 2 * math.log(n)
+
+def choose_clusters(x, max_k=10, seed=0, restarts=5):
+    """Smallest k whose BIC is within BIC_THRESHOLD of the best score
+
+    Returns (centers, labels).
+    """
+    rng = np.random.default_rng(seed)
+    runs = []
+    for k in range(1, min(max_k, len(x)) + 1):
+        best = min((kmeans(x, k, rng) for _ in range(restarts)), key=lambda r: r[2])
+        runs.append((bic(x, best[1], k, best[2]), best))
+
+    finite = [score for score, _ in runs if math.isfinite(score)]
+    if not finite:
+        # Too few intervals to score: one phase
+        return runs[0][1][:2]
+    lo, hi = min(finite), max(finite)
+    for score, (centers, labels, _sse) in runs:
+        if math.isfinite(score) and score >= lo + BIC_THRESHOLD * (hi - lo):
+            return centers, labels
+    return runs[-1][1][:2]
+
+def pick_simpoints(x, centers, labels, interval, warmup, reps=2):
+    """The `reps` intervals nearest each centroid, with their cluster weight"""
+    n = len(x)
+    dists = _sq_dists(x, centers)
+    simpoints = []
+    for cluster in range(len(centers)):
+        members = np.flatnonzero(labels == cluster)
+        if not members.size:
+            continue
+        nearest = members[np.argsort(dists[members, cluster], kind='stable')[:reps]]
+        for index in sorted(nearest.tolist()):
+            start = index * interval
+            checkpoint = max(0, start - warmup)
+            simpoints.append({
+                'interval': index,
+                'cluster': cluster,
+                'cluster_weight': members.size / n,
+                'start_insts': start,
+                'checkpoint_insts': checkpoint,
+                'warmup_insts': start - checkpoint,
+            })
+    return simpoints
+
+def select_simpoints(benchmark, work, interval, warmup, max_k, reps, seed):
+    """Cluster a profile and write simpoints.json; returns its contents"""
+    rows, ids, counts, n = read_bbv(work / BBV_FILE)
+    if n == 0:
+        raise ValueError(f"No basic-block vectors in {work / BBV_FILE}")
+
+    points = project_bbv(rows, ids, counts, n, seed=seed)
+    centers, labels = choose_clusters(points, max_k, seed)
+
+    tree = parse_stats_tree(work / "stats.txt")
+    total_insts = tree.first_value(METRICS['num_insts']) if tree else None
+
+    plan = {
+        'benchmark': benchmark,
+        'interval': interval,
+        'warmup': warmup,
+        'max_k': max_k,
+        'reps': reps,
+        'seed': seed,
+        'intervals': n,
+        'total_insts': total_insts or n * interval,
+        'k': len(centers),
+        'simpoints': pick_simpoints(points, centers, labels, interval, warmup, reps),
+    }
+    with open(work / SIMPOINTS_FILE, 'w') as f:
+        json.dump(plan, f, indent=2)
+    return plan
+
+def ensure_checkpoints(benchmark_path, work, plan, verbose=True):
+    """Checkpoint directory holding cpt.<insts> for every simpoint; (dir, error)"""
+    starts = sorted({p['checkpoint_insts'] for p in plan['simpoints']
+                     if p['checkpoint_insts'] > 0})
+    tag = run_fingerprint(runner.GEM5_BIN, runner.CHECKPOINT_SOURCES, benchmark_path,
+                          {'mode': 'simpoint-checkpoints', 'starts': starts})
+    target = work / f"checkpoints-{tag[:12]}"
+    if not starts or all((target / f"cpt.{s}" / "m5.cpt").exists() for s in starts):
+        return target, None
+
+    staging = Path(tempfile.mkdtemp(prefix=".checkpoints-", dir=work))
+    cmd = runner.gem5_command(staging, benchmark_path, [
+        "--simpoints", str(work / SIMPOINTS_FILE),
+        "--take-checkpoint", str(staging),
+    ])
+    if verbose:
+        print(f"  Taking {len(starts)} simpoint checkpoint(s) for {benchmark_path.name}")
+    status, returncode, error = runner.run_gem5(cmd, staging)
+
+    if status != 'success' or not all((staging / f"cpt.{s}" / "m5.cpt").exists()
+                                      for s in starts):
+        shutil.rmtree(staging, ignore_errors=True)
+        return None, f"checkpoints {status}: {error or f'return code {returncode}'}"
+
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+    return target, None
+
+def plan_runs(predictor, benchmark, plan, checkpoints):
+    """One detailed experiment per simpoint for a predictor"""
+    label = f"{predictor}@simpoint"
+    base = runner.output_dir_for(label, benchmark)
+    experiments = []
+    for point in plan['simpoints']:
+        extra = {'max_insts': plan['interval']}
+        if point['checkpoint_insts'] > 0:
+            extra['restore_checkpoint'] = str(checkpoints / f"cpt.{point['checkpoint_insts']}")
+        if point['warmup_insts'] > 0:
+            extra['warmup_insts'] = point['warmup_insts']
+        experiment = runner.make_experiment(predictor, benchmark, extra, label)
+        experiment['output_dir'] = base / f"sp{point['interval']}"
+        experiments.append(experiment)
+    return experiments
+
+def reconstruct(plan, interval_stats):
+    """Whole-program metrics from the simulated intervals
+
+    Args:
+        plan: simpoints.json contents
+        interval_stats: {interval index: parse_stats_file() dict}
+
+    Every metric is turned into a per-instruction rate per interval,
+    averaged within each cluster and weighted by cluster size. The
+    variance between representatives of one cluster gives a stratified
+    standard error. Clusters with a single representative borrow the
+    average relative variance of the others.
+
+    Returns (metrics, errors); errors are 95% half-widths, None when no
+    cluster has two representatives.
+    """
+    clusters = {}
+    for point in plan['simpoints']:
+        stats = interval_stats.get(point['interval'])
+        if not stats or not stats.get('num_insts'):
+            continue
+        rates = {m: (stats.get(m) or 0) / stats['num_insts'] for m in RATE_METRICS}
+        entry = clusters.setdefault(point['cluster'], {'weight': point['cluster_weight'],
+                                                       'samples': []})
+        entry['samples'].append(rates)
+
+    if not clusters:
+        return None, None
+
+    # Clusters without a simulated representative drop out; renormalise
+    coverage = sum(c['weight'] for c in clusters.values())
+    total = plan['total_insts']
+
+    rate, variance = {}, {}
+    for metric in RATE_METRICS:
+        means, spreads, weights = [], [], []
+        for c in clusters.values():
+            values = np.array([s[metric] for s in c['samples']])
+            means.append(values.mean())
+            spreads.append(values.var(ddof=1) / len(values) if len(values) > 1 else None)
+            weights.append(c['weight'] / coverage)
+
+        rate[metric] = sum(w * m for w, m in zip(weights, means))
+
+        known = [s / m ** 2 for s, m in zip(spreads, means) if s is not None and m > 0]
+        if not known:
+            variance[metric] = None
+            continue
+        rel = sum(known) / len(known)
+        variance[metric] = sum(w ** 2 * (s if s is not None else rel * m ** 2)
+                               for w, s, m in zip(weights, spreads, means))
+
+    metrics = {m: rate[m] * total for m in RATE_METRICS}
+    metrics['num_insts'] = total
+    cycles = metrics['num_cycles']
+    predicted = metrics['branch_pred_cond_predicted']
+    incorrect = metrics['branch_pred_cond_incorrect']
+    metrics['ipc'] = total / cycles if cycles else None
+    metrics['mispredict_rate'] = incorrect / predicted * 100 if predicted else None
+
+    errors = None
+    if variance['num_cycles'] is not None and cycles:
+        def rel_se(metric):
+            return math.sqrt(variance[metric]) / rate[metric] if rate[metric] else 0.0
+
+        errors = {'ipc': 1.96 * metrics['ipc'] * rel_se('num_cycles')}
+        if metrics['mispredict_rate'] is not None:
+            errors['mispredict_rate'] = 1.96 * metrics['mispredict_rate'] * math.hypot(
+                rel_se('branch_pred_cond_incorrect'), rel_se('branch_pred_cond_predicted'))
+    return metrics, errors
+
+def write_record(predictor, benchmark, plan, metrics, errors):
+    output_dir = runner.output_dir_for(f"{predictor}@simpoint", benchmark)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    record = {
+        'metrics': metrics,
+        'error_95': errors,
+        'interval': plan['interval'],
+        'warmup': plan['warmup'],
+        'k': plan['k'],
+        'simpoints': plan['simpoints'],
+    }
+    with open(output_dir / SIMPOINT_FILE, 'w') as f:
+        json.dump(record, f, indent=2)
+    runner.write_params(output_dir, runner.run_params(predictor, {
+        'simpoint_interval': plan['interval'], 'simpoint_k': plan['k']}))
+    return output_dir
+
+def prepare(benchmark, args):
+    """Profile, cluster and checkpoint one benchmark; returns (plan, checkpoints)"""
+    benchmark_path = runner.BENCHMARK_DIR / benchmark
+    work, error = collect_bbv(benchmark_path, args.interval)
+    if error:
+        raise RuntimeError(error)
+
+    # Reuse the previous clustering unless its settings changed
+    plan_path = work / SIMPOINTS_FILE
+    plan = json.loads(plan_path.read_text()) if plan_path.exists() else None
+    settings = (args.warmup, args.max_k, args.reps, args.seed)
+    if (args.recluster or plan is None
+            or tuple(plan.get(k) for k in ('warmup', 'max_k', 'reps', 'seed')) != settings):
+        plan = select_simpoints(benchmark, work, args.interval, args.warmup,
+                                args.max_k, args.reps, args.seed)
+
+    print(f"  {benchmark}: {plan['intervals']} interval(s) -> {plan['k']} phase(s), "
+          f"{len(plan['simpoints'])} simpoint(s)")
+
+    checkpoints, error = ensure_checkpoints(benchmark_path, work, plan)
+    if error:
+        raise RuntimeError(error)
+    return plan, checkpoints
+
+def main():
+    parser = argparse.ArgumentParser(description="SimPoint-style sampled simulation")
+    parser.add_argument('--predictor', choices=runner.PREDICTORS + ['all'], default='all')
+    parser.add_argument('--benchmark', choices=runner.BENCHMARKS + ['all'], default='all')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL,
+                        help='Instructions per interval')
+    parser.add_argument('--warmup', type=int, default=None,
+                        help='Warm-up instructions before each interval (default: one interval)')
+    parser.add_argument('--max-k', type=int, default=10, help='Largest number of phases to try')
+    parser.add_argument('--reps', type=int, default=2,
+                        help='Representatives per phase; 2+ gives an error estimate')
+    parser.add_argument('--seed', type=int, default=0, help='Projection/k-means seed')
+    parser.add_argument('--recluster', action='store_true',
+                        help='Redo clustering even if simpoints.json exists')
+    parser.add_argument('--select-only', action='store_true',
+                        help='Stop after choosing simpoints and taking checkpoints')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of gem5 simulations to run concurrently')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-simulate even when a cached result matches')
+    parser.add_argument('--cache-dir', type=Path, default=runner.CACHE_DIR,
+                        help='Result cache location')
+
+    args = parser.parse_args()
+    if args.warmup is None:
+        args.warmup = args.interval
+
+    runner.check_prerequisites()
+
+    predictors = runner.PREDICTORS if args.predictor == 'all' else [args.predictor]
+    benchmarks = runner.BENCHMARKS if args.benchmark == 'all' else [args.benchmark]
+
+    print("Selecting simpoints...")
+    plans = {}
+    for benchmark in benchmarks:
+        try:
+            plans[benchmark] = prepare(benchmark, args)
+        except (RuntimeError, ValueError) as e:
+            print(f"✗ {benchmark}: {e}")
+
+    if args.select_only or not plans:
+        sys.exit(0 if plans else 1)
+
+    experiments = [e for predictor in predictors
+                   for benchmark, (plan, checkpoints) in plans.items()
+                   for e in plan_runs(predictor, benchmark, plan, checkpoints)]
+    print(f"\n🚀 Simulating {len(experiments)} interval(s) in detail")
+
+    cache = ResultCache(args.cache_dir)
+    results = runner.run_experiments(experiments, args.jobs, cache, args.force)
+    outcome = {(r['predictor'], r['benchmark'], r['output_dir']): r['status'] for r in results}
+
+    print("\nRebuilt whole-program metrics:")
+    print(f"{'Predictor':<12} {'Benchmark':<20} {'IPC':>14} {'Mispred %':>16}")
+    print("-" * 66)
+    for predictor in predictors:
+        for benchmark, (plan, checkpoints) in plans.items():
+            interval_stats = {}
+            for e, point in zip(plan_runs(predictor, benchmark, plan, checkpoints),
+                                plan['simpoints']):
+                if outcome.get((predictor, benchmark, e['output_dir'])) in ('success', 'cached'):
+                    interval_stats[point['interval']] = parse_stats_file(
+                        e['output_dir'] / "stats.txt")
+
+            metrics, errors = reconstruct(plan, interval_stats)
+            if metrics is None:
+                print(f"{predictor:<12} {benchmark:<20} {'NO DATA':>14}")
+                continue
+            write_record(predictor, benchmark, plan, metrics, errors)
+
+            errors = errors or {}
+            ipc = f"{metrics['ipc']:.4f}" + (f"±{errors['ipc']:.4f}" if 'ipc' in errors else "")
+            rate = (f"{metrics['mispredict_rate']:.2f}%" if metrics['mispredict_rate'] is not None
+                    else "N/A")
+            if 'mispredict_rate' in errors:
+                rate += f"±{errors['mispredict_rate']:.2f}"
+            print(f"{predictor:<12} {benchmark:<20} {ipc:>14} {rate:>16}")
+
+    print("\nNext steps:")
+    print("  - Parse results: python3 scripts/parse_results.py")
+
+if __name__ == "__main__":
+    main()
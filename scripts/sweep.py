@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Parameter Sweep Engine
+Runs predictors over a declarative space of their gem5 parameters
+
+A sweep spec is a JSON file:
+
+    {
+      "name": "table_sizes",
+      "benchmarks": ["bfs_riscv", "hash_lookup_riscv"],
+      "sampling": {"method": "lhs", "budget": 24, "seed": 1},
+      "predictors": {
+        "bimodal": {
+          "globalPredictorSize": {"min": 512, "max": 16384, "scale": "log2"},
+          "choicePredictorSize": [2048, 8192]
+        },
+        "tournament": {
+          "localPredictorSize": {"min": 256, "max": 4096, "scale": "log2"},
+          "globalPredictorSize": {"min": 1024, "max": 16384, "scale": "log2"}
+        }
+      }
+    }
+
+Each knob is a list of levels or a range: {"min", "max", "scale": "log2"}
+for powers of two (table sizes), or {"min", "max", "step"} for a linear
+range. Sampling methods:
+    grid    every combination of levels
+    random  `budget` distinct points drawn uniformly from the grid
+    lhs     `budget` Latin-hypercube points: every knob's levels are
+            covered as evenly as the budget allows
+The budget applies per predictor.
+
+Every point becomes results/<predictor>@<hash>/<benchmark>/, with its
+parameters in params.json. Run parse_results.py afterwards, then
+`sweep.py --pareto` for storage-versus-accuracy Pareto points.
+"""
+
+import sys
+import json
+import random
+import hashlib
+import argparse
+import itertools
+from pathlib import Path
+
+import run_all_experiments as runner
+from result_cache import ResultCache
+from campaign_journal import CampaignJournal
+
+SAMPLING_METHODS = ("grid", "random", "lhs")
+
+def knob_levels(spec):
+    """Expand one knob spec into its list of levels"""
+    if isinstance(spec, list):
+        return list(spec)
+    if not isinstance(spec, dict) or 'min' not in spec or 'max' not in spec:
+        raise ValueError(f"Knob must be a list or a {{min, max}} range: {spec!r}")
+
+    lo, hi = spec['min'], spec['max']
+    if spec.get('scale') == 'log2':
+        levels = []
+        value = 1
+        while value <= hi:
+            if value >= lo:
+                levels.append(value)
+            value *= 2
+        return levels
+
+    step = spec.get('step', 1)
+    return list(range(lo, hi + 1, step))
+
+def grid_size(levels):
+    size = 1
+    for values in levels.values():
+        size *= len(values)
+    return size
+
+def _decode(index, names, levels):
+    """Mixed-radix decode of a grid index into a parameter point"""
+    point = {}
+    for name in names:
+        index, digit = divmod(index, len(levels[name]))
+        point[name] = levels[name][digit]
+    return point
+
+def sample_points(levels, method="grid", budget=None, seed=0):
+    """Parameter points for one predictor
+
+    Args:
+        levels: {knob: [levels]}
+        method: "grid", "random" or "lhs"
+        budget: Maximum number of points (random/lhs)
+        seed: RNG seed so a sweep can be re-run identically
+    """
+    names = sorted(levels)
+    total = grid_size(levels)
+
+    if not names:
+        return [{}]
+
+    if method == "grid" or budget is None or budget >= total:
+        return [dict(zip(names, combo))
+                for combo in itertools.product(*(levels[n] for n in names))]
+
+    rng = random.Random(seed)
+
+    if method == "random":
+        return [_decode(i, names, levels) for i in sorted(rng.sample(range(total), budget))]
+
+    if method == "lhs":
+        # One stratum per point on every axis, strata shuffled independently
+        columns = {}
+        for name in names:
+            strata = list(range(budget))
+            rng.shuffle(strata)
+            count = len(levels[name])
+            columns[name] = [levels[name][int((s + rng.random()) / budget * count)]
+                             for s in strata]
+
+        points, seen = [], set()
+        for i in range(budget):
+            point = {name: columns[name][i] for name in names}
+            key = tuple(point[name] for name in names)
+            if key not in seen:
+                seen.add(key)
+                points.append(point)
+        return points
+
+    raise ValueError(f"Unknown sampling method: {method}")
+
+def point_label(predictor, point):
+    """Stable results directory label for a parameter point"""
+    if not point:
+        return predictor
+    blob = json.dumps(point, sort_keys=True).encode()
+    return f"{predictor}@{hashlib.sha256(blob).hexdigest()[:8]}"
+
+def load_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+
+    unknown = set(spec.get('predictors', {})) - set(runner.PREDICTORS)
+    if unknown:
+        raise ValueError(f"Unknown predictor(s) in sweep: {', '.join(sorted(unknown))}")
+
+    benchmarks = spec.get('benchmarks', runner.BENCHMARKS)
+    unknown = set(benchmarks) - set(runner.BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s) in sweep: {', '.join(sorted(unknown))}")
+
+    return spec
+
+def plan_sweep(spec, method=None, budget=None, seed=None):
+    """Experiments for every (point, benchmark) of a sweep spec"""
+    sampling = spec.get('sampling', {})
+    method = method or sampling.get('method', 'grid')
+    budget = budget if budget is not None else sampling.get('budget')
+    seed = seed if seed is not None else sampling.get('seed', 0)
+
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method: {method}")
+
+    benchmarks = spec.get('benchmarks', runner.BENCHMARKS)
+
+    experiments = []
+    for predictor, knobs in sorted(spec['predictors'].items()):
+        levels = {name: knob_levels(knob) for name, knob in knobs.items()}
+        points = sample_points(levels, method, budget, seed)
+        print(f"  {predictor}: {len(points)} point(s) of {grid_size(levels)} ({method})")
+
+        for point in points:
+            label = point_label(predictor, point)
+            extra = {'bp_params': point} if point else {}
+            for benchmark in benchmarks:
+                experiments.append(runner.make_experiment(predictor, benchmark, extra, label))
+
+    return experiments
+
+def predictor_storage_bits(params):
+    """Predictor storage budget in bits from its resolved bp.* parameters
+
+    Counts the direction-prediction tables (plus local history for the
+    tournament predictor). BTB, RAS and indirect predictor are the same
+    across configurations and left out. Returns None for predictors
+    without a model here (LTAGE).
+    """
+    def p(name):
+        value = params.get(f"bp.{name}")
+        return int(value) if value is not None else None
+
+    bp_type = params.get('bp.type')
+    try:
+        if bp_type == 'BiModeBP':
+            # Choice table plus taken/not-taken direction tables
+            return (p('choicePredictorSize') * p('choiceCtrBits')
+                    + 2 * p('globalPredictorSize') * p('globalCtrBits'))
+        if bp_type == 'TournamentBP':
+            local_history_bits = max(1, (p('localPredictorSize') - 1).bit_length())
+            return (p('localHistoryTableSize') * local_history_bits
+                    + p('localPredictorSize') * p('localCtrBits')
+                    + p('globalPredictorSize') * p('globalCtrBits')
+                    + p('choicePredictorSize') * p('choiceCtrBits'))
+    except TypeError:
+        # A parameter is missing from config.json
+        return None
+    return None
+
+def pareto_front(points):
+    """Points not dominated in (storage_bits, mispredict_rate), both minimised"""
+    front = []
+    best_rate = float('inf')
+    for point in sorted(points, key=lambda p: (p['storage_bits'], p['mispredict_rate'])):
+        if point['mispredict_rate'] < best_rate:
+            front.append(point)
+            best_rate = point['mispredict_rate']
+    return front
+
+def report_pareto(db_path):
+    """Print storage-versus-accuracy Pareto points per benchmark"""
+    import results_db
+
+    if not Path(db_path).exists():
+        print(f"Results database not found: {db_path}")
+        print("  Run: python3 scripts/parse_results.py")
+        return
+
+    conn = results_db.open_store(db_path)
+    rows = results_db.query_runs(conn, columns=['id', 'label', 'benchmark', 'mispredict_rate'])
+
+    by_benchmark = {}
+    for row in rows:
+        if row['mispredict_rate'] is None:
+            continue
+        params = {r['name']: r['value'] for r in conn.execute(
+            "SELECT name, value FROM params WHERE run_id = ?", (row['id'],))}
+        bits = predictor_storage_bits(params)
+        if bits is None:
+            continue
+        by_benchmark.setdefault(row['benchmark'], []).append(
+            dict(row, storage_bits=bits))
+
+    for benchmark, points in sorted(by_benchmark.items()):
+        front = pareto_front(points)
+        print(f"\n{benchmark.upper()} - {len(front)} Pareto point(s) of {len(points)}")
+        print("-" * 60)
+        print(f"{'Label':<24} {'Storage (KiB)':>14} {'Mispred %':>12}")
+        for point in front:
+            print(f"{point['label']:<24} {point['storage_bits'] / 8192:>14.2f} "
+                  f"{point['mispredict_rate']:>11.2f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep predictor parameters with gem5")
+    parser.add_argument('spec', nargs='?', type=Path, help='Sweep spec (JSON)')
+    parser.add_argument('--method', choices=SAMPLING_METHODS,
+                        help='Override the spec sampling method')
+    parser.add_argument('--budget', type=int, help='Override the per-predictor run budget')
+    parser.add_argument('--seed', type=int, help='Override the sampling seed')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of gem5 simulations to run concurrently')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='List the planned runs without simulating')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-simulate even when a cached result matches')
+    parser.add_argument('--cache-dir', type=Path, default=runner.CACHE_DIR,
+                        help='Result cache location')
+    parser.add_argument('--resume', action='store_true',
+                        help='Only run points the campaign journal has not seen finish')
+    parser.add_argument('--queue', type=Path, metavar='DIR',
+                        help='Add the runs to a shared work queue instead of running them')
+    parser.add_argument('--pareto', action='store_true',
+                        help='Report storage-vs-accuracy Pareto points from the results store')
+    parser.add_argument('--db', type=Path, default=None, help='Results database for --pareto')
+
+    args = parser.parse_args()
+
+    if args.pareto:
+        import results_db
+        report_pareto(args.db or results_db.DB_PATH)
+        return
+
+    if args.spec is None:
+        parser.error("a sweep spec is required unless --pareto is given")
+
+    spec = load_spec(args.spec)
+    print(f"Planning sweep: {spec.get('name', args.spec.stem)}")
+    experiments = plan_sweep(spec, args.method, args.budget, args.seed)
+    print(f"   {len(experiments)} runs in total")
+
+    if args.dry_run:
+        for experiment in experiments:
+            point = experiment['extra_params'].get('bp_params', {})
+            print(f"  {experiment['label']:<22} {experiment['benchmark']:<20} {point}")
+        return
+
+    if args.queue:
+        import work_queue
+        added = work_queue.enqueue(args.queue, experiments, requeue=args.force)
+        print(f"✓ Queued {added} new job(s) in {args.queue}")
+        return
+
+    runner.check_prerequisites()
+
+    total = len(experiments)
+    finished = []
+    if args.resume:
+        experiments, finished = runner.resume_experiments(experiments)
+        print(f"   Resuming: {len(finished)} already finished, {len(experiments)} to run")
+
+    cache = ResultCache(args.cache_dir)
+    results = []
+    if experiments:
+        results = runner.run_experiments(experiments, args.jobs, cache, args.force,
+                                         CampaignJournal())
+
+    successes = len(finished) + sum(1 for r in results if r['status'] in ('success', 'cached'))
+    print("=" * 60)
+    runner.print_summary(results)
+    print(f"✓ Completed: {successes}/{total} runs successful")
+    cache.report()
+    print()
+    print("Next steps:")
+    print("  - Parse results: python3 scripts/parse_results.py")
+    print("  - Pareto points: python3 scripts/sweep.py --pareto")
+
+    if successes < total:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Coordinator-free work queue on a shared filesystem
+
+Any number of workers, on any host that mounts the queue directory (e.g.
+over NFS), drain the same queue. Nothing runs centrally; every state
+change is a rename, which is atomic on local filesystems and NFS:
+
+    <queue>/pending/<job>.json            waiting
+    <queue>/claimed/<job>@<worker>.json   being simulated by <worker>
+    <queue>/done/<job>.json               finished (with its result)
+    <queue>/failed/<job>.json             gave up after MAX_ATTEMPTS
+    <queue>/workers/<worker>.json         worker heartbeat and status
+
+Claiming renames a pending file into claimed/; of several workers racing
+for the same job exactly one rename succeeds. While a job runs, its
+worker touches the claimed file every HEARTBEAT_INTERVAL seconds. A claim
+whose ctime is older than CLAIM_LEASE belongs to a dead worker and is
+moved back to pending by whichever worker notices first. Ages are
+measured against a file the checking worker just touched, so the clocks
+of different hosts never need to agree. Reclaiming and finishing first
+rename the claim to a dot-file staging name; one left behind by a worker
+that died in between is swept back to pending the same way.
+
+Enqueueing writes the campaign to the campaign journal, and workers
+append every run's start and finish to it like the local runner does, so
+campaign_journal.py and run_all_experiments.py --resume see queued runs.
+
+Jobs are run with run_all_experiments.run_experiment and write into the
+usual results/<label>/<benchmark>/ tree of the host running them, which
+on a cluster is the shared results directory.
+
+Usage:
+    python3 scripts/run_all_experiments.py --queue /nfs/q      # enqueue
+    python3 scripts/work_queue.py worker /nfs/q -j 4           # on every host
+    python3 scripts/work_queue.py status /nfs/q
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+
+import run_all_experiments as runner
+from result_cache import ResultCache
+from campaign_journal import CampaignJournal, JOURNAL_FILE
+
+STATES = ("pending", "claimed", "done", "failed", "workers")
+
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 15
+
+# Seconds without a heartbeat after which a claim is taken back
+CLAIM_LEASE = 120
+
+# Runs of a job before it is moved to failed/
+MAX_ATTEMPTS = 2
+
+# Seconds between looks at an empty queue (worker --wait)
+POLL_INTERVAL = 5
+
+# Staging names of claims being reclaimed or finished
+STAGING_PREFIXES = (".reclaim-", ".finish-")
+
+def job_id(experiment):
+    """Stable queue name of an experiment (the same id the campaign journal uses)"""
+    return runner.experiment_id(experiment)
+
+def init_queue(queue_dir):
+    queue_dir = Path(queue_dir)
+    for state in STATES:
+        (queue_dir / state).mkdir(parents=True, exist_ok=True)
+    return queue_dir
+
+def _write_json(path, data):
+    """Write a file under a temporary name, then rename it into place"""
+    tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp, path)
+
+def _job_name(path):
+    """Job id of a queue file, whatever its state
+
+    Claims are named <job>@<worker>. Ids can contain '@' (e.g. gshare@O3
+    labels) but worker names cannot, so the worker follows the last one.
+    """
+    if path.parent.name == "claimed":
+        return path.stem.rpartition('@')[0]
+    return path.stem
+
+def known_jobs(queue_dir):
+    """{job id: state} of every job in the queue"""
+    jobs = {}
+    for state in ("pending", "claimed", "done", "failed"):
+        for path in (queue_dir / state).glob("*.json"):
+            jobs[_job_name(path)] = state
+    return jobs
+
+def enqueue(queue_dir, experiments, requeue=False, journal=None):
+    """Add experiments to the queue; jobs already queued or done are kept
+    unless requeue is set, which re-adds finished and failed ones
+
+    The added jobs are journaled as a campaign. Returns their number.
+    """
+    queue_dir = init_queue(queue_dir)
+    known = known_jobs(queue_dir)
+    added = []
+    for experiment in experiments:
+        name = job_id(experiment)
+        state = known.get(name)
+        if state in ("pending", "claimed"):
+            continue
+        if state in ("done", "failed"):
+            if not requeue:
+                continue
+            (queue_dir / state / f"{name}.json").unlink(missing_ok=True)
+        _write_json(queue_dir / "pending" / f"{name}.json", {
+            'id': name,
+            'experiment': {k: experiment[k] for k in
+                           ('predictor', 'benchmark', 'label', 'extra_params')},
+            'attempts': 0,
+            'enqueued_at': time.time(),
+        })
+        added.append((name, experiment))
+    if journal is not None and added:
+        journal.campaign(added)
+    return len(added)
+
+def _claim_age(path, now):
+    """Seconds since a claim was made or last heartbeat (rename and utime
+    both update ctime), or None if it is gone"""
+    try:
+        return now - path.stat().st_ctime
+    except FileNotFoundError:
+        return None
+
+class Worker:
+    """One queue-draining process; runs up to `slots` jobs at once"""
+
+    def __init__(self, queue_dir, slots=1, cache=None, force=False, wait=False,
+                 lease=CLAIM_LEASE, journal=None):
+        self.queue_dir = init_queue(queue_dir)
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.slots = slots
+        self.cache = cache
+        self.force = force
+        self.wait = wait
+        self.lease = lease
+        self.journal = journal
+        self.heartbeat = min(HEARTBEAT_INTERVAL, lease / 4)
+
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        # claimed path -> (output_dir, token); the token tells a claim
+        # apart from a later claim of the same job by this worker
+        self._claims = {}
+        self.counts = {'done': 0, 'failed': 0, 'retried': 0, 'reclaimed': 0}
+
+    # Shared-filesystem clock ------------------------------------------------
+
+    def fs_now(self):
+        """Current time as the queue's filesystem sees it"""
+        beat = self.queue_dir / "workers" / f"{self.name}.json"
+        with self._lock:
+            running = [p.name for p in self._claims]
+        _write_json(beat, {'worker': self.name, 'host': socket.gethostname(),
+                           'pid': os.getpid(), 'slots': self.slots, 'running': running})
+        return beat.stat().st_ctime
+
+    # Claiming --------------------------------------------------------------
+
+    def claim(self):
+        """Move one pending job into claimed/; returns (path, job) or None"""
+        for pending in sorted((self.queue_dir / "pending").glob("*.json")):
+            claimed = self.queue_dir / "claimed" / f"{pending.stem}@{self.name}.json"
+            try:
+                os.rename(pending, claimed)
+            except FileNotFoundError:
+                continue  # Another worker was faster
+            try:
+                job = json.loads(claimed.read_text())
+            except (OSError, ValueError) as e:
+                print(f"✗ Unreadable job {pending.name}: {e}")
+                os.replace(claimed, self.queue_dir / "failed" / pending.name)
+                continue
+            return claimed, job
+        return None
+
+    def reclaim_expired(self):
+        """Return the jobs of dead workers to pending (or failed)"""
+        now = self.fs_now()
+        claimed_dir = self.queue_dir / "claimed"
+        for claimed in claimed_dir.glob("*.json"):
+            age = _claim_age(claimed, now)
+            if age is None or age < self.lease:
+                continue
+            self._reclaim(claimed, _job_name(claimed), claimed.stem.rpartition('@')[2], age)
+
+        # Staging files are renamed on within moments; an old one belongs
+        # to a worker that died halfway through reclaiming or finishing
+        for staging in claimed_dir.iterdir():
+            prefix = next((p for p in STAGING_PREFIXES if staging.name.startswith(p)), None)
+            if prefix is None:
+                continue
+            age = _claim_age(staging, now)
+            if age is None or age < self.lease:
+                continue
+            name, _, owner = staging.name[len(prefix):].rpartition('@')
+            self._reclaim(staging, name, owner, age)
+
+        # Forget workers that stopped beating long ago
+        for beat in (self.queue_dir / "workers").glob("*.json"):
+            age = _claim_age(beat, now)
+            if age is not None and age > 2 * self.lease:
+                beat.unlink(missing_ok=True)
+
+    def _reclaim(self, path, name, owner, age):
+        """Take over a dead worker's claim or staging file and requeue it"""
+        # Rename first so only one worker handles it
+        staging = self.queue_dir / "claimed" / f".reclaim-{name}@{self.name}"
+        try:
+            os.rename(path, staging)
+        except FileNotFoundError:
+            return
+        try:
+            job = json.loads(staging.read_text())
+        except (OSError, ValueError) as e:
+            print(f"✗ Unreadable job {name}: {e}")
+            os.replace(staging, self.queue_dir / "failed" / f"{name}.json")
+            return
+        job.setdefault('history', []).append(
+            {'event': 'reclaimed', 'from': owner, 'at': time.time()})
+        print(f"⚠ Reclaimed {name} from {owner} (no heartbeat for {age:.0f}s)")
+        self.counts['reclaimed'] += 1
+        self._requeue(staging, job)
+
+    def _requeue(self, path, job):
+        """Back to pending, or to failed once it has used all its attempts"""
+        job['attempts'] = job.get('attempts', 0) + 1
+        state = "failed" if job['attempts'] >= MAX_ATTEMPTS else "pending"
+        _write_json(path, job)
+        os.replace(path, self.queue_dir / state / f"{job['id']}.json")
+        return state
+
+    def _release(self, path, job):
+        """Give an unstarted or interrupted job back without using an attempt"""
+        try:
+            os.replace(path, self.queue_dir / "pending" / f"{job['id']}.json")
+        except FileNotFoundError:
+            pass
+
+    # Heartbeats ------------------------------------------------------------
+
+    def _heartbeat_loop(self):
+        while not self.stop.wait(self.heartbeat):
+            with self._lock:
+                claims = dict(self._claims)
+            for path, claim in claims.items():
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    # Reclaimed while we were still alive (e.g. a long NFS
+                    # hang); someone else may run it now, so stop ours.
+                    # Unless the run ended meanwhile: run_job lifts the
+                    # cancel order under the same lock, and a cancel after
+                    # that would kill the next run in this directory.
+                    with self._lock:
+                        if self._claims.get(path) is not claim:
+                            continue
+                        print(f"⚠ Lost claim on {path.name}; stopping its run")
+                        runner.cancel_run(claim[0])
+            try:
+                self.fs_now()
+            except OSError:
+                pass
+
+    # Running ---------------------------------------------------------------
+
+    def run_job(self, path, job):
+        experiment = dict(job['experiment'])
+        experiment['output_dir'] = runner.output_dir_for(experiment['label'],
+                                                         experiment['benchmark'])
+        with self._lock:
+            self._claims[path] = (experiment['output_dir'], object())
+        if self.journal is not None:
+            self.journal.started(job['id'], experiment)
+        try:
+            result = runner.run_experiment(
+                *runner._submit_args(experiment, False, self.cache, self.force))
+        finally:
+            with self._lock:
+                self._claims.pop(path, None)
+                runner.cancel_run(experiment['output_dir'], cancel=False)
+
+        label = f"{experiment['label']} + {experiment['benchmark']}"
+        print(f"[{self.name}] {label}: {runner.describe_result(result)}", flush=True)
+
+        # Take the claim out of claimed/ first so it cannot be reclaimed
+        # while we record the outcome
+        staging = path.with_name(f".finish-{job['id']}@{self.name}")
+        try:
+            os.rename(path, staging)
+        except FileNotFoundError:
+            # Claim lost: the job belongs to another worker now, which
+            # journals its outcome
+            return
+        path = staging
+
+        if self.journal is not None:
+            self.journal.finished(job['id'], experiment, result)
+
+        if result['status'] in ('cancelled', 'killed'):
+            self._release(path, job)
+            return
+
+        job.setdefault('history', []).append({
+            'event': result['status'], 'worker': self.name, 'at': time.time(),
+            'elapsed': round(result['elapsed'], 1),
+            'error': result.get('error'),
+        })
+        if result['status'] in ('success', 'cached'):
+            job['result'] = {k: result.get(k) for k in ('status', 'returncode', 'elapsed')}
+            job['result']['worker'] = self.name
+            _write_json(path, job)
+            os.replace(path, self.queue_dir / "done" / f"{job['id']}.json")
+            self.counts['done'] += 1
+        elif self._requeue(path, job) == "failed":
+            self.counts['failed'] += 1
+        else:
+            self.counts['retried'] += 1
+
+    def _slot_loop(self):
+        while not self.stop.is_set():
+            claimed = self.claim()
+            if claimed is not None:
+                self.run_job(*claimed)
+                continue
+            self.reclaim_expired()
+            # Jobs still claimed elsewhere come back if their worker dies,
+            # so only stop once nothing is pending or running
+            if not self.wait and not any((self.queue_dir / "pending").glob("*.json")) \
+                    and not any((self.queue_dir / "claimed").glob("*.json")):
+                return
+            self.stop.wait(POLL_INTERVAL)
+
+    def run(self):
+        """Drain the queue; returns once it is empty (or forever with wait)"""
+        self.reclaim_expired()
+        beat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        beat.start()
+
+        slots = [threading.Thread(target=self._slot_loop, daemon=True)
+                 for _ in range(self.slots)]
+        for slot in slots:
+            slot.start()
+        try:
+            while any(slot.is_alive() for slot in slots):
+                for slot in slots:
+                    slot.join(timeout=0.5)
+        except KeyboardInterrupt:
+            # Interrupted runs go back to pending for other workers
+            self.stop.set()
+            runner.kill_all_children()
+            for slot in slots:
+                slot.join()
+            print("\n✗ Interrupted - running jobs returned to the queue")
+            raise
+        finally:
+            self.stop.set()
+            (self.queue_dir / "workers" / f"{self.name}.json").unlink(missing_ok=True)
+
+def print_status(queue_dir):
+    queue_dir = Path(queue_dir)
+    if not (queue_dir / "pending").is_dir():
+        print(f"Not a work queue: {queue_dir}")
+        return
+    counts = {state: len(list((queue_dir / state).glob("*.json")))
+              for state in ("pending", "claimed", "done", "failed")}
+    print(f"Queue {queue_dir}")
+    print("   " + "  ".join(f"{state}: {n}" for state, n in counts.items()))
+
+    now = time.time()
+    for beat in sorted((queue_dir / "workers").glob("*.json")):
+        try:
+            info = json.loads(beat.read_text())
+        except (OSError, ValueError):
+            continue
+        age = now - beat.stat().st_ctime
+        print(f"   {info['worker']:<28} {len(info['running'])}/{info['slots']} running, "
+              f"seen {age:.0f}s ago")
+        for name in info['running']:
+            print(f"      {name}")
+    for failed in sorted((queue_dir / "failed").glob("*.json")):
+        job = json.loads(failed.read_text())
+        last = (job.get('history') or [{}])[-1]
+        print(f"   ✗ {job['id']}: {last.get('event')} {last.get('error') or ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-filesystem gem5 work queue")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    worker = sub.add_parser('worker', help='Drain the queue on this host')
+    worker.add_argument('queue', type=Path, help='Queue directory (shared by all hosts)')
+    worker.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Simulations to run at once on this host')
+    worker.add_argument('--lease', type=float, default=CLAIM_LEASE,
+                        help=f'Seconds without a heartbeat before a job is reclaimed '
+                             f'(default: {CLAIM_LEASE}; use the same value on every host)')
+    worker.add_argument('--wait', action='store_true',
+                        help='Keep polling for new jobs instead of exiting when drained')
+    worker.add_argument('--force', action='store_true',
+                        help='Re-simulate even when a cached result matches')
+    worker.add_argument('--cache-dir', type=Path, default=runner.CACHE_DIR,
+                        help='Result cache location')
+    worker.add_argument('--no-cache', action='store_true',
+                        help='Neither reuse nor store cached results')
+    worker.add_argument('--journal', type=Path, default=JOURNAL_FILE,
+                        help=f'Campaign journal (default: {JOURNAL_FILE})')
+
+    status = sub.add_parser('status', help='Show queue and worker state')
+    status.add_argument('queue', type=Path)
+
+    reclaim = sub.add_parser('reclaim', help='Return jobs of dead workers to pending')
+    reclaim.add_argument('queue', type=Path)
+    reclaim.add_argument('--lease', type=float, default=CLAIM_LEASE)
+
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status(args.queue)
+        return
+    if args.command == 'reclaim':
+        Worker(args.queue, lease=args.lease).reclaim_expired()
+        print_status(args.queue)
+        return
+
+    runner.check_prerequisites()
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    worker = Worker(args.queue, args.jobs, cache, args.force, args.wait, args.lease,
+                    CampaignJournal(args.journal))
+    print(f"Worker {worker.name} draining {args.queue} ({args.jobs} slot(s))")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    counts = worker.counts
+    print(f"✓ Worker {worker.name}: {counts['done']} done, {counts['retried']} retried, "
+          f"{counts['failed']} failed, {counts['reclaimed']} reclaimed")
+    if cache is not None:
+        cache.report()
+
+if __name__ == "__main__":
+    main()
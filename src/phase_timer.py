@@ -0,0 +1,116 @@
+"""
+Phase Timer
+Wall-clock time spent in each phase of a gem5 run, written to timing.json
+
+Phases are exclusive: time in a nested phase (e.g. workload_init inside
+build) is not also counted in the outer one, so the phases of a run add
+up to its total. Time in no phase is reported as "other".
+"""
+
+import os
+import json
+import time
+import atexit
+from contextlib import contextmanager
+from pathlib import Path
+
+TIMING_FILE = "timing.json"
+
+# Bump when phase names or meanings change
+TIMING_VERSION = 1
+
+def process_start_time():
+    """Wall-clock time this process started, or None off Linux
+
+    /proc/self/stat holds the start in clock ticks since boot, and
+    /proc/uptime the seconds since boot, both to 10 ms.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name start at field 3; starttime is 22
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        ticks_per_second = os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+    return time.time() - (uptime - start_ticks / ticks_per_second)
+
+class PhaseTimer:
+    """Exclusive per-phase wall-clock seconds and call counts"""
+
+    def __init__(self):
+        self.script_start = time.time()
+        self._clock_start = time.perf_counter()
+        self.seconds = {}
+        self.counts = {}
+        self.info = {}
+        self._stack = []
+        self._exit_mark = None
+
+        # gem5 itself (C++ and Python start-up) ran before this script
+        started = process_start_time()
+        if started is not None and started <= self.script_start:
+            self.add("startup", self.script_start - started)
+
+    def add(self, name, seconds, count=1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body as phase `name`, minus any phases nested in it"""
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            self.add(name, elapsed - frame[1])
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def elapsed(self):
+        """Seconds since the script started"""
+        return time.perf_counter() - self._clock_start
+
+    def record(self):
+        """The timing.json record"""
+        script = self.elapsed()
+        phases = dict(self.seconds)
+        phases["other"] = max(0.0, script - sum(s for n, s in phases.items() if n != "startup"))
+        return {
+            'version': TIMING_VERSION,
+            'phases': phases,
+            'counts': dict(self.counts),
+            'total': sum(phases.values()),
+            **self.info,
+        }
+
+    def write_at_exit(self, outdir):
+        """Write DIR/timing.json when the interpreter exits
+
+        Call before m5.instantiate(): atexit handlers run last-in
+        first-out, so this one runs after gem5's final stats dump, which
+        instantiate() registers. Then call mark_exit_at_exit() after
+        instantiate() so that the dump is timed on its own.
+        """
+        def write():
+            if self._exit_mark is not None:
+                self.add("stats_dump", time.perf_counter() - self._exit_mark)
+            try:
+                with open(Path(outdir) / TIMING_FILE, "w") as f:
+                    json.dump(self.record(), f, indent=2)
+            except OSError as e:
+                print(f"Phase timings not written: {e}")
+        atexit.register(write)
+
+    def mark_exit_at_exit(self):
+        """Note when exit handlers registered so far start running"""
+        def mark():
+            self._exit_mark = time.perf_counter()
+        atexit.register(mark)
+
+# One timer per gem5 process, shared by run_branch_pred.py and system_setup.py
+phases = PhaseTimer()
@@ -4,67 +4,307 @@ print("SCRIPT STARTING!")
 print("=" * 60)
 
 import argparse
+import json
 import sys
 from pathlib import Path
-import m5
-from m5.objects import *
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from phase_timer import phases
+
+with phases.phase("import"):
+    import m5
+    from m5.objects import *
+    from system_setup import PREDICTORS, CPU_TYPES, build_system, build_systems
+    from configs.params import parse_value
 
 print("Parsing arguments...")
 
 parser = argparse.ArgumentParser(description='Run RISC-V binary with specified branch predictor')
 parser.add_argument('--binary', type=str, required=True, help='Path to RISC-V binary')
-parser.add_argument('--predictor', type=str, choices=['bimodal', 'gshare', 'tournament'], default='bimodal', help='Branch predictor type')
+parser.add_argument('--predictor', type=str, choices=PREDICTORS, default='bimodal', help='Branch predictor type')
+parser.add_argument('--bp-param', action='append', default=[], metavar='NAME=VALUE', help='Override a predictor parameter (repeatable), e.g. globalPredictorSize=8192')
+parser.add_argument('--cpu-type', type=str, choices=list(CPU_TYPES), default='minor', help='CPU model; atomic has no branch predictor and is used for branch trace capture')
+parser.add_argument('--stats-period', type=int, default=0, help='Dump stats every N ticks (0 = only at exit)')
+parser.add_argument('--fast-forward', type=int, default=0, help='Instructions to fast-forward on an atomic CPU before --take-checkpoint')
+parser.add_argument('--take-checkpoint', type=str, metavar='DIR', help='Fast-forward, write a checkpoint to DIR and exit')
+parser.add_argument('--restore-checkpoint', type=str, metavar='DIR', help='Start detailed simulation from a checkpoint taken with --take-checkpoint')
+parser.add_argument('--simpoint-profile', type=int, default=0, metavar='INSTS', help='Record basic-block vectors every INSTS instructions on an atomic CPU (simpoint.bb.gz) and exit')
+parser.add_argument('--simpoints', type=str, metavar='FILE', help='With --take-checkpoint: take one checkpoint per simpoint in FILE (from scripts/simpoint.py) as DIR/cpt.<insts>')
+parser.add_argument('--warmup-insts', type=int, default=0, help='Instructions to simulate before resetting stats (predictor warm-up)')
+parser.add_argument('--max-insts', type=int, default=0, help='Stop after this many measured instructions (0 = run to completion)')
+parser.add_argument('--size', type=int, default=0, help='Benchmark problem size (0 = the benchmark default)')
+parser.add_argument('--seed', type=int, default=0, help='Benchmark input seed (0 = the original fixed inputs)')
+parser.add_argument('--roi', choices=['off', 'dump', 'exit'], default='off', help='At the benchmark\'s ROI markers (m5 work begin/end): dump stats (recorded in roi.json), and with exit stop right after the ROI')
+parser.add_argument('--predictors', nargs='+', choices=PREDICTORS, metavar='PREDICTOR', help='Simulate one system per predictor in this one process (stats of each are named system_<predictor>.*; see multi.json)')
+parser.add_argument('--progress-period', type=int, default=0, metavar='TICKS', help='Print a PROGRESS line every N ticks for the runner\'s monitor (0 = off)')
 
 args = parser.parse_args()
 
-print(f"Configuration: {args.binary} with {args.predictor}")
+bp_params = {}
+for item in args.bp_param:
+    name, sep, value = item.partition('=')
+    if not sep:
+        parser.error(f"--bp-param expects NAME=VALUE, got: {item}")
+    bp_params[name] = parse_value(value)
 
-# Create system
-system = System()
-system.clk_domain = SrcClockDomain()
-system.clk_domain.clock = '1GHz'
-system.clk_domain.voltage_domain = VoltageDomain()
+if args.predictors:
+    for flag, value in (('--bp-param', args.bp_param), ('--warmup-insts', args.warmup_insts),
+                        ('--max-insts', args.max_insts), ('--restore-checkpoint', args.restore_checkpoint)):
+        if value:
+            parser.error(f"{flag} cannot be combined with --predictors")
+    if args.cpu_type == 'atomic':
+        parser.error("--predictors needs a CPU with a branch predictor")
+    if args.roi != 'off':
+        parser.error("--roi cannot be combined with --predictors")
+if args.roi != 'off' and args.warmup_insts:
+    parser.error("--roi already sets the measured region; drop --warmup-insts")
 
-system.mem_mode = 'timing'
-system.mem_ranges = [AddrRange('512MB')]
+# Benchmarks take [size] [seed]; no arguments keeps their defaults
+workload_args = [args.size, args.seed] if args.size or args.seed else []
 
-system.cpu = MinorCPU()
+# Multi-predictor mode: systems still running, {predictor: system}
+running = {}
 
-# Configure predictor
-if args.predictor == "bimodal":
-    system.cpu.branchPred = BiModeBP()
-    system.cpu.branchPred.globalPredictorSize = 4096
-elif args.predictor == "gshare":
-    system.cpu.branchPred = LTAGE()
-elif args.predictor == "tournament":
-    system.cpu.branchPred = TournamentBP()
+# Tick of every stats dump made by this script, in file order
+dumps = []
 
-print(f"Predictor: {args.predictor} configured")
+# SE-mode exit of a system's last thread
+PROGRAM_EXIT = "exiting with last active thread context"
+
+# Exit causes of the m5 work begin/end ops with exit_on_work_items set
+ROI_EXITS = {"workbegin": "begin", "workend": "end"}
+
+def committed_insts():
+    """Instructions committed so far (with --predictors, by the running
+    CPU furthest ahead; finished ones only spin in _exit())"""
+    if running:
+        return max(s.cpu.totalInsts() for s in running.values())
+    return system.cpu.totalInsts()
+
+def build(*args, **kwargs):
+    with phases.phase("build"):
+        return build_system(*args, **kwargs)
+
+def instantiate(root, checkpoint_dir=None, systems=1):
+    """m5.instantiate(), with timing.json written at exit"""
+    phases.info.update(mode=MODE, systems=systems)
+    phases.write_at_exit(m5.options.outdir)
+    with phases.phase("instantiate"):
+        if checkpoint_dir:
+            m5.instantiate(checkpoint_dir)
+        else:
+            m5.instantiate()
+    phases.mark_exit_at_exit()
+
+def dump_stats():
+    """m5.stats.dump(), noting the dump's tick"""
+    with phases.phase("stats_dump"):
+        m5.stats.dump()
+    dumps.append(m5.curTick())
+
+def run(ticks=None):
+    with phases.phase("simulate"):
+        return m5.simulate() if ticks is None else m5.simulate(ticks)
+
+def simulate(stats_period=0, origin=None):
+    """m5.simulate() in slices: dump stats every stats_period ticks and
+    report progress every --progress-period ticks until a real exit event
 
-system.membus = SystemXBar()
-system.cpu.icache_port = system.membus.cpu_side_ports
-system.cpu.dcache_port = system.membus.cpu_side_ports
-system.cpu.createInterruptController()
+    Periods count from `origin` (default: now), so a simulation resumed
+    after an exit event keeps its dump schedule.
+    """
+    if stats_period <= 0 and args.progress_period <= 0:
+        return run()
+    
+    start = m5.curTick() if origin is None else origin
+    now = m5.curTick()
+    next_dump = now + stats_period - (now - start) % stats_period if stats_period > 0 else None
+    next_progress = now + args.progress_period - (now - start) % args.progress_period \
+        if args.progress_period > 0 else None
+    
+    while True:
+        target = min(t for t in (next_dump, next_progress) if t is not None)
+        exit_event = run(target - m5.curTick())
+        if exit_event.getCause() != "simulate() limit reached":
+            return exit_event
+        
+        now = m5.curTick()
+        if next_dump is not None and now >= next_dump:
+            dump_stats()
+            next_dump += stats_period
+        if next_progress is not None and now >= next_progress:
+            print(f"PROGRESS tick={now} insts={committed_insts()}", flush=True)
+            next_progress += args.progress_period
 
-system.mem_ctrl = MemCtrl()
-system.mem_ctrl.dram = DDR3_1600_8x8()
-system.mem_ctrl.dram.range = system.mem_ranges[0]
-system.mem_ctrl.port = system.membus.mem_side_ports
-system.system_port = system.membus.cpu_side_ports
+if args.simpoint_profile > 0:
+    MODE = "simpoint-profile"
+elif args.take_checkpoint:
+    MODE = "checkpoint"
+elif args.predictors:
+    MODE = "multi"
+else:
+    MODE = "detailed"
 
+if args.simpoint_profile > 0:
+    print(f"Profiling basic-block vectors every {args.simpoint_profile} instructions")
+    system = build(args.binary, cpu_type="atomic", workload_args=workload_args)
+    system.cpu.addSimPointProbe(args.simpoint_profile)
+    
+    root = Root(full_system=False, system=system)
+    instantiate(root)
+    exit_event = simulate()
+    
+    print(f"DONE! Exited @ tick {m5.curTick()}: {exit_event.getCause()}")
+    sys.exit(0)
+
+if args.take_checkpoint and args.simpoints:
+    with open(args.simpoints) as f:
+        starts = sorted({p['checkpoint_insts'] for p in json.load(f)['simpoints']
+                         if p['checkpoint_insts'] > 0})
+    
+    print(f"Taking {len(starts)} simpoint checkpoint(s) for {args.binary}")
+    system = build(args.binary, cpu_type="atomic", workload_args=workload_args)
+    system.cpu.simpoint_start_insts = starts
+    
+    root = Root(full_system=False, system=system)
+    instantiate(root)
+    
+    for insts in starts:
+        exit_event = simulate()
+        if exit_event.getCause() != "simpoint starting point found":
+            print(f"Program ended before simpoint @ {insts}: {exit_event.getCause()}")
+            sys.exit(1)
+        with phases.phase("checkpoint"):
+            m5.checkpoint(str(Path(args.take_checkpoint) / f"cpt.{insts}"))
+    
+    print(f"DONE! {len(starts)} checkpoint(s) written to {args.take_checkpoint}")
+    sys.exit(0)
+
+if args.take_checkpoint:
+    if args.fast_forward <= 0:
+        parser.error("--take-checkpoint needs --fast-forward INSTS")
+    
+    print(f"Fast-forwarding {args.binary} by {args.fast_forward} instructions")
+    system = build(args.binary, cpu_type="atomic", workload_args=workload_args)
+    system.cpu.max_insts_any_thread = args.fast_forward
+    
+    root = Root(full_system=False, system=system)
+    instantiate(root)
+    exit_event = simulate()
+    
+    if exit_event.getCause() != "a thread reached the max instruction count":
+        print(f"Program ended before the fast-forward point: {exit_event.getCause()}")
+        sys.exit(1)
+    
+    with phases.phase("checkpoint"):
+        m5.checkpoint(args.take_checkpoint)
+    print(f"DONE! Checkpoint written to {args.take_checkpoint} @ tick {m5.curTick()}")
+    sys.exit(0)
+
+if args.predictors:
+    print(f"Configuration: {args.binary} with {', '.join(args.predictors)} in one process")
+    if workload_args:
+        print(f"Workload: size={args.size} seed={args.seed}")
+    
+    # One independent system per predictor; their stats are told apart
+    # by the system_<predictor> prefix
+    with phases.phase("build"):
+        systems = build_systems(args.binary, args.predictors, args.cpu_type, workload_args)
+    names = {p: f"system_{p}" for p in systems}
+    root = Root(full_system=False, **{names[p]: s for p, s in systems.items()})
+    instantiate(root, systems=len(systems))
+    
+    print("Starting simulation...")
+    running.update(systems)
+    exits = []
+    while running:
+        exit_event = simulate(args.stats_period, origin=0)
+        if exit_event.getCause() != PROGRAM_EXIT:
+            print(f"Simulation ended early: {exit_event.getCause()}")
+            sys.exit(1)
+        
+        # gem5 may only end the loop once no system has a running thread
+        # left, so this exit can stand for several systems finishing.
+        # Every system runs the same instructions: those at the highest
+        # count have finished, and their results are the stats dumped
+        # now. The dump's tick is the slowest one's; multi_predictor.py
+        # takes each system's own time from its CPU cycles, which stop
+        # once its program has exited
+        insts = {p: s.cpu.totalInsts() for p, s in running.items()}
+        last = max(insts.values())
+        dump_stats()
+        for p in [p for p, n in insts.items() if n == last]:
+            del running[p]
+            exits.append({'predictor': p, 'system': names[p], 'dump': len(dumps) - 1,
+                          'tick': m5.curTick(), 'insts': last})
+            print(f"{p} finished by tick {m5.curTick()} ({last} instructions)")
+    
+    with open(Path(m5.options.outdir) / "multi.json", "w") as f:
+        json.dump({'exits': exits}, f, indent=2)
+    print(f"DONE! Exited @ tick {m5.curTick()}")
+    sys.exit(0)
+
+print(f"Configuration: {args.binary} with {args.predictor}")
+if workload_args:
+    print(f"Workload: size={args.size} seed={args.seed}")
+if bp_params:
+    print(f"Predictor parameters: {bp_params}")
+
+# Create system (predictor built from configs/<predictor>.py)
 print(f"Loading binary: {args.binary}")
-system.workload = SEWorkload.init_compatible(args.binary)
+system = build(args.binary, args.predictor, bp_params, args.cpu_type, workload_args)
+if args.roi != 'off':
+    # The ROI markers hand control back to this script instead of only
+    # counting work items
+    system.exit_on_work_items = True
 
-process = Process()
-process.cmd = [args.binary]
-system.cpu.workload = process
-system.cpu.createThreads()
+print(f"Predictor: {args.predictor} configured")
 
 print("Instantiating...")
 root = Root(full_system=False, system=system)
-m5.instantiate()
+if args.restore_checkpoint:
+    print(f"Restoring checkpoint: {args.restore_checkpoint}")
+instantiate(root, args.restore_checkpoint)
 
 print("Starting simulation...")
-exit_event = m5.simulate()
+if args.warmup_insts > 0:
+    # Warm the predictor up, then measure only what follows
+    system.cpu.scheduleInstStop(0, args.warmup_insts, "warmup done")
+    exit_event = simulate()
+    if exit_event.getCause() != "warmup done":
+        print(f"Program ended during warm-up: {exit_event.getCause()}")
+        sys.exit(1)
+    m5.stats.reset()
+    print(f"Warm-up done @ tick {m5.curTick()}")
+
+if args.max_insts > 0:
+    system.cpu.scheduleInstStop(0, args.max_insts, "max instructions reached")
+
+# Cumulative periodic dumps; the final dump at exit holds the totals.
+# The ROI is measured as the difference of the dumps at its markers
+roi = {}
+origin = m5.curTick()
+while True:
+    exit_event = simulate(args.stats_period, origin)
+    marker = ROI_EXITS.get(exit_event.getCause())
+    if marker is None:
+        break
+    
+    dump_stats()
+    # First begin and last end, should a benchmark mark several regions
+    if marker == 'end' or 'begin' not in roi:
+        roi[marker] = {'dump': len(dumps) - 1, 'tick': m5.curTick(),
+                       'insts': system.cpu.totalInsts()}
+    print(f"ROI {marker} @ tick {m5.curTick()}")
+    if marker == 'end' and args.roi == 'exit':
+        print("Stopping after the ROI")
+        break
+
+if args.roi != 'off':
+    if roi:
+        with open(Path(m5.options.outdir) / "roi.json", "w") as f:
+            json.dump(dict(roi, mode=args.roi), f, indent=2)
+    else:
+        print("No ROI markers seen; was the binary built with M5OPS (benchmarks/Makefile)?")
 
 print(f"DONE! Exited @ tick {m5.curTick()}")
\ No newline at end of file
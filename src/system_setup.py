@@ -3,20 +3,63 @@ System Setup Helper
 Builds base gem5 system with configurable branch predictor
 """
 
+import importlib
+import sys
+from pathlib import Path
+
 import m5
 from m5.objects import *
 
-def build_system(binary_path, predictor_type="bimodal"):
+# Make the project's configs/ package importable from inside gem5
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phase_timer import phases
+
+PREDICTORS = ["bimodal", "gshare", "tournament"]
+
+# CPU model and the memory mode it needs. "atomic" is the cheap
+# functional CPU used to fast-forward before taking a checkpoint.
+CPU_TYPES = {
+    "minor": (MinorCPU, 'timing'),
+    "atomic": (AtomicSimpleCPU, 'atomic'),
+}
+
+def create_predictor(predictor_type, bp_params=None):
+    """
+    Create a branch predictor from configs/<predictor_type>.py
+    
+    Args:
+        predictor_type: "bimodal", "gshare", or "tournament"
+        bp_params: Optional dict of predictor parameter overrides
+    """
+    if predictor_type not in PREDICTORS:
+        raise ValueError(f"Unknown predictor type: {predictor_type}")
+    
+    config = importlib.import_module(f"configs.{predictor_type}")
+    return config.create_predictor(**(bp_params or {}))
+
+def build_system(binary_path, predictor_type="bimodal", bp_params=None,
+                 cpu_type="minor", workload_args=None):
     """
     Build gem5 system with specified branch predictor
     
     Args:
         binary_path: Path to RISC-V binary
         predictor_type: "bimodal", "gshare", or "tournament"
+        bp_params: Optional dict of predictor parameter overrides
+        cpu_type: "minor" (detailed, default) or "atomic" (fast-forward,
+            no branch predictor)
+        workload_args: Command-line arguments for the benchmark
+            (problem size and seed)
     
     Returns:
         Configured system object
     """
+    if cpu_type not in CPU_TYPES:
+        raise ValueError(f"Unknown CPU type: {cpu_type}")
+    cpu_class, mem_mode = CPU_TYPES[cpu_type]
     
     # Create system
     system = System()
@@ -27,29 +70,15 @@ def build_system(binary_path, predictor_type="bimodal"):
     system.clk_domain.voltage_domain = VoltageDomain()
     
     # Memory configuration
-    system.mem_mode = 'timing'
+    system.mem_mode = mem_mode
     system.mem_ranges = [AddrRange('512MB')]
     
     # CPU setup (MinorCPU for in-order execution)
-    system.cpu = MinorCPU()
-    
-    # Configure branch predictor based on type
-    if predictor_type == "bimodal":
-        system.cpu.branchPred = BiModeBP()
-        system.cpu.branchPred.globalPredictorSize = 4096
-        
-    elif predictor_type == "gshare":
-        # gem5 doesn't have direct GshareBP, use LTAGE which has similar behavior
-        system.cpu.branchPred = LTAGE()
-        
-    elif predictor_type == "tournament":
-        system.cpu.branchPred = TournamentBP()
-        system.cpu.branchPred.localPredictorSize = 2048
-        system.cpu.branchPred.globalPredictorSize = 8192
-        system.cpu.branchPred.choicePredictorSize = 8192
-        
-    else:
-        raise ValueError(f"Unknown predictor type: {predictor_type}")
+    system.cpu = cpu_class()
+    
+    # Configure branch predictor based on type (see configs/)
+    if cpu_type != "atomic":
+        system.cpu.branchPred = create_predictor(predictor_type, bp_params)
     
     # Memory bus
     system.membus = SystemXBar()
@@ -68,16 +97,38 @@ def build_system(binary_path, predictor_type="bimodal"):
     # System port
     system.system_port = system.membus.cpu_side_ports
     
-    # Workload setup
-    system.workload = SEWorkload.init_compatible(binary_path)
+    # Workload setup (loads the binary; timed on its own)
+    with phases.phase("workload_init"):
+        system.workload = SEWorkload.init_compatible(binary_path)
     
     process = Process()
-    process.cmd = [binary_path]
+    process.cmd = [binary_path] + [str(a) for a in workload_args or []]
     system.cpu.workload = process
     system.cpu.createThreads()
     
     return system
 
+def build_systems(binary_path, predictors, cpu_type="minor", workload_args=None):
+    """
+    Build one system per predictor, all running the same binary
+    
+    Each system has its own CPU, memory and SE workload, so they share
+    nothing but the gem5 process and its event queue.
+    
+    Args:
+        binary_path: Path to RISC-V binary
+        predictors: List of predictor types, one system each
+        cpu_type: "minor" (detailed, default)
+        workload_args: Command-line arguments for the benchmark
+    
+    Returns:
+        Dict of {predictor: system}, in the given order
+    """
+    if len(set(predictors)) != len(predictors):
+        raise ValueError(f"Duplicate predictors: {predictors}")
+    return {p: build_system(binary_path, p, cpu_type=cpu_type, workload_args=workload_args)
+            for p in predictors}
+
 def run_simulation(system):
     """
     Run the simulation and print basic stats
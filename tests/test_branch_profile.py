@@ -0,0 +1,34 @@
+import gzip
+
+from branch_profile import BranchProfile, aggregate, open_log
+from branch_trace import DIRECT_COND
+
+# Exec and Branch debug output interleaved as gem5 prints it. The
+# mispredicted branch is compressed (c_bnez), the common case in the RVC
+# benchmark binaries
+DEBUG_LOG = """\
+  1000: system.cpu: T0 : 0x10140 @bfs    : c_li a5, 1            : IntAlu :  D=0x0000000000000001  flags=(IsInteger)
+  1250: system.cpu.branchPred: [tid:0] [sn:2] Branch predictor predicted 0 for PC:0x10142
+  1500: system.cpu: T0 : 0x10142 @bfs+2    : c_bnez a5, 8            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  1750: system.cpu.branchPred: [tid:0] [squash sn:2] Mispredicted: T, PC:0x10142
+  2000: system.cpu: T0 : 0x1014a @bfs+10    : c_bnez a5, -8            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  2500: system.cpu: T0 : 0x10142 @bfs+2    : c_bnez a5, 8            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  3000: system.cpu: T0 : 0x1014a @bfs+10    : c_bnez a5, -8            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  3500: system.cpu: T0 : 0x1014c @bfs+12    : c_li a0, 0            : IntAlu :  D=0x0000000000000000  flags=(IsInteger)
+"""
+
+def test_ingest_counts_compressed_branches(tmp_path):
+    log = tmp_path / "gem5-debug.log.gz"
+    with gzip.open(log, "wt") as f:
+        f.write(DEBUG_LOG)
+
+    profile = BranchProfile()
+    with open_log(log) as lines:
+        aggregate(lines, profile)
+
+    assert profile.branches == 4
+    assert profile.mispredicts == 1
+    # [execs, taken, mispredicts, type, error]
+    assert profile.entries[0x10142] == [2, 2, 1, DIRECT_COND, 0]
+    assert profile.entries[0x1014a] == [2, 1, 0, DIRECT_COND, 0]
+    assert [pc for pc, _ in profile.ranked()] == [0x10142, 0x1014a]
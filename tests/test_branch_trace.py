@@ -0,0 +1,31 @@
+from branch_trace import parse_exec_trace, classify, BRANCH_TYPE_CODES, DIRECT_COND
+
+# gem5 Exec output (ExecEnable,ExecUser,ExecKernel); compressed
+# instructions are disassembled with an underscore (c_beqz)
+EXEC_LINES = """\
+  1000: system.cpu: T0 : 0x10140 @main    : c_li a5, 0            : IntAlu :  D=0x0000000000000000  flags=(IsInteger)
+  1500: system.cpu: T0 : 0x10142 @main+2    : c_beqz a5, 8            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  2000: system.cpu: T0 : 0x1014a @main+10    : c_bnez a5, 6            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  2500: system.cpu: T0 : 0x1014c @main+12    : beq a5, a4, 12            : IntAlu :   flags=(IsControl|IsDirectControl|IsCondControl)
+  3000: system.cpu: T0 : 0x10150 @main+16    : c_jr ra            : IntAlu :   flags=(IsControl|IsIndirectControl|IsUncondControl|IsReturn)
+  3500: system.cpu: T0 : 0x10200 @_exit    : c_j 4            : IntAlu :   flags=(IsControl|IsDirectControl|IsUncondControl)
+  4000: system.cpu: T0 : 0x10204 @_exit+4    : addi a0, zero, 0            : IntAlu :  D=0x0000000000000000  flags=(IsInteger)
+""".splitlines()
+
+def test_compressed_branches_are_parsed():
+    records = list(parse_exec_trace(EXEC_LINES))
+    assert records == [
+        (0x10142, 0x1014a, True, DIRECT_COND),
+        # Not taken: the next instruction is 2 bytes on, not 4. Direct
+        # branches keep their static target either way
+        (0x1014a, 0x10150, False, DIRECT_COND),
+        (0x1014c, 0x10158, False, DIRECT_COND),
+        (0x10150, 0x10200, True, BRANCH_TYPE_CODES["Return"]),
+        (0x10200, 0x10204, True, BRANCH_TYPE_CODES["DirectUncond"]),
+    ]
+
+def test_both_compressed_spellings():
+    for prefix in ("c_", "c."):
+        assert classify(prefix + "beqz", "a5, 8") == (DIRECT_COND, 8)
+        assert classify(prefix + "jr", "ra") == (BRANCH_TYPE_CODES["Return"], None)
+        assert classify(prefix + "jalr", "a5") == (BRANCH_TYPE_CODES["CallIndirect"], None)
@@ -0,0 +1,30 @@
+from gem5_stats import parse_stats_text, parse_stats_tree
+
+DUMP = """
+---------- Begin Simulation Statistics ----------
+simTicks                                     {ticks}                       # Number of ticks simulated (Tick)
+simTicksX                                        7                       # Not simTicks (Count)
+system.cpu.branchPred.lookups_0::DirectCond   3401     74.80%     74.80% # Lookups (Count)
+system.cpu.branchPred.lookups_0::total        4547                       # Lookups (Count)
+
+---------- End Simulation Statistics   ----------
+"""
+
+
+def test_lookups_read_only_the_last_dump(tmp_path):
+    path = tmp_path / "stats.txt"
+    path.write_text(DUMP.format(ticks=100) + DUMP.format(ticks=200))
+
+    for tree in (parse_stats_tree(path), parse_stats_text(path.read_text())):
+        assert tree.value("simTicks") == 200
+        assert tree.value("simTicksX") == 7
+        assert "simTick" not in tree
+        assert tree.first_value(["system.cpu.branchPred.lookups",
+                                 "system.cpu.branchPred.lookups_0::total"]) == 4547
+        assert tree["system.cpu.branchPred.lookups_0::DirectCond"].pct == 74.80
+        assert sorted(tree.group("system.cpu.branchPred.lookups_0")) == ["DirectCond", "total"]
+        assert len(tree) == 4
+
+
+def test_missing_file(tmp_path):
+    assert parse_stats_tree(tmp_path / "stats.txt") is None
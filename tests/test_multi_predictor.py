@@ -0,0 +1,43 @@
+from gem5_stats import parse_stats_text
+from multi_predictor import split_stats
+
+# One dump shared by two systems that finished at different cycles, as
+# when gem5 only leaves the simulation loop once every system is done
+SHARED_DUMP = """
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.000300                       # Number of seconds simulated (Second)
+simTicks                                    300000000                       # Number of ticks simulated (Tick)
+finalTick                                   300000000                       # Number of ticks from beginning of simulation (Tick)
+simFreq                                  1000000000000                       # The number of ticks per simulated second ((Tick/Second))
+simInsts                                        24386                       # Number of instructions simulated (Count)
+simOps                                          24386                       # Number of ops (including micro ops) simulated (Count)
+hostSeconds                                      0.14                       # Real time elapsed on the host (Second)
+system_bimodal.clk_domain.clock                  1000                       # Clock period in ticks (Tick)
+system_bimodal.cpu.numCycles                   300000                       # Number of cpu cycles simulated (Cycle)
+system_bimodal.cpu.commitStats0.numInsts        12193                       # Number of instructions committed (Count)
+system_bimodal.cpu.commitStats0.numOps          12193                       # Number of ops committed (Count)
+system_gshare.clk_domain.clock                   1000                       # Clock period in ticks (Tick)
+system_gshare.cpu.numCycles                    262934                       # Number of cpu cycles simulated (Cycle)
+system_gshare.cpu.commitStats0.numInsts         12193                       # Number of instructions committed (Count)
+system_gshare.cpu.commitStats0.numOps           12193                       # Number of ops committed (Count)
+
+---------- End Simulation Statistics   ----------
+""".lstrip("\n").splitlines(keepends=True)
+
+
+def split(system):
+    return parse_stats_text("".join(split_stats(SHARED_DUMP, system, 0)))
+
+
+def test_each_system_keeps_its_own_time():
+    gshare = split("system_gshare")
+    assert gshare.value("simTicks") == 262934000
+    assert gshare.value("finalTick") == 262934000
+    assert gshare.value("simSeconds") == 0.000263
+    assert gshare.value("simInsts") == 12193
+    assert gshare.value("system.cpu.numCycles") == 262934
+    assert "system_bimodal.cpu.numCycles" not in gshare
+
+    bimodal = split("system_bimodal")
+    assert bimodal.value("simTicks") == 300000000
+    assert bimodal.value("simSeconds") == 0.0003